@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+历史回测模块 - 快乐魔仙数字货币分析技能
+基于MA/MACD/KDJ/OBV投票规则，对整段历史的每根K线一次向量化计算持仓、收益、回撤和交易次数；
+输入可为单个币种序列或（币种×时间）矩阵，多个币种可分块并行到多个进程
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from src.analysis import kernels
+from src.analysis.graph import IndicatorGraph
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STRATEGY = {
+    'rules': ['ma', 'macd', 'kdj', 'obv'],   # 参与投票的规则，每条规则投 +1/0/-1
+    'entry_score': 2,                        # 得分达到该值时开多
+    'exit_score': -1,                        # 得分小于等于该值时平仓，介于两者之间保持原持仓
+    'fee_rate': 0.001                        # 单边手续费率
+}
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """沿时间轴向前填充NaN（开头的NaN填0）"""
+    n = values.shape[-1]
+    index = np.where(np.isnan(values), 0, np.arange(n))
+    np.maximum.accumulate(index, axis=-1, out=index)
+    filled = np.take_along_axis(values, index, axis=-1)
+    return np.nan_to_num(filled, nan=0.0)
+
+
+def rule_scores(graph: IndicatorGraph, config: Dict[str, Any], rules: List[str]) -> np.ndarray:
+    """各根K线的规则投票总分"""
+    close = graph.inputs['close']
+    score = np.zeros(close.shape)
+
+    if 'ma' in rules:
+        periods = sorted(config['ma_periods'])
+        if len(periods) > 1:
+            score += np.sign(graph.sma('close', periods[0]) - graph.sma('close', periods[1]))
+        else:
+            score += np.sign(close - graph.sma('close', periods[0]))
+    if 'macd' in rules:
+        score += np.sign(graph.macd(*config['macd_params'])[2])
+    if 'kdj' in rules:
+        k_values, d_values, _ = graph.kdj(config['kdj_params'][0])
+        score += np.sign(k_values - d_values)
+    if 'obv' in rules:
+        score += np.sign(graph.obv() - graph.sma(('obv',), config['obv_period']))
+
+    return score
+
+
+def warmup_length(config: Dict[str, Any], rules: Optional[List[str]] = None) -> int:
+    """指标预热所需的K线数量（预热期内不持仓），只计入参与投票的规则用到的指标"""
+    rules = DEFAULT_STRATEGY['rules'] if rules is None else rules
+    lengths = [1]
+    if 'ma' in rules:
+        # ma规则只比较最短的两条均线
+        lengths.append(sorted(config['ma_periods'])[:2][-1])
+    if 'macd' in rules:
+        fast, slow, signal = config['macd_params']
+        lengths.append(max(fast, slow) + signal)
+    if 'kdj' in rules:
+        lengths.append(config['kdj_params'][0])
+    if 'obv' in rules:
+        lengths.append(config['obv_period'])
+    return max(lengths)
+
+
+def simulate(market_matrix: Dict[str, Any], config: Dict[str, Any],
+             strategy: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    向量化回测
+
+    第t根K线收盘时根据得分确定目标持仓，持仓从第t+1根K线开始生效，
+    不存在逐根K线的Python循环。持仓时间占比和持有收益按预热期之后的区间计算。
+
+    Returns:
+        Dict[str, np.ndarray]: positions/returns/equity/drawdown序列及各币种汇总指标
+    """
+    close = kernels.as_array(market_matrix['prices'])
+    graph = IndicatorGraph(close, market_matrix.get('high'), market_matrix.get('low'),
+                           market_matrix.get('volumes'))
+    n = close.shape[-1]
+
+    score = rule_scores(graph, config, strategy['rules'])
+    target = np.where(score >= strategy['entry_score'], 1.0,
+                      np.where(score <= strategy['exit_score'], 0.0, np.nan))
+    warmup = min(warmup_length(config, strategy['rules']), n - 1)
+    target[..., :warmup] = 0.0
+    positions = _forward_fill(target)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bar_returns = np.zeros(close.shape)
+        bar_returns[..., 1:] = np.nan_to_num(close[..., 1:] / close[..., :-1] - 1)
+
+    held = np.zeros(close.shape)
+    held[..., 1:] = positions[..., :-1]
+    turnover = np.abs(np.diff(positions, axis=-1, prepend=0.0))
+    strategy_returns = held * bar_returns - turnover * strategy['fee_rate']
+
+    equity = np.cumprod(1 + strategy_returns, axis=-1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=-1) - 1
+
+    return {
+        'positions': positions,
+        'returns': strategy_returns,
+        'equity': equity,
+        'drawdown': drawdown,
+        'total_return': equity[..., -1] - 1,
+        'max_drawdown': drawdown.min(axis=-1),
+        'trades': (np.diff(positions, axis=-1, prepend=0.0) > 0).sum(axis=-1),
+        'exposure': positions[..., warmup:].mean(axis=-1),
+        'buy_and_hold': np.nan_to_num(close[..., -1] / close[..., warmup] - 1)
+    }
+
+
+class Backtester:
+    """历史回测引擎"""
+
+    def __init__(self, config: Dict[str, Any], strategy: Optional[Dict[str, Any]] = None, workers: int = 1):
+        """
+        初始化回测引擎
+
+        Args:
+            config: 指标参数配置（与TechnicalIndicators.config相同）
+            strategy: 策略规则，缺省项使用DEFAULT_STRATEGY
+            workers: 并行进程数，1表示在当前进程内计算
+        """
+        self.config = config
+        self.strategy = {**DEFAULT_STRATEGY, **(strategy or {})}
+        self.workers = max(1, int(workers))
+        self.warmup = warmup_length(config, self.strategy['rules'])
+        logger.info("回测引擎初始化完成")
+
+    def run(self, market_matrix: Dict[str, Any], symbols: List[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        回测一个或多个币种
+
+        Args:
+            market_matrix: prices/high/low/volumes，一维为单个币种，二维为（币种×时间）矩阵
+            symbols: 各行对应的币种代码
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 币种 -> 汇总指标及positions/equity/drawdown序列
+        """
+        try:
+            prices = kernels.as_array(market_matrix.get('prices', []))
+            if prices.shape[-1] < 2:
+                return {'error': '回测至少需要两个数据点'}
+            if prices.shape[-1] <= self.warmup:
+                return {'error': f'历史数据不足: 指标预热需要{self.warmup}根K线，当前只有{prices.shape[-1]}根'}
+
+            matrix = {
+                field: np.atleast_2d(kernels.as_array(market_matrix[field]))
+                for field in ('prices', 'high', 'low', 'volumes') if field in market_matrix
+            }
+            rows = matrix['prices'].shape[0]
+            symbols = symbols or [str(i) for i in range(rows)]
+            if len(symbols) != rows:
+                return {'error': f'币种数量({len(symbols)})与矩阵行数({rows})不一致'}
+
+            outputs = self._simulate_parallel(matrix) if self.workers > 1 and rows > 1 else simulate(
+                matrix, self.config, self.strategy)
+
+            results = {}
+            for row, symbol in enumerate(symbols):
+                results[symbol] = {key: value[row] for key, value in outputs.items()}
+                for key in ('total_return', 'max_drawdown', 'exposure', 'buy_and_hold'):
+                    results[symbol][key] = float(results[symbol][key])
+                results[symbol]['trades'] = int(results[symbol]['trades'])
+
+            logger.info(f"回测完成: {rows}个币种 × {prices.shape[-1]}根K线")
+            return results
+
+        except Exception as e:
+            logger.error(f"回测失败: {e}")
+            return {'error': f'回测失败: {str(e)}'}
+
+    def _simulate_parallel(self, matrix: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """按币种分块，在多个进程中并行回测后合并"""
+        rows = matrix['prices'].shape[0]
+        chunks = np.array_split(np.arange(rows), min(self.workers, rows))
+
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = [
+                executor.submit(simulate, {field: values[chunk] for field, values in matrix.items()},
+                                self.config, self.strategy)
+                for chunk in chunks
+            ]
+            parts = [future.result() for future in futures]
+
+        return {key: np.concatenate([part[key] for part in parts], axis=0) for key in parts[0]}
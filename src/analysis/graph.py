@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+指标计算依赖图 - 快乐魔仙数字货币分析技能
+单次分析内按节点记忆中间结果（累积和、各周期EMA、滚动极值、KDJ基础序列），
+多个指标用到同一中间结果时只计算一次；输入可为一维序列或二维（币种×时间）矩阵
+"""
+
+import logging
+from collections import Counter
+from typing import Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+
+from src.analysis import kernels
+
+logger = logging.getLogger(__name__)
+
+# 节点：输入序列名（'close'/'high'/'low'/'volume'）或 (类型, 参数...) 元组，
+# 参数中的序列同样用节点表示，例如 ('ema', ('macd_line', 6, 7), 6)
+Node = Union[str, Tuple]
+
+
+class IndicatorGraph:
+    """单次分析的指标依赖图"""
+
+    def __init__(self, close, high=None, low=None, volume=None):
+        """初始化依赖图（缺省的high/low使用收盘价）"""
+        close = kernels.as_array(close)
+        self.inputs = {
+            'close': close,
+            'high': close if high is None else kernels.as_array(high),
+            'low': close if low is None else kernels.as_array(low),
+            'volume': np.zeros(close.shape) if volume is None else kernels.as_array(volume)
+        }
+        self.cache: Dict[Node, Any] = {}
+        self.evaluations = Counter()   # 各类节点实际计算次数
+
+    def get(self, node: Node) -> Any:
+        """求值节点（已计算过的直接返回缓存）"""
+        if isinstance(node, str):
+            return self.inputs[node]
+        if node not in self.cache:
+            kind, args = node[0], node[1:]
+            self.cache[node] = getattr(self, f'_build_{kind}')(*args)
+            self.evaluations[kind] += 1
+        return self.cache[node]
+
+    # 常用节点的便捷访问
+    def sma(self, source: Node, period: int) -> np.ndarray:
+        return self.get(('sma', source, period))
+
+    def ema(self, source: Node, period: int) -> np.ndarray:
+        return self.get(('ema', source, period))
+
+    def macd(self, fast: int, slow: int, signal: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.get(('macd', fast, slow, signal))
+
+    def extremes(self, period: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.get(('rolling_max', 'high', period)), self.get(('rolling_min', 'low', period))
+
+    def kdj(self, period: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.get(('kdj', period))
+
+    def obv(self) -> np.ndarray:
+        return self.get(('obv',))
+
+    def td(self, setup: int, countdown: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return self.get(('td', setup, countdown))
+
+    # 节点构建函数
+    def _build_cumsum(self, source: Node) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        return kernels.nan_cumsum(self.get(source))
+
+    def _build_sma(self, source: Node, period: int) -> np.ndarray:
+        csum, nan_count = self.get(('cumsum', source))
+        return kernels.sma_from_cumsum(csum, period, nan_count)
+
+    def _build_ema(self, source: Node, period: int) -> np.ndarray:
+        return kernels.ema_period(self.get(source), period)
+
+    def _build_macd_line(self, fast: int, slow: int) -> np.ndarray:
+        return self.ema('close', fast) - self.ema('close', slow)
+
+    def _build_macd(self, fast: int, slow: int, signal: int):
+        line = ('macd_line', fast, slow)
+        macd_line = self.get(line)
+        signal_line = self.ema(line, signal)
+        return macd_line, signal_line, macd_line - signal_line
+
+    def _build_rolling_max(self, source: Node, window: int) -> np.ndarray:
+        return kernels.rolling_max(self.get(source), window)
+
+    def _build_rolling_min(self, source: Node, window: int) -> np.ndarray:
+        return kernels.rolling_min(self.get(source), window)
+
+    def _build_kdj(self, period: int):
+        return kernels.kdj(self.inputs['high'], self.inputs['low'], self.inputs['close'],
+                           period, self.extremes(period))
+
+    def _build_kdj_k(self, period: int) -> np.ndarray:
+        return self.kdj(period)[0]
+
+    def _build_kdj_d(self, period: int) -> np.ndarray:
+        return self.kdj(period)[1]
+
+    def _build_obv(self) -> np.ndarray:
+        return kernels.obv(self.inputs['close'], self.inputs['volume'])
+
+    def _build_td(self, setup: int, countdown: int):
+        return kernels.td_sequential(self.inputs['high'], self.inputs['low'], self.inputs['close'],
+                                     setup, countdown)
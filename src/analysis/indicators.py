@@ -7,17 +7,38 @@
 import logging
 import random
 from datetime import datetime
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Sequence, Union
 import numpy as np
 
+from src.analysis import kernels
+from src.analysis.graph import IndicatorGraph
+from src.analysis.sweep import SWEEPS
+from src.analysis.streaming import StreamingIndicatorState
+
 logger = logging.getLogger(__name__)
 
+# 指标序列：兼容模式下为列表，数组模式下为ndarray
+Series = Union[List[float], np.ndarray]
+
+
+def _length(values) -> int:
+    """序列长度（二维矩阵为时间轴长度）"""
+    return values.shape[-1] if isinstance(values, np.ndarray) else len(values)
+
+
 class TechnicalIndicators:
     """技术指标计算引擎"""
     
-    def __init__(self, config: Dict[str, Any] = None):
-        """初始化技术指标引擎"""
+    def __init__(self, config: Dict[str, Any] = None, as_list: bool = True):
+        """
+        初始化技术指标引擎
+        
+        Args:
+            config: 指标参数配置
+            as_list: 兼容模式，True时各指标返回Python列表，False时直接返回ndarray
+        """
         self.config = config or self._default_config()
+        self.as_list = as_list
         logger.info("技术指标引擎初始化完成")
         
     def _default_config(self) -> Dict[str, Any]:
@@ -31,148 +52,95 @@ class TechnicalIndicators:
             'obv_period': 30                # OBV周期
         }
     
-    def calculate_ma(self, prices: List[float], period: int) -> List[float]:
-        """计算移动平均线"""
-        if len(prices) < period:
-            return [0.0] * len(prices)
-        
-        ma_values = []
-        for i in range(len(prices)):
-            if i < period - 1:
-                ma_values.append(0.0)
-            else:
-                ma_slice = prices[i - period + 1:i + 1]
-                ma_values.append(sum(ma_slice) / period)
-        
-        return ma_values
+    def _output(self, values: np.ndarray, dtype=np.float64):
+        """按兼容模式输出：as_list为True时转换为列表，否则直接返回ndarray（二维批量结果始终为ndarray）"""
+        values = np.asarray(values, dtype=dtype)
+        return values.tolist() if self.as_list and values.ndim == 1 else values
     
-    def calculate_macd(self, prices: List[float], fast: int = 6, slow: int = 7, signal: int = 6) -> Dict[str, List[float]]:
+    def build_graph(self, close: Sequence[float], high: Sequence[float] = None, low: Sequence[float] = None,
+                    volume: Sequence[float] = None) -> IndicatorGraph:
+        """创建单次分析的依赖图，传给calculate_*方法后共享中间结果"""
+        return IndicatorGraph(close, high, low, volume)
+    
+    def calculate_ma(self, prices: Sequence[float], period: int, graph: IndicatorGraph = None) -> Series:
+        """计算移动平均线（graph须基于同一组数据创建）"""
+        graph = graph or IndicatorGraph(prices)
+        return self._output(graph.sma('close', period))
+    
+    def calculate_macd(self, prices: Sequence[float], fast: int = 6, slow: int = 7, signal: int = 6,
+                       graph: IndicatorGraph = None) -> Dict[str, Series]:
         """计算MACD指标"""
-        if len(prices) < max(fast, slow, signal):
-            return {'macd': [0.0], 'signal': [0.0], 'histogram': [0.0]}
-        
-        # 计算EMA
-        def calculate_ema(data, period):
-            ema = [data[0]]
-            multiplier = 2 / (period + 1)
-            for i in range(1, len(data)):
-                ema_value = (data[i] - ema[-1]) * multiplier + ema[-1]
-                ema.append(ema_value)
-            return ema
+        if _length(prices) < max(fast, slow, signal):
+            return {'macd': self._output([0.0]), 'signal': self._output([0.0]), 'histogram': self._output([0.0])}
         
-        ema_fast = calculate_ema(prices, fast)
-        ema_slow = calculate_ema(prices, slow)
-        
-        # 计算MACD线
-        macd_line = []
-        for i in range(len(prices)):
-            macd_line.append(ema_fast[i] - ema_slow[i])
-        
-        # 计算信号线
-        signal_line = calculate_ema(macd_line, signal)
-        
-        # 计算柱状图
-        histogram = []
-        for i in range(len(prices)):
-            histogram.append(macd_line[i] - signal_line[i])
+        graph = graph or IndicatorGraph(prices)
+        macd_line, signal_line, histogram = graph.macd(fast, slow, signal)
         
         return {
-            'macd': macd_line,
-            'signal': signal_line,
-            'histogram': histogram
+            'macd': self._output(macd_line),
+            'signal': self._output(signal_line),
+            'histogram': self._output(histogram)
         }
     
-    def calculate_kdj(self, high: List[float], low: List[float], close: List[float], 
-                     period: int = 9, k_period: int = 3, d_period: int = 3) -> Dict[str, List[float]]:
+    def calculate_high_low(self, high: Sequence[float], low: Sequence[float], period: int) -> Tuple[np.ndarray, np.ndarray]:
+        """计算滚动最高价/最低价序列（O(n)，随机指标族共用）"""
+        return kernels.high_low_range(high, low, period)
+    
+    def calculate_kdj(self, high: Sequence[float], low: Sequence[float], close: Sequence[float], 
+                     period: int = 9, k_period: int = 3, d_period: int = 3,
+                     graph: IndicatorGraph = None) -> Dict[str, Series]:
         """计算KDJ指标"""
-        if len(close) < period:
-            return {'K': [50.0], 'D': [50.0], 'J': [50.0]}
-        
-        k_values = []
-        d_values = []
-        j_values = []
+        if _length(close) < period:
+            return {'K': self._output([50.0]), 'D': self._output([50.0]), 'J': self._output([50.0])}
         
-        for i in range(len(close)):
-            if i < period - 1:
-                k_values.append(50.0)
-                d_values.append(50.0)
-                j_values.append(50.0)
-                continue
-            
-            # 计算最近period个周期的最高价和最低价
-            high_slice = high[i - period + 1:i + 1]
-            low_slice = low[i - period + 1:i + 1]
-            
-            highest_high = max(high_slice)
-            lowest_low = min(low_slice)
-            
-            if highest_high == lowest_low:
-                rsv = 50.0
-            else:
-                rsv = ((close[i] - lowest_low) / (highest_high - lowest_low)) * 100
-            
-            # 计算K值
-            if i == period - 1:
-                k = rsv
-            else:
-                k = (2/3) * k_values[-1] + (1/3) * rsv
-            
-            # 计算D值
-            if i == period - 1:
-                d = k
-            else:
-                d = (2/3) * d_values[-1] + (1/3) * k
-            
-            # 计算J值
-            j = 3 * k - 2 * d
-            
-            k_values.append(k)
-            d_values.append(d)
-            j_values.append(j)
-        
-        return {'K': k_values, 'D': d_values, 'J': j_values}
+        graph = graph or IndicatorGraph(close, high, low)
+        k_values, d_values, j_values = graph.kdj(period)
+        return {'K': self._output(k_values), 'D': self._output(d_values), 'J': self._output(j_values)}
     
-    def calculate_skdj(self, high: List[float], low: List[float], close: List[float],
-                      period: int = 9, k_period: int = 3, d_period: int = 3) -> Dict[str, List[float]]:
+    def calculate_skdj(self, high: Sequence[float], low: Sequence[float], close: Sequence[float],
+                      period: int = 9, k_period: int = 3, d_period: int = 3,
+                      graph: IndicatorGraph = None) -> Dict[str, Series]:
         """计算SKDJ指标（慢速随机指标）"""
-        # 先计算KDJ
-        kdj = self.calculate_kdj(high, low, close, period, k_period, d_period)
-        
-        # 对K和D进行平滑
-        k_smooth = self.calculate_ma(kdj['K'], k_period)
-        d_smooth = self.calculate_ma(kdj['D'], d_period)
+        if _length(close) < period:
+            k_smooth = kernels.sma([50.0], k_period)
+            d_smooth = kernels.sma([50.0], d_period)
+        else:
+            # 复用KDJ基础序列，对K和D进行平滑
+            graph = graph or IndicatorGraph(close, high, low)
+            k_smooth = graph.sma(('kdj_k', period), k_period)
+            d_smooth = graph.sma(('kdj_d', period), d_period)
         
         # 计算慢速J值
-        j_slow = []
-        for i in range(len(k_smooth)):
-            j_slow.append(3 * k_smooth[i] - 2 * d_smooth[i])
+        j_slow = 3 * k_smooth - 2 * d_smooth
         
-        return {'SK': k_smooth, 'SD': d_smooth, 'SJ': j_slow}
+        return {'SK': self._output(k_smooth), 'SD': self._output(d_smooth), 'SJ': self._output(j_slow)}
     
-    def calculate_obv(self, close: List[float], volume: List[float], period: int = 30) -> List[float]:
+    def calculate_obv(self, close: Sequence[float], volume: Sequence[float], period: int = 30,
+                      graph: IndicatorGraph = None) -> Series:
         """计算OBV能量潮指标"""
-        if len(close) < 2 or len(volume) < 2:
-            return [0.0]
-        
-        obv_values = [0.0]
+        if _length(close) < 2 or _length(volume) < 2:
+            return self._output([0.0])
         
-        for i in range(1, len(close)):
-            if close[i] > close[i-1]:
-                # 价格上涨，OBV增加
-                obv_values.append(obv_values[-1] + volume[i])
-            elif close[i] < close[i-1]:
-                # 价格下跌，OBV减少
-                obv_values.append(obv_values[-1] - volume[i])
-            else:
-                # 价格不变，OBV不变
-                obv_values.append(obv_values[-1])
+        graph = graph or IndicatorGraph(close, volume=volume)
         
         # 计算OBV的移动平均
-        if len(obv_values) >= period:
-            obv_ma = self.calculate_ma(obv_values, period)
-            return obv_ma
+        if _length(close) >= period:
+            return self._output(graph.sma(('obv',), period))
         else:
-            return obv_values
+            return self._output(graph.obv())
+    
+    def calculate_td(self, high: Sequence[float], low: Sequence[float], close: Sequence[float],
+                     setup: int = 9, countdown: int = 13, graph: IndicatorGraph = None) -> Dict[str, Series]:
+        """计算TD序列指标（结构计数与计数阶段）"""
+        graph = graph or IndicatorGraph(close, high, low)
+        buy_setup, sell_setup, buy_countdown, sell_countdown = graph.td(setup, countdown)
+        # 计数为整数，与增量模式一致
+        return {
+            'buy_setup': self._output(buy_setup, np.int64),
+            'sell_setup': self._output(sell_setup, np.int64),
+            'buy_countdown': self._output(buy_countdown, np.int64),
+            'sell_countdown': self._output(sell_countdown, np.int64)
+        }
     
     def generate_signals(self, indicators: Dict[str, Any], current_price: float) -> Dict[str, Any]:
         """生成交易信号"""
@@ -229,6 +197,98 @@ class TechnicalIndicators:
         
         return signals
     
+    def create_streaming_state(self, market_data: Dict[str, Any], bar_interval: int = 86400) -> StreamingIndicatorState:
+        """用历史数据创建增量指标状态（供监控循环逐报价更新）"""
+        return StreamingIndicatorState(self.config, bar_interval).seed(market_data)
+    
+    def analyze_streaming(self, state: StreamingIndicatorState, price: float, volume: float = 0.0,
+                          timestamp: float = None) -> Dict[str, Any]:
+        """增量分析：用一个新报价更新状态，结果结构与analyze_all_indicators一致（指标为最新值）"""
+        try:
+            indicators = state.update(price, volume, timestamp=timestamp)
+            signals = self.generate_signals(indicators, price)
+            
+            logger.debug(f"增量指标分析完成: {signals['technical_signal']}")
+            return {
+                'current_price': price,
+                'indicators': indicators,
+                'signals': signals,
+                'analysis_time': datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"增量指标分析失败: {e}")
+            return {'error': f'技术分析失败: {str(e)}'}
+    
+    def sweep(self, indicator: str, market_data: Dict[str, Any], **grid: Sequence[int]) -> Dict[str, Any]:
+        """
+        参数网格扫描：一次向量化计算指标在所有参数组合下的结果
+        
+        Args:
+            indicator: 指标名称（ma/macd/kdj/skdj/obv）
+            market_data: 行情数据（prices/high/low/volumes，可为一维序列或二维矩阵）
+            **grid: 各参数的取值列表，如 fast=[6, 12], slow=[7, 26], signal=[6, 9]
+        
+        Returns:
+            Dict[str, Any]: params为各参数轴的取值，其余为按参数索引的结果数组（参数轴在前）
+        """
+        try:
+            sweep_func = SWEEPS.get(indicator.lower())
+            if sweep_func is None:
+                return {'error': f'不支持的扫描指标: {indicator}'}
+            
+            prices = market_data.get('prices', [])
+            if _length(prices) == 0:
+                return {'error': '没有价格数据'}
+            
+            graph = self.build_graph(prices, market_data.get('high'), market_data.get('low'),
+                                     market_data.get('volumes'))
+            result = sweep_func(graph, **grid)
+            
+            combinations = int(np.prod([len(values) for values in result['params'].values()]))
+            logger.info(f"{indicator.upper()}参数扫描完成: {combinations}组参数")
+            return result
+            
+        except TypeError as e:
+            logger.error(f"参数扫描参数错误: {e}")
+            return {'error': f'参数扫描参数错误: {str(e)}'}
+        except Exception as e:
+            logger.error(f"参数扫描失败: {e}")
+            return {'error': f'参数扫描失败: {str(e)}'}
+    
+    def _calculate_all(self, prices, high_prices, low_prices, volumes) -> Dict[str, Any]:
+        """按配置计算全部指标（共用同一依赖图，输入可为一维序列或二维矩阵）"""
+        indicators = {}
+        
+        # 本次分析共用的依赖图：累积和、EMA、滚动极值、KDJ基础序列各只计算一次
+        graph = self.build_graph(prices, high_prices, low_prices, volumes)
+        
+        # MA指标
+        for period in self.config['ma_periods']:
+            ma_key = f'MA{period}'
+            indicators[ma_key] = self.calculate_ma(prices, period, graph=graph)
+        
+        # MACD指标
+        macd_params = self.config['macd_params']
+        indicators['MACD'] = self.calculate_macd(prices, *macd_params, graph=graph)
+        
+        # KDJ指标
+        kdj_params = self.config['kdj_params']
+        indicators['KDJ'] = self.calculate_kdj(high_prices, low_prices, prices, *kdj_params, graph=graph)
+        
+        # SKDJ指标
+        skdj_params = self.config['skdj_params']
+        indicators['SKDJ'] = self.calculate_skdj(high_prices, low_prices, prices, *skdj_params, graph=graph)
+        
+        # OBV指标
+        indicators['OBV'] = self.calculate_obv(prices, volumes, self.config['obv_period'], graph=graph)
+        
+        # TD序列指标
+        if self.config.get('td_markers'):
+            indicators['TD'] = self.calculate_td(high_prices, low_prices, prices, *self.config['td_markers'], graph=graph)
+        
+        return indicators
+    
     def analyze_all_indicators(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """分析所有技术指标"""
         try:
@@ -238,33 +298,13 @@ class TechnicalIndicators:
             low_prices = market_data.get('low', [])
             volumes = market_data.get('volumes', [])
             
-            if not prices:
+            if len(prices) == 0:
                 return {'error': '没有价格数据'}
             
-            current_price = prices[-1] if prices else 0
+            current_price = float(prices[-1])
             
             # 计算所有技术指标
-            indicators = {}
-            
-            # MA指标
-            for period in self.config['ma_periods']:
-                ma_key = f'MA{period}'
-                indicators[ma_key] = self.calculate_ma(prices, period)
-            
-            # MACD指标
-            macd_params = self.config['macd_params']
-            indicators['MACD'] = self.calculate_macd(prices, *macd_params)
-            
-            # KDJ指标
-            kdj_params = self.config['kdj_params']
-            indicators['KDJ'] = self.calculate_kdj(high_prices, low_prices, prices, *kdj_params)
-            
-            # SKDJ指标
-            skdj_params = self.config['skdj_params']
-            indicators['SKDJ'] = self.calculate_skdj(high_prices, low_prices, prices, *skdj_params)
-            
-            # OBV指标
-            indicators['OBV'] = self.calculate_obv(prices, volumes, self.config['obv_period'])
+            indicators = self._calculate_all(prices, high_prices, low_prices, volumes)
             
             # 生成交易信号
             signals = self.generate_signals(indicators, current_price)
@@ -281,4 +321,91 @@ class TechnicalIndicators:
             
         except Exception as e:
             logger.error(f"技术指标分析失败: {e}")
-            return {'error': f'技术分析失败: {str(e)}'}
\ No newline at end of file
+            return {'error': f'技术分析失败: {str(e)}'}
+    
+    def analyze_batch(self, market_matrix: Dict[str, Any], symbols: List[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        批量分析多个币种（每行一个币种、已按时间对齐的二维矩阵）
+        
+        所有指标沿时间轴对整个矩阵一次计算完成；as_list为True时各币种指标转换为列表（与analyze_all_indicators一致），
+        否则为结果矩阵的行视图（ndarray，不复制）。
+        
+        Args:
+            market_matrix: 包含prices/high/low/volumes二维矩阵的字典
+            symbols: 各行对应的币种代码，缺省为行号
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: 币种 -> 与analyze_all_indicators结构相同的结果
+        """
+        try:
+            prices = kernels.as_array(market_matrix.get('prices', []))
+            if prices.ndim != 2 or prices.shape[1] == 0:
+                return {'error': '价格矩阵必须为非空的二维数组（币种×时间）'}
+            
+            high_prices = kernels.as_array(market_matrix.get('high', prices))
+            low_prices = kernels.as_array(market_matrix.get('low', prices))
+            volumes = kernels.as_array(market_matrix.get('volumes', np.zeros(prices.shape)))
+            symbols = symbols or [str(i) for i in range(prices.shape[0])]
+            if len(symbols) != prices.shape[0]:
+                return {'error': f'币种数量({len(symbols)})与矩阵行数({prices.shape[0]})不一致'}
+            
+            indicators = self._calculate_all(prices, high_prices, low_prices, volumes)
+            analysis_time = datetime.now().isoformat()
+            
+            results = {}
+            for row, symbol in enumerate(symbols):
+                asset_indicators = _select_row(indicators, row, self.as_list)
+                current_price = float(prices[row, -1])
+                results[symbol] = {
+                    'current_price': current_price,
+                    'indicators': asset_indicators,
+                    'signals': self.generate_signals(asset_indicators, current_price),
+                    'analysis_time': analysis_time
+                }
+            
+            logger.info(f"批量技术指标分析完成: {len(symbols)}个币种 × {prices.shape[1]}个数据点")
+            return results
+            
+        except Exception as e:
+            logger.error(f"批量技术指标分析失败: {e}")
+            return {'error': f'批量技术分析失败: {str(e)}'}
+    
+    def analyze_market_data_batch(self, market_data_by_symbol: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """批量分析多个币种的market_data（数据点数相同的币种合并为一个矩阵计算）"""
+        groups: Dict[int, List[str]] = {}
+        for symbol, market_data in market_data_by_symbol.items():
+            groups.setdefault(len(market_data.get('prices', [])), []).append(symbol)
+        
+        results = {}
+        for length, symbols in groups.items():
+            if length == 0:
+                for symbol in symbols:
+                    results[symbol] = {'error': '没有价格数据'}
+                continue
+            
+            market_matrix = {
+                field: np.array([market_data_by_symbol[symbol][field] for symbol in symbols], dtype=np.float64)
+                for field in ('prices', 'high', 'low', 'volumes')
+                if all(len(market_data_by_symbol[symbol].get(field, [])) == length for symbol in symbols)
+            }
+            batch = self.analyze_batch(market_matrix, symbols)
+            if 'error' in batch:
+                for symbol in symbols:
+                    results[symbol] = batch
+            else:
+                results.update(batch)
+        
+        return results
+
+
+def _select_row(indicators: Dict[str, Any], row: int, as_list: bool = False) -> Dict[str, Any]:
+    """取出单个币种的指标（二维结果取行视图，as_list为True时转换为列表；一维结果为所有币种共用）"""
+    selected = {}
+    for key, value in indicators.items():
+        if isinstance(value, dict):
+            selected[key] = _select_row(value, row, as_list)
+        elif np.ndim(value) == 2:
+            selected[key] = value[row].tolist() if as_list else value[row]
+        else:
+            selected[key] = value
+    return selected
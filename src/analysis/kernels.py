@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+向量化指标计算内核 - 快乐魔仙数字货币分析技能
+NumPy数组后端：累积和、递推滤波与数组运算，供TechnicalIndicators调用
+所有函数沿最后一个轴（时间轴）计算，一维为单个币种，二维（币种×时间）为批量计算
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+# EMA分块闭式解时允许的最大缩放指数（beta**-m <= e**_EMA_SCALE_LIMIT，避免溢出）
+_EMA_SCALE_LIMIT = 200 * np.log(10)
+
+
+def as_array(values) -> np.ndarray:
+    """转换为float64数组（已是float64数组时不复制）"""
+    return np.asarray(values, dtype=np.float64)
+
+
+def sma(values, period: int) -> np.ndarray:
+    """简单移动平均（累积和实现，O(n)），数据不足的位置为0，包含NaN的窗口为NaN"""
+    csum, nan_count = nan_cumsum(values)
+    return sma_from_cumsum(csum, period, nan_count)
+
+
+def nan_cumsum(values) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    累积和（NaN按0累加）及NaN个数的累积和（没有NaN时为None）
+
+    直接累加时一个NaN会使之后所有的和都变为NaN，分开计数后只有包含NaN的窗口受影响。
+    """
+    x = as_array(values)
+    missing = np.isnan(x)
+    if not missing.any():
+        return np.cumsum(x, axis=-1), None
+    return np.cumsum(np.where(missing, 0.0, x), axis=-1), np.cumsum(missing, axis=-1)
+
+
+def sma_from_cumsum(csum: np.ndarray, period: int, nan_count: Optional[np.ndarray] = None) -> np.ndarray:
+    """由累积和计算简单移动平均（多个周期可共用同一累积和；nan_count见nan_cumsum）"""
+    n = csum.shape[-1]
+    out = np.zeros(csum.shape)
+    if period <= 0 or n < period:
+        return out
+
+    out[..., period - 1] = csum[..., period - 1] / period
+    out[..., period:] = (csum[..., period:] - csum[..., :-period]) / period
+    if nan_count is not None:
+        window_nans = nan_count[..., period - 1:].copy()
+        window_nans[..., 1:] -= nan_count[..., :-period]
+        out[..., period - 1:][window_nans > 0] = np.nan
+    return out
+
+
+def ema(values, alpha: float) -> np.ndarray:
+    """
+    指数移动平均递推滤波 e[i] = alpha * x[i] + (1 - alpha) * e[i-1]，以x[0]为初值
+
+    按块展开为闭式解后用累积和计算，块长度保证缩放因子不溢出，
+    因此Python层只循环 n / 块长 次。
+    """
+    x = as_array(values)
+    n = x.shape[-1]
+    out = np.empty(x.shape)
+    if n == 0:
+        return out
+
+    beta = 1.0 - alpha
+    if beta <= 0.0:
+        out[...] = x
+        return out
+
+    block = int(min(max(1.0, np.floor(_EMA_SCALE_LIMIT / -np.log(beta))), n))
+    powers = beta ** np.arange(1, block + 1)
+
+    out[..., 0] = x[..., 0]
+    prev = x[..., :1]
+    start = 1
+    while start < n:
+        stop = min(start + block, n)
+        p = powers[:stop - start]
+        # e[j] = beta^(j+1) * (prev + alpha * sum_{i<=j} x[i] / beta^(i+1))
+        out[..., start:stop] = p * (prev + alpha * np.cumsum(x[..., start:stop] / p, axis=-1))
+        prev = out[..., stop - 1:stop]
+        start = stop
+
+    return out
+
+
+def ema_period(values, period: int) -> np.ndarray:
+    """按周期计算EMA（平滑系数 2 / (period + 1)）"""
+    return ema(values, 2.0 / (period + 1))
+
+
+def macd(prices, fast: int, slow: int, signal: int):
+    """计算MACD线、信号线和柱状图"""
+    x = as_array(prices)
+    macd_line = ema_period(x, fast) - ema_period(x, slow)
+    signal_line = ema_period(macd_line, signal)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def _rolling_extreme(values, window: int, reduce, fill: float) -> np.ndarray:
+    """
+    滚动极值（van Herk/Gil-Werman分块算法，O(n)，与窗口长度无关）
+
+    序列前补window-1个填充值后按窗口长度分块，块内分别计算前缀和后缀极值，
+    以i结尾的窗口极值 = reduce(该窗口起点的后缀极值, 终点的前缀极值)。
+    前window-1个位置即为已有数据的极值。
+    """
+    x = as_array(values)
+    n = x.shape[-1]
+    if n == 0 or window <= 1:
+        return x.copy()
+
+    lead = x.shape[:-1]
+    total = n + window - 1
+    blocks = -(-total // window)
+    padded = np.full(lead + (blocks * window,), fill)
+    padded[..., window - 1:total] = x
+    grid = padded.reshape(lead + (blocks, window))
+
+    prefix = reduce.accumulate(grid, axis=-1).reshape(padded.shape)
+    suffix = reduce.accumulate(grid[..., ::-1], axis=-1)[..., ::-1].reshape(padded.shape)
+    return reduce(suffix[..., :n], prefix[..., window - 1:total])
+
+
+def rolling_max(values, window: int) -> np.ndarray:
+    """滚动窗口最大值（前window-1个位置为已有数据的最大值）"""
+    return _rolling_extreme(values, window, np.maximum, -np.inf)
+
+
+def rolling_min(values, window: int) -> np.ndarray:
+    """滚动窗口最小值（前window-1个位置为已有数据的最小值）"""
+    return _rolling_extreme(values, window, np.minimum, np.inf)
+
+
+def high_low_range(high, low, period: int):
+    """一次线性扫描得到整个最高价/最低价序列，供随机指标族（KDJ/SKDJ）共用"""
+    return rolling_max(high, period), rolling_min(low, period)
+
+
+def kdj(high, low, close, period: int, extremes=None):
+    """
+    计算KDJ的K、D、J序列
+
+    RSV基于最近period根K线的最高/最低价，K、D为1/3平滑系数的递推平滑，
+    数据不足的位置填充50。extremes可传入high_low_range的结果以复用。
+    """
+    c = as_array(close)
+    n = c.shape[-1]
+    k_values = np.full(c.shape, 50.0)
+    d_values = np.full(c.shape, 50.0)
+    if n < period:
+        return k_values, d_values, k_values.copy()
+
+    highest_high, lowest_low = extremes if extremes is not None else high_low_range(high, low, period)
+    highest_high = highest_high[..., period - 1:n]
+    lowest_low = lowest_low[..., period - 1:n]
+    price_range = highest_high - lowest_low
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsv = np.where(price_range == 0, 50.0,
+                       (c[..., period - 1:] - lowest_low) / price_range * 100)
+
+    k_values[..., period - 1:] = ema(rsv, 1.0 / 3)
+    d_values[..., period - 1:] = ema(k_values[..., period - 1:], 1.0 / 3)
+    return k_values, d_values, 3 * k_values - 2 * d_values
+
+
+def obv(close, volume) -> np.ndarray:
+    """计算OBV累计值（价格上涨加成交量，下跌减成交量，持平不变）"""
+    c = as_array(close)
+    v = as_array(volume)
+    n = c.shape[-1]
+    out = np.zeros(c.shape)
+    if n > 1:
+        out[..., 1:] = np.cumsum(np.sign(np.diff(c, axis=-1)) * v[..., 1:n], axis=-1)
+    return out
+
+
+def run_length(condition) -> np.ndarray:
+    """布尔序列沿时间轴的连续为真计数（条件不满足时归零）"""
+    cond = np.asarray(condition, dtype=bool)
+    csum = np.cumsum(cond, axis=-1)
+    reset = np.maximum.accumulate(np.where(cond, 0, csum), axis=-1)
+    return csum - reset
+
+
+def _td_countdown(condition: np.ndarray, segment: np.ndarray, start: np.ndarray, countdown: int) -> np.ndarray:
+    """TD计数：从结构完成的K线起累计满足条件的K线数，达到countdown后结束"""
+    csum = np.cumsum(condition, axis=-1)
+    before = np.take_along_axis(csum - condition, start, axis=-1)
+    count = csum - before
+    live = segment & ((count < countdown) | ((count == countdown) & condition))
+    return np.where(live, count, 0)
+
+
+def td_sequential(high, low, close, setup: int = 9, countdown: int = 13, lookback: int = 4):
+    """
+    TD序列（结构 setup + 计数 countdown）
+
+    结构：收盘价连续低于(高于)lookback根之前的收盘价计为买入(卖出)结构，按1..setup循环计数；
+    计数：结构完成后，收盘价小于等于(大于等于)2根之前的最低(最高)价的K线累计计数，
+    达到countdown后结束，反向结构完成或同向结构再次完成时重新开始。
+
+    Returns:
+        buy_setup, sell_setup, buy_countdown, sell_countdown
+    """
+    c = as_array(close)
+    h = as_array(high)
+    l = as_array(low)
+    n = c.shape[-1]
+
+    buy_cond = np.zeros(c.shape, dtype=bool)
+    sell_cond = np.zeros(c.shape, dtype=bool)
+    if n > lookback:
+        buy_cond[..., lookback:] = c[..., lookback:] < c[..., :-lookback]
+        sell_cond[..., lookback:] = c[..., lookback:] > c[..., :-lookback]
+
+    buy_run = run_length(buy_cond)
+    sell_run = run_length(sell_cond)
+    buy_setup = np.where(buy_run > 0, (buy_run - 1) % setup + 1, 0)
+    sell_setup = np.where(sell_run > 0, (sell_run - 1) % setup + 1, 0)
+
+    buy_done = buy_setup == setup
+    sell_done = sell_setup == setup
+    index = np.broadcast_to(np.arange(n), c.shape)
+    start = np.maximum.accumulate(np.where(buy_done | sell_done, index, -1), axis=-1)
+    started = start >= 0
+    start = np.where(started, start, 0)
+    buy_segment = started & np.take_along_axis(buy_done, start, axis=-1)
+    sell_segment = started & np.take_along_axis(sell_done, start, axis=-1)
+
+    buy_cd_cond = np.zeros(c.shape, dtype=bool)
+    sell_cd_cond = np.zeros(c.shape, dtype=bool)
+    if n > 2:
+        buy_cd_cond[..., 2:] = c[..., 2:] <= l[..., :-2]
+        sell_cd_cond[..., 2:] = c[..., 2:] >= h[..., :-2]
+
+    return (buy_setup, sell_setup,
+            _td_countdown(buy_cd_cond, buy_segment, start, countdown),
+            _td_countdown(sell_cd_cond, sell_segment, start, countdown))
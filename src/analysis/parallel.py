@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+多进程并行分析 - 快乐魔仙数字货币分析技能
+各币种的OHLCV数组写入一块共享内存，工作进程按偏移量直接读取（不经过pickle列表），
+计算结果通过asyncio异步收集，不阻塞事件循环
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from src.analysis.indicators import TechnicalIndicators
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('prices', 'high', 'low', 'volumes')
+
+# 工作进程内的指标引擎（由进程池initializer创建，每个进程一个）
+_worker_engine = None
+
+
+def _init_worker(config: Dict[str, Any], as_list: bool):
+    """工作进程初始化"""
+    global _worker_engine
+    _worker_engine = TechnicalIndicators(config, as_list=as_list)
+
+
+def _analyze_chunk(shm_name: str, layout: Dict[str, Dict[str, Tuple[int, int]]]) -> Dict[str, Dict[str, Any]]:
+    """工作进程：从共享内存读取一组币种的数据并批量分析"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        market_data_by_symbol = {
+            symbol: {
+                field: np.ndarray((length,), dtype=np.float64, buffer=shm.buf, offset=offset)
+                for field, (offset, length) in fields.items()
+            }
+            for symbol, fields in layout.items()
+        }
+        results = _worker_engine.analyze_market_data_batch(market_data_by_symbol)
+        # 释放共享内存视图后才能关闭
+        del market_data_by_symbol
+        return results
+    finally:
+        shm.close()
+
+
+class ParallelAnalyzer:
+    """多进程技术指标分析器"""
+
+    def __init__(self, config: Dict[str, Any], workers: int = 0, as_list: bool = True):
+        """
+        初始化并行分析器
+
+        Args:
+            config: 指标参数配置（与TechnicalIndicators.config相同）
+            workers: 工作进程数，0表示使用全部CPU核心
+            as_list: 指标结果是否转换为列表（与TechnicalIndicators一致）
+        """
+        self.config = config
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.as_list = as_list
+        self.executor = None
+        logger.info(f"并行分析器初始化完成: {self.workers}个工作进程")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.config, self.as_list)
+            )
+        return self.executor
+
+    def _split(self, symbols: List[str]) -> List[List[str]]:
+        """把币种均分给各工作进程"""
+        chunks = min(self.workers, len(symbols))
+        return [symbols[i::chunks] for i in range(chunks)]
+
+    async def analyze_many(self, market_data_by_symbol: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """并行分析多个币种，返回 币种 -> analyze_all_indicators结构的结果"""
+        if not market_data_by_symbol:
+            return {}
+
+        # 计算共享内存布局
+        layout: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        offset = 0
+        for symbol, market_data in market_data_by_symbol.items():
+            layout[symbol] = {}
+            for field in FIELDS:
+                values = market_data.get(field)
+                if values is None:
+                    continue
+                layout[symbol][field] = (offset, len(values))
+                offset += len(values) * 8
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        try:
+            for symbol, fields in layout.items():
+                for field, (start, length) in fields.items():
+                    view = np.ndarray((length,), dtype=np.float64, buffer=shm.buf, offset=start)
+                    view[:] = market_data_by_symbol[symbol][field]
+                    del view
+
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            tasks = [
+                loop.run_in_executor(executor, _analyze_chunk, shm.name,
+                                     {symbol: layout[symbol] for symbol in chunk})
+                for chunk in self._split(list(layout))
+            ]
+            results = {}
+            for chunk_result in await asyncio.gather(*tasks):
+                results.update(chunk_result)
+
+            logger.info(f"并行分析完成: {len(results)}个币种，{len(tasks)}个任务")
+            return results
+
+        except Exception as e:
+            logger.error(f"并行分析失败: {e}")
+            return {symbol: {'error': f'并行分析失败: {str(e)}'} for symbol in market_data_by_symbol}
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        """关闭进程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            logger.info("并行分析进程池已关闭")
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+增量流式指标计算 - 快乐魔仙数字货币分析技能
+每根新K线只做O(1)（均摊）更新，供监控循环使用；状态可序列化并可由历史数据初始化
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingMA:
+    """增量移动平均（滑动窗口 + 运行和）"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self._since_resum = 0
+
+    def update(self, value: float, replace: bool = False) -> float:
+        """追加一个新值；replace为True时修正最后一个值（未收盘K线）"""
+        if replace and self.window:
+            self.total += value - self.window[-1]
+            self.window[-1] = value
+            return self.value
+
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+
+        # 每period次重新求和，消除浮点累积误差（均摊O(1)）
+        self._since_resum += 1
+        if self._since_resum >= self.period:
+            self.total = sum(self.window)
+            self._since_resum = 0
+        return self.value
+
+    @property
+    def value(self) -> float:
+        """当前均线值，数据不足时为0"""
+        if len(self.window) < self.period:
+            return 0.0
+        return self.total / self.period
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'period': self.period, 'window': list(self.window)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingMA':
+        ma = cls(data['period'])
+        ma.window.extend(data['window'])
+        ma.total = sum(ma.window)
+        return ma
+
+
+class StreamingEMA:
+    """增量指数移动平均"""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.prev = None    # 最后一根K线之前的EMA
+        self.value = None
+
+    @classmethod
+    def from_period(cls, period: int) -> 'StreamingEMA':
+        return cls(2.0 / (period + 1))
+
+    def update(self, value: float, replace: bool = False) -> float:
+        """追加一个新值；replace为True时修正最后一个值"""
+        if not replace or self.value is None:
+            self.prev = self.value
+        base = self.prev
+        self.value = value if base is None else base + self.alpha * (value - base)
+        return self.value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'alpha': self.alpha, 'prev': self.prev, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingEMA':
+        ema = cls(data['alpha'])
+        ema.prev = data['prev']
+        ema.value = data['value']
+        return ema
+
+
+class StreamingMACD:
+    """增量MACD"""
+
+    def __init__(self, fast: int = 6, slow: int = 7, signal: int = 6):
+        self.params = [fast, slow, signal]
+        self.fast = StreamingEMA.from_period(fast)
+        self.slow = StreamingEMA.from_period(slow)
+        self.signal = StreamingEMA.from_period(signal)
+        self.count = 0
+
+    def update(self, price: float, replace: bool = False) -> Dict[str, float]:
+        if not replace or self.count == 0:
+            self.count += 1
+        macd_value = self.fast.update(price, replace) - self.slow.update(price, replace)
+        self.signal.update(macd_value, replace)
+        return self.value
+
+    @property
+    def value(self) -> Dict[str, float]:
+        """当前MACD值，数据不足时为0"""
+        if self.count < max(self.params):
+            return {'macd': 0.0, 'signal': 0.0, 'histogram': 0.0}
+        macd_value = self.fast.value - self.slow.value
+        return {
+            'macd': macd_value,
+            'signal': self.signal.value,
+            'histogram': macd_value - self.signal.value
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'params': self.params,
+            'count': self.count,
+            'fast': self.fast.to_dict(),
+            'slow': self.slow.to_dict(),
+            'signal': self.signal.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingMACD':
+        macd = cls(*data['params'])
+        macd.count = data['count']
+        macd.fast = StreamingEMA.from_dict(data['fast'])
+        macd.slow = StreamingEMA.from_dict(data['slow'])
+        macd.signal = StreamingEMA.from_dict(data['signal'])
+        return macd
+
+
+class RollingExtremum:
+    """单调队列滚动极值（追加均摊O(1)；修正最后一个值时按窗口重建，O(period)）"""
+
+    def __init__(self, period: int, mode: str = 'max'):
+        self.period = period
+        self.mode = mode
+        self.window = deque(maxlen=period)
+        self.queue = deque()    # (序号, 值)，按mode单调
+        self.index = -1
+
+    def _dominates(self, new: float, old: float) -> bool:
+        return new >= old if self.mode == 'max' else new <= old
+
+    def _push(self, index: int, value: float):
+        while self.queue and self._dominates(value, self.queue[-1][1]):
+            self.queue.pop()
+        self.queue.append((index, value))
+        while self.queue[0][0] <= index - self.period:
+            self.queue.popleft()
+
+    def _rebuild(self):
+        self.queue.clear()
+        first = self.index - len(self.window) + 1
+        for offset, value in enumerate(self.window):
+            self._push(first + offset, value)
+
+    def update(self, value: float, replace: bool = False) -> float:
+        if replace and self.window:
+            self.window[-1] = value
+            self._rebuild()
+        else:
+            self.index += 1
+            self.window.append(value)
+            self._push(self.index, value)
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.queue[0][1] if self.queue else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'period': self.period, 'mode': self.mode, 'index': self.index, 'window': list(self.window)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RollingExtremum':
+        extremum = cls(data['period'], data['mode'])
+        extremum.index = data['index']
+        extremum.window.extend(data['window'])
+        extremum._rebuild()
+        return extremum
+
+
+class StreamingKDJ:
+    """增量KDJ"""
+
+    def __init__(self, period: int = 9):
+        self.period = period
+        self.highest = RollingExtremum(period, 'max')
+        self.lowest = RollingExtremum(period, 'min')
+        self.k = StreamingEMA(1.0 / 3)
+        self.d = StreamingEMA(1.0 / 3)
+        self.count = 0
+
+    def update(self, high: float, low: float, close: float, replace: bool = False) -> Dict[str, float]:
+        if not replace or self.count == 0:
+            self.count += 1
+            replace = False
+        highest_high = self.highest.update(high, replace)
+        lowest_low = self.lowest.update(low, replace)
+
+        if self.count >= self.period:
+            if highest_high == lowest_low:
+                rsv = 50.0
+            else:
+                rsv = (close - lowest_low) / (highest_high - lowest_low) * 100
+            k_value = self.k.update(rsv, replace)
+            self.d.update(k_value, replace)
+        return self.value
+
+    @property
+    def value(self) -> Dict[str, float]:
+        """当前KDJ值，数据不足时为50"""
+        if self.count < self.period or self.k.value is None:
+            return {'K': 50.0, 'D': 50.0, 'J': 50.0}
+        return {'K': self.k.value, 'D': self.d.value, 'J': 3 * self.k.value - 2 * self.d.value}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'period': self.period,
+            'count': self.count,
+            'highest': self.highest.to_dict(),
+            'lowest': self.lowest.to_dict(),
+            'k': self.k.to_dict(),
+            'd': self.d.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingKDJ':
+        kdj = cls(data['period'])
+        kdj.count = data['count']
+        kdj.highest = RollingExtremum.from_dict(data['highest'])
+        kdj.lowest = RollingExtremum.from_dict(data['lowest'])
+        kdj.k = StreamingEMA.from_dict(data['k'])
+        kdj.d = StreamingEMA.from_dict(data['d'])
+        return kdj
+
+
+class StreamingSKDJ:
+    """增量SKDJ（对KDJ的K、D做移动平均，KDJ由外部传入以便与KDJ指标共用）"""
+
+    def __init__(self, period: int = 9, k_period: int = 3, d_period: int = 3):
+        self.period = period
+        self.k_ma = StreamingMA(k_period)
+        self.d_ma = StreamingMA(d_period)
+
+    def update(self, kdj: StreamingKDJ, replace: bool = False) -> Dict[str, float]:
+        k_value, d_value = kdj.value['K'], kdj.value['D']
+        self.k_ma.update(k_value, replace)
+        self.d_ma.update(d_value, replace)
+        return self.value_for(kdj)
+
+    def value_for(self, kdj: StreamingKDJ) -> Dict[str, float]:
+        """当前SKDJ值，数据不足时为0"""
+        if kdj.count < self.period:
+            return {'SK': 0.0, 'SD': 0.0, 'SJ': 0.0}
+        sk, sd = self.k_ma.value, self.d_ma.value
+        return {'SK': sk, 'SD': sd, 'SJ': 3 * sk - 2 * sd}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'period': self.period, 'k_ma': self.k_ma.to_dict(), 'd_ma': self.d_ma.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingSKDJ':
+        skdj = cls(data['period'])
+        skdj.k_ma = StreamingMA.from_dict(data['k_ma'])
+        skdj.d_ma = StreamingMA.from_dict(data['d_ma'])
+        return skdj
+
+
+class StreamingOBV:
+    """增量OBV（含OBV的移动平均）"""
+
+    def __init__(self, period: int = 30):
+        self.period = period
+        self.ma = StreamingMA(period)
+        self.obv = 0.0
+        self.prev_obv = 0.0
+        self.prev_close = None   # 最后一根K线之前的收盘价
+        self.last_close = None
+        self.count = 0
+
+    def update(self, close: float, volume: float, replace: bool = False) -> float:
+        if not replace or self.count == 0:
+            self.count += 1
+            self.prev_close = self.last_close
+            self.prev_obv = self.obv
+            replace = False
+
+        if self.prev_close is None:
+            self.obv = 0.0
+        elif close > self.prev_close:
+            self.obv = self.prev_obv + volume
+        elif close < self.prev_close:
+            self.obv = self.prev_obv - volume
+        else:
+            self.obv = self.prev_obv
+        self.last_close = close
+        self.ma.update(self.obv, replace)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        """当前OBV值：数据足够时为OBV均线，否则为OBV本身"""
+        if self.count >= self.period:
+            return self.ma.value
+        return self.obv
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'period': self.period,
+            'count': self.count,
+            'obv': self.obv,
+            'prev_obv': self.prev_obv,
+            'prev_close': self.prev_close,
+            'last_close': self.last_close,
+            'ma': self.ma.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingOBV':
+        obv = cls(data['period'])
+        obv.count = data['count']
+        obv.obv = data['obv']
+        obv.prev_obv = data['prev_obv']
+        obv.prev_close = data['prev_close']
+        obv.last_close = data['last_close']
+        obv.ma = StreamingMA.from_dict(data['ma'])
+        return obv
+
+
+class StreamingTD:
+    """增量TD序列（状态只包含最近4根收盘价和2根最高/最低价，修正最后一根K线也是O(1)）"""
+
+    LOOKBACK = 4
+
+    def __init__(self, setup: int = 9, countdown: int = 13):
+        self.setup = setup
+        self.countdown = countdown
+        self.closes = deque(maxlen=self.LOOKBACK)
+        self.highs = deque(maxlen=2)
+        self.lows = deque(maxlen=2)
+        self.buy_run = 0
+        self.sell_run = 0
+        self.segment = None      # 当前计数方向：'buy'/'sell'/None
+        self.segment_count = 0
+        self.value = {'buy_setup': 0, 'sell_setup': 0, 'buy_countdown': 0, 'sell_countdown': 0}
+        self._before_last = None  # 最后一根K线之前的状态
+
+    def _state(self) -> tuple:
+        return (list(self.closes), list(self.highs), list(self.lows),
+                self.buy_run, self.sell_run, self.segment, self.segment_count)
+
+    def _restore(self, state: tuple):
+        closes, highs, lows, self.buy_run, self.sell_run, self.segment, self.segment_count = state
+        self.closes = deque(closes, maxlen=self.LOOKBACK)
+        self.highs = deque(highs, maxlen=2)
+        self.lows = deque(lows, maxlen=2)
+
+    def update(self, high: float, low: float, close: float, replace: bool = False) -> Dict[str, int]:
+        if replace and self._before_last is not None:
+            self._restore(self._before_last)
+        else:
+            self._before_last = self._state()
+
+        full = len(self.closes) == self.LOOKBACK
+        self.buy_run = self.buy_run + 1 if full and close < self.closes[0] else 0
+        self.sell_run = self.sell_run + 1 if full and close > self.closes[0] else 0
+        buy_setup = (self.buy_run - 1) % self.setup + 1 if self.buy_run else 0
+        sell_setup = (self.sell_run - 1) % self.setup + 1 if self.sell_run else 0
+
+        if buy_setup == self.setup:
+            self.segment, self.segment_count = 'buy', 0
+        elif sell_setup == self.setup:
+            self.segment, self.segment_count = 'sell', 0
+
+        ready = len(self.lows) == 2
+        qualified = False
+        if self.segment == 'buy':
+            qualified = ready and close <= self.lows[0]
+        elif self.segment == 'sell':
+            qualified = ready and close >= self.highs[0]
+        self.segment_count += int(qualified)
+
+        count = self.segment_count
+        live = self.segment is not None and (count < self.countdown or (count == self.countdown and qualified))
+        self.value = {
+            'buy_setup': buy_setup,
+            'sell_setup': sell_setup,
+            'buy_countdown': count if live and self.segment == 'buy' else 0,
+            'sell_countdown': count if live and self.segment == 'sell' else 0
+        }
+
+        self.closes.append(close)
+        self.highs.append(high)
+        self.lows.append(low)
+        return self.value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'setup': self.setup,
+            'countdown': self.countdown,
+            'state': self._state(),
+            'before_last': self._before_last,
+            'value': self.value
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingTD':
+        td = cls(data['setup'], data['countdown'])
+        td._restore(tuple(data['state']))
+        td._before_last = tuple(data['before_last']) if data['before_last'] is not None else None
+        td.value = data['value']
+        return td
+
+
+class StreamingIndicatorState:
+    """
+    单个币种的增量指标状态
+
+    时间戳落在当前K线周期内的报价修正最后一根（未收盘）K线，
+    超过bar_interval后追加新K线；两种情况的更新代价都与历史长度无关。
+    """
+
+    def __init__(self, config: Dict[str, Any], bar_interval: int = 86400):
+        self.config = config
+        self.bar_interval = bar_interval
+        self.bar_start = None    # 当前K线开始时间
+        self.bar_high = None
+        self.bar_low = None
+        self.current_price = 0.0
+
+        self.ma = {period: StreamingMA(period) for period in config['ma_periods']}
+        self.macd = StreamingMACD(*config['macd_params'])
+        kdj_period, skdj_period = config['kdj_params'][0], config['skdj_params'][0]
+        self.kdj = {period: StreamingKDJ(period) for period in {kdj_period, skdj_period}}
+        self.skdj = StreamingSKDJ(*config['skdj_params'])
+        self.obv = StreamingOBV(config['obv_period'])
+        self.td = StreamingTD(*config['td_markers']) if config.get('td_markers') else None
+
+    def seed(self, market_data: Dict[str, Any], last_timestamp: Optional[float] = None) -> 'StreamingIndicatorState':
+        """
+        用历史数据初始化状态（最后一个数据点视为当前未收盘K线）
+
+        当前K线的开始时间(秒)缺省取序列最后一个时间戳（没有时间戳时取当前时间）所在周期的起点，
+        日线数据的最后一个点是实时点，对齐后与批量分析的日线边界(UTC 0点)一致。
+        """
+        prices = np.asarray(market_data.get('prices', []), dtype=np.float64).tolist()
+        high_prices = np.asarray(market_data.get('high', prices), dtype=np.float64).tolist()
+        low_prices = np.asarray(market_data.get('low', prices), dtype=np.float64).tolist()
+        volumes = np.asarray(market_data.get('volumes', []), dtype=np.float64).tolist()
+
+        for i in range(len(prices)):
+            volume = volumes[i] if i < len(volumes) else 0.0
+            self._apply(prices[i], high_prices[i], low_prices[i], volume, False)
+
+        if last_timestamp is None:
+            timestamps = market_data.get('timestamps')
+            last_timestamp = timestamps[-1] / 1000 if timestamps is not None and len(timestamps) else time.time()
+        self.bar_start = float(last_timestamp - last_timestamp % self.bar_interval)
+        logger.debug(f"增量指标状态初始化完成: {len(prices)}根K线")
+        return self
+
+    def update(self, price: float, volume: float = 0.0, high: Optional[float] = None,
+               low: Optional[float] = None, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """接收一个新报价并返回最新指标"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        high = price if high is None else high
+        low = price if low is None else low
+
+        replace = self.bar_start is not None and timestamp - self.bar_start < self.bar_interval
+        if replace:
+            high = max(high, self.bar_high)
+            low = min(low, self.bar_low)
+        elif self.bar_start is not None:
+            # 新K线的开始时间对齐到周期边界，报价间隔不会累积为K线偏移
+            self.bar_start = timestamp - (timestamp - self.bar_start) % self.bar_interval
+        else:
+            self.bar_start = timestamp
+
+        self._apply(price, high, low, volume, replace)
+        return self.snapshot()
+
+    def _apply(self, price: float, high: float, low: float, volume: float, replace: bool):
+        for ma in self.ma.values():
+            ma.update(price, replace)
+        self.macd.update(price, replace)
+        for kdj in self.kdj.values():
+            kdj.update(high, low, price, replace)
+        self.skdj.update(self.kdj[self.skdj.period], replace)
+        self.obv.update(price, volume, replace)
+        if self.td is not None:
+            self.td.update(high, low, price, replace)
+
+        self.bar_high = high
+        self.bar_low = low
+        self.current_price = price
+
+    def snapshot(self) -> Dict[str, Any]:
+        """最新指标值（结构与analyze_all_indicators的indicators对应，每项为最新值）"""
+        indicators = {f'MA{period}': ma.value for period, ma in self.ma.items()}
+        indicators['MACD'] = self.macd.value
+        indicators['KDJ'] = self.kdj[self.config['kdj_params'][0]].value
+        indicators['SKDJ'] = self.skdj.value_for(self.kdj[self.skdj.period])
+        indicators['OBV'] = self.obv.value
+        if self.td is not None:
+            indicators['TD'] = dict(self.td.value)
+        return indicators
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可JSON化的字典"""
+        return {
+            'config': self.config,
+            'bar_interval': self.bar_interval,
+            'bar_start': self.bar_start,
+            'bar_high': self.bar_high,
+            'bar_low': self.bar_low,
+            'current_price': self.current_price,
+            'ma': [ma.to_dict() for ma in self.ma.values()],
+            'macd': self.macd.to_dict(),
+            'kdj': [kdj.to_dict() for kdj in self.kdj.values()],
+            'skdj': self.skdj.to_dict(),
+            'obv': self.obv.to_dict(),
+            'td': self.td.to_dict() if self.td is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingIndicatorState':
+        """从to_dict的结果恢复状态"""
+        state = cls(data['config'], data['bar_interval'])
+        state.bar_start = data['bar_start']
+        state.bar_high = data['bar_high']
+        state.bar_low = data['bar_low']
+        state.current_price = data['current_price']
+        state.ma = {item['period']: StreamingMA.from_dict(item) for item in data['ma']}
+        state.macd = StreamingMACD.from_dict(data['macd'])
+        state.kdj = {item['period']: StreamingKDJ.from_dict(item) for item in data['kdj']}
+        state.skdj = StreamingSKDJ.from_dict(data['skdj'])
+        state.obv = StreamingOBV.from_dict(data['obv'])
+        state.td = StreamingTD.from_dict(data['td']) if data.get('td') else None
+        return state
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+指标参数扫描 - 快乐魔仙数字货币分析技能
+一次向量化计算整个参数网格，结果按参数索引组织为数组（参数轴在前，时间轴在最后）；
+同一周期的EMA、滚动极值等中间结果通过IndicatorGraph在所有组合间共用
+"""
+
+import logging
+from typing import Dict, Any, Sequence
+
+import numpy as np
+
+from src.analysis import kernels
+from src.analysis.graph import IndicatorGraph
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_ma(graph: IndicatorGraph, periods: Sequence[int]) -> Dict[str, Any]:
+    """MA参数扫描，结果形状 (周期数, ..., 时间)"""
+    return {
+        'params': {'period': list(periods)},
+        'MA': np.stack([graph.sma('close', period) for period in periods])
+    }
+
+
+def sweep_macd(graph: IndicatorGraph, fast: Sequence[int], slow: Sequence[int],
+               signal: Sequence[int]) -> Dict[str, Any]:
+    """
+    MACD参数扫描
+
+    所有(fast, slow)组合共用各周期EMA，每个signal周期对全部MACD线一次计算。
+    macd形状 (fast, slow, ..., 时间)，signal/histogram形状 (fast, slow, signal, ..., 时间)。
+    """
+    fast_ema = np.stack([graph.ema('close', period) for period in fast])
+    slow_ema = np.stack([graph.ema('close', period) for period in slow])
+    macd_line = fast_ema[:, None] - slow_ema[None, :]
+
+    signal_line = np.stack([kernels.ema_period(macd_line, period) for period in signal], axis=2)
+    return {
+        'params': {'fast': list(fast), 'slow': list(slow), 'signal': list(signal)},
+        'macd': macd_line,
+        'signal': signal_line,
+        'histogram': macd_line[:, :, None] - signal_line
+    }
+
+
+def sweep_kdj(graph: IndicatorGraph, periods: Sequence[int]) -> Dict[str, Any]:
+    """KDJ参数扫描，结果形状 (周期数, ..., 时间)"""
+    series = [graph.kdj(period) for period in periods]
+    return {
+        'params': {'period': list(periods)},
+        'K': np.stack([item[0] for item in series]),
+        'D': np.stack([item[1] for item in series]),
+        'J': np.stack([item[2] for item in series])
+    }
+
+
+def sweep_skdj(graph: IndicatorGraph, periods: Sequence[int], k_periods: Sequence[int],
+               d_periods: Sequence[int]) -> Dict[str, Any]:
+    """
+    SKDJ参数扫描（同一period的KDJ基础序列在所有平滑周期间共用）
+
+    SK形状 (period, k_period, ..., 时间)，SD形状 (period, d_period, ..., 时间)，
+    SJ形状 (period, k_period, d_period, ..., 时间)。
+    """
+    sk = np.stack([np.stack([graph.sma(('kdj_k', period), k) for k in k_periods]) for period in periods])
+    sd = np.stack([np.stack([graph.sma(('kdj_d', period), d) for d in d_periods]) for period in periods])
+    return {
+        'params': {'period': list(periods), 'k_period': list(k_periods), 'd_period': list(d_periods)},
+        'SK': sk,
+        'SD': sd,
+        'SJ': 3 * sk[:, :, None] - 2 * sd[:, None, :]
+    }
+
+
+def sweep_obv(graph: IndicatorGraph, periods: Sequence[int]) -> Dict[str, Any]:
+    """OBV均线参数扫描，结果形状 (周期数, ..., 时间)"""
+    return {
+        'params': {'period': list(periods)},
+        'OBV': np.stack([graph.sma(('obv',), period) for period in periods])
+    }
+
+
+SWEEPS = {
+    'ma': sweep_ma,
+    'macd': sweep_macd,
+    'kdj': sweep_kdj,
+    'skdj': sweep_skdj,
+    'obv': sweep_obv
+}
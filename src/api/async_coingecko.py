@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+CoinGecko异步API客户端 - 快乐魔仙数字货币分析技能
+基于aiohttp连接池（keep-alive复用连接），HTTP请求不再阻塞事件循环，多个请求可同时进行；
+短时间窗口内的get_price调用自动合并为批量/simple/price请求；所有请求经令牌桶限流；
+缓存过期不久的数据先返回、在后台刷新（stale-while-revalidate），热点键在到期前提前刷新；
+同一缓存键同时只有一个请求在进行（single-flight）；主数据源超过其p95响应时间仍未返回时
+向备用数据源发出对冲请求，取先返回的结果，连续失败的数据源被熔断
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Any, Optional
+
+import aiohttp
+
+from src.api.coingecko import CoinGeckoBase, Endpoint
+from src.api.decode import loads
+from src.api.sources import DataSource
+from src.data.ohlcv import OHLCVSeries
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCoinGeckoClient(CoinGeckoBase):
+    """CoinGecko API客户端（异步，接口与CoinGeckoClient相同）"""
+
+    def __init__(self, *args, max_connections: int = 10, keepalive_timeout: float = 30,
+                 price_batch_window: float = 0.05, **kwargs):
+        """
+        初始化异步客户端
+
+        Args:
+            *args/**kwargs: 与CoinGeckoClient相同的参数（api_key、cache_ttl、plan、cache_ttls等）
+            max_connections: 连接池最大并发连接数
+            keepalive_timeout: 空闲连接保持时间(秒)
+            price_batch_window: get_price合并窗口(秒)，窗口内的调用合并为一次批量请求
+        """
+        super().__init__(*args, **kwargs)
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.price_batch_window = price_batch_window
+        self.session = None
+        self.pending_prices: Dict[str, Dict[str, asyncio.Future]] = {}  # 计价货币组 -> 币种 -> 等待结果
+        self.background_tasks = set()  # 持有后台任务的引用，避免被垃圾回收
+        self.inflight: Dict[str, asyncio.Future] = {}  # 缓存键 -> 正在进行的获取
+        self.purge_task = None
+
+        logger.info("CoinGecko异步客户端初始化完成")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取连接池会话（首次使用时在当前事件循环中创建）"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        if self.purge_task is None or self.purge_task.done():
+            self.purge_task = self._spawn(self._purge_cache_loop())
+        return self.session
+
+    async def _purge_cache_loop(self):
+        """后台定期清理过期缓存"""
+        while True:
+            await asyncio.sleep(self.cache.purge_interval)
+            self.cache.purge_expired()
+
+    def _spawn(self, coroutine) -> asyncio.Task:
+        """启动后台任务"""
+        task = asyncio.create_task(coroutine)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+    async def _call(self, endpoint: Endpoint) -> Any:
+        """执行一次API调用（带缓存），失败时返回包含error的字典"""
+        if not endpoint.cache_key:
+            return await self._fetch(endpoint)
+        cached, state = self.cache.lookup(endpoint.cache_key)
+        if state is not None:
+            logger.debug(f"使用缓存数据: {endpoint.cache_key}（{state}）")
+            if state == 'stale' or self.cache.needs_refresh(endpoint.cache_key):
+                self._revalidate(endpoint)
+            return cached
+        # shield：某个调用方被取消时不影响等待同一结果的其他调用方
+        return await asyncio.shield(self._single_flight(endpoint))
+
+    def _single_flight(self, endpoint: Endpoint) -> asyncio.Future:
+        """
+        同一缓存键同时只发出一个获取：第一个调用方启动获取任务，之后的调用方等待同一任务，
+        获取失败时所有调用方得到同一个错误结果
+        """
+        flight = self.inflight.get(endpoint.cache_key)
+        if flight is None:
+            flight = self.inflight[endpoint.cache_key] = self._spawn(self._fetch(endpoint))
+            flight.add_done_callback(lambda _: self.inflight.pop(endpoint.cache_key, None))
+        else:
+            logger.debug(f"等待进行中的请求: {endpoint.cache_key}")
+        return flight
+
+    def _revalidate(self, endpoint: Endpoint):
+        """在后台重新获取缓存键的数据（已有获取在进行时不重复发出）"""
+        if endpoint.cache_key not in self.inflight:
+            logger.debug(f"后台刷新缓存: {endpoint.cache_key}")
+            self._single_flight(endpoint)
+
+    async def _fetch(self, endpoint: Endpoint) -> Any:
+        """从磁盘缓存或网络获取并解析数据，成功时写入缓存"""
+        data, disk_ttl = self._get_disk_cached(endpoint) or (None, None)
+        try:
+            if data is None:
+                data = await self._get_json(endpoint)
+            result = endpoint.parse(data)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"获取{endpoint.name}失败: {e!r}")
+            return {'error': f'API请求失败: {e!r}'}
+        except Exception as e:
+            logger.error(f"处理{endpoint.name}失败: {e}")
+            return {'error': f'数据处理失败: {str(e)}'}
+
+        self._store_result(endpoint, result, data, disk_ttl)
+        return result
+
+    async def _get_json(self, endpoint: Endpoint) -> Any:
+        """
+        对冲请求：先向第一个可用数据源请求，超过其p95响应时间仍未返回、或已经失败时，
+        向下一个数据源发出同样的请求，采用最先成功的结果并取消其余请求
+        """
+        sources = self._route()
+        if len(sources) == 1:
+            data = await self._request(sources[0], endpoint)
+            sources[0].stats['wins'] += 1
+            return data
+
+        tasks: Dict[asyncio.Task, DataSource] = {}
+
+        def launch():
+            source = sources[len(tasks)]
+            if tasks:
+                source.stats['hedged'] += 1
+                logger.debug(f"向数据源 {source.name} 发出对冲请求: {endpoint.name}")
+            tasks[asyncio.ensure_future(self._request(source, endpoint))] = source
+
+        launch()
+        error = None
+        try:
+            while True:
+                running = [task for task in tasks if not task.done()]
+                can_hedge = len(tasks) < len(sources)
+                done = set()
+                if running:
+                    delay = sources[len(tasks) - 1].hedge_delay(self.hedge_delay) if can_hedge else None
+                    done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task.exception() is None:
+                        tasks[task].stats['wins'] += 1
+                        return task.result()
+                    error = task.exception()
+                    if isinstance(error, aiohttp.ClientResponseError) and error.status < 500 and error.status != 429:
+                        raise error  # 4xx（如币种不存在）换数据源也不会成功
+
+                # 等待超时（对冲）或所有已发出的请求都失败（故障转移）时启用下一个数据源
+                if not done or all(task.done() for task in tasks):
+                    if not can_hedge:
+                        raise error
+                    launch()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _request(self, source: DataSource, endpoint: Endpoint) -> Any:
+        """经数据源的限流器发出请求，429/5xx时按Retry-After或指数退避重试"""
+        # aiohttp要求查询参数为字符串
+        params = {key: str(value) for key, value in endpoint.params.items()}
+        timeout = aiohttp.ClientTimeout(total=endpoint.timeout)
+        limiter = source.rate_limiter
+
+        try:
+            for attempt in range(limiter.max_retries + 1):
+                await limiter.acquire_async()
+                start = time.perf_counter()
+                async with self._get_session().get(f"{source.base_url}{endpoint.path}", params=params,
+                                                   headers=source.headers, timeout=timeout) as response:
+                    retry = limiter.record(response.status, response.headers.get('Retry-After'))
+                    if retry and attempt < limiter.max_retries:
+                        continue
+                    if retry:
+                        source.record_failure()
+                    else:
+                        source.record_success(time.perf_counter() - start)
+                    response.raise_for_status()
+                    return loads(await response.read())
+        except aiohttp.ClientResponseError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            source.record_failure()
+            raise
+
+    async def get_price(self, coin_id: str = 'bitcoin', currency: str = 'usd') -> Dict[str, Any]:
+        """获取当前价格（与同一窗口内的其他get_price调用合并为批量请求）"""
+        key = self._price_key(coin_id, currency)
+        cached, state = self.cache.lookup(key)
+        if state is not None:
+            if state == 'stale' or self.cache.needs_refresh(key):
+                # 旧价格先返回，新价格随下一个批量请求在后台获取
+                self._queue_price(coin_id, currency)
+            return self._price_result(cached, currency)
+
+        # shield：某个调用方被取消时不影响等待同一结果的其他调用方
+        return self._price_result(await asyncio.shield(self._queue_price(coin_id, currency)), currency)
+
+    def _queue_price(self, coin_id: str, currency: str) -> asyncio.Future:
+        """
+        把币种加入当前合并窗口，返回该币种价格的等待结果；
+        该币种已在合并窗口或进行中的批量请求里时直接返回已有的等待结果；
+        多计价货币模式下同一组计价货币的调用合并在一起，等待结果为缓存的价格值
+        """
+        key = self._price_key(coin_id, currency)
+        future = self.inflight.get(key)
+        if future is not None:
+            return future
+
+        group = ','.join(self._quote_currencies(currency))
+        pending = self.pending_prices.get(group)
+        if pending is None:
+            pending = self.pending_prices[group] = {}
+            self._spawn(self._flush_prices(group, currency))
+
+        future = self.inflight[key] = pending[coin_id] = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return future
+
+    async def _flush_prices(self, group: str, currency: str):
+        """合并窗口结束后，把积累的get_price调用按批量请求发出并把结果分发给各调用方"""
+        await asyncio.sleep(self.price_batch_window)
+        pending = self.pending_prices.pop(group, {})
+
+        async def fetch(endpoint):
+            results = {}
+            try:
+                self._store_price_batch(endpoint, await self._call(endpoint), currency, results)
+            except Exception as e:
+                logger.error(f"处理批量价格失败: {e}")
+                results = {coin_id: {'error': f'数据处理失败: {str(e)}'} for coin_id in endpoint.params['ids'].split(',')}
+            for coin_id, result in results.items():
+                if not pending[coin_id].done():
+                    pending[coin_id].set_result(result)
+
+        endpoints = self._price_batch_endpoints(list(pending), currency)
+        logger.debug(f"合并{len(pending)}个价格请求为{len(endpoints)}个批量请求")
+        try:
+            await asyncio.gather(*(fetch(endpoint) for endpoint in endpoints))
+        finally:
+            # 客户端关闭时批量请求被取消，尚未得到结果的调用方随之取消
+            for future in pending.values():
+                if not future.done():
+                    future.cancel()
+
+    async def get_prices(self, coin_ids: List[str], currency: str = 'usd') -> Dict[str, Dict[str, Any]]:
+        """批量获取多个币种的完整价格（结构与get_price相同）"""
+        results = await asyncio.gather(*(self.get_price(coin_id, currency) for coin_id in coin_ids))
+        return dict(zip(coin_ids, results))
+
+    async def get_coin_info(self, coin_id: str = 'bitcoin') -> Dict[str, Any]:
+        """获取币种信息"""
+        return await self._call(self._coin_info_endpoint(coin_id))
+
+    async def get_market_data(self, coin_id: str = 'bitcoin', days: int = 7) -> OHLCVSeries:
+        """
+        获取市场数据（用于技术分析），返回列式行情序列；失败时返回包含error的字典
+
+        已缓存同一币种更长的窗口时直接返回其最近days天的视图。
+        """
+        fetch_days = self._market_window(coin_id, days)
+        series, candles = await asyncio.gather(
+            self._call(self._market_data_endpoint(coin_id, fetch_days)),
+            self._call(self._ohlc_endpoint(coin_id, days))
+        )
+        self._record_market_window(coin_id, fetch_days, series)
+        return self._finish_market_data(coin_id, series, candles, days)
+
+    async def get_intraday_data(self, coin_id: str = 'bitcoin', timeframe: str = '1h') -> OHLCVSeries:
+        """获取日内K线（与CoinGeckoClient相同；各页请求同时进行，同一币种同一周期同时只同步一次）"""
+        key = f"intraday_{coin_id}_{timeframe}"
+        cached = self._get_cached_data(key)
+        if cached is not None:
+            return cached
+
+        flight = self.inflight.get(key)
+        if flight is None:
+            flight = self.inflight[key] = self._spawn(self._sync_intraday(coin_id, timeframe))
+            flight.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(flight)
+
+    async def _sync_intraday(self, coin_id: str, timeframe: str) -> Any:
+        """获取缺少的日内数据并摄入缓冲区"""
+        ring = self._intraday_ring(coin_id, timeframe)
+        pages = await asyncio.gather(*(self._call(endpoint) for endpoint in self._intraday_endpoints(coin_id, ring)))
+        return self._ingest_intraday(coin_id, timeframe, ring, pages)
+
+    async def get_markets(self, currency: str = 'usd', coin_ids: Optional[List[str]] = None,
+                          pages: int = 1) -> Dict[str, Dict[str, Any]]:
+        """通过/coins/markets批量获取价格快照和近7天小时级sparkline行情（各页请求同时进行，行情说明见CoinGeckoClient.get_markets）"""
+        endpoints = self._markets_endpoints(currency, coin_ids, pages)
+        results = {}
+        for markets in await asyncio.gather(*(self._call(endpoint) for endpoint in endpoints)):
+            self._store_markets(markets, currency, results)
+        return results
+
+    async def get_multiple_prices(self, coin_ids: List[str], currency: str = 'usd') -> Dict[str, Dict[str, Any]]:
+        """获取多个币种价格"""
+        return await self._call(self._multiple_prices_endpoint(coin_ids, currency))
+
+    async def check_api_status(self) -> Dict[str, Any]:
+        """检查API状态"""
+        try:
+            await self.rate_limiter.acquire_async()
+            start = time.perf_counter()
+            async with self._get_session().get(f"{self.base_url}/ping", headers=self.sources[0].headers,
+                                               timeout=aiohttp.ClientTimeout(total=5)) as response:
+                return self._status_result(response.status, time.perf_counter() - start)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return self._offline_result(e)
+
+    async def get_supported_coins(self) -> List[Dict[str, Any]]:
+        """获取支持的币种列表"""
+        result = await self._call(self._supported_coins_endpoint())
+        return [] if isinstance(result, dict) else result
+
+    async def close(self):
+        """关闭连接池并停止后台任务（等待中的get_price调用被取消）"""
+        tasks = list(self.background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.purge_task = None
+        # 合并窗口中尚未发出的价格请求
+        for pending in self.pending_prices.values():
+            for future in pending.values():
+                future.cancel()
+        self.pending_prices.clear()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            logger.info("CoinGecko异步客户端连接池已关闭")
+        self.session = None
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+            self.disk_cache = None
+
+    async def __aenter__(self) -> 'AsyncCoinGeckoClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
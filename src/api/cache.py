@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+API响应缓存 - 快乐魔仙数字货币分析技能
+按条目数和字节数限制大小的LRU缓存，不同接口使用不同的TTL，过期条目定期清理，
+长期运行的监控进程内存占用保持平稳；支持stale-while-revalidate和热点键提前刷新
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 未配置统一缓存时间时各接口的内置缓存时间(秒)，按缓存键前缀匹配
+DEFAULT_TTL = 300
+DEFAULT_TTLS = {
+    'price': 30,
+    'market': 300,
+    'ohlc': 300,
+    'intraday': 60,
+    'info': 6 * 3600,
+    'supported_coins': 24 * 3600
+}
+
+
+def estimate_size(value: Any) -> int:
+    """估算缓存值占用的字节数（NumPy数组按nbytes计算）"""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes) + sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ResponseCache:
+    """
+    LRU + TTL 响应缓存
+
+    配置了最长陈旧时间的键在TTL到期后仍保留一段时间，lookup()把它作为陈旧数据返回，
+    由调用方在后台重新获取（stale-while-revalidate）。
+    """
+
+    def __init__(self, default_ttl: Optional[float] = None, ttls: Optional[Dict[str, float]] = None,
+                 max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, purge_interval: float = 60,
+                 max_stale: Optional[Dict[str, float]] = None, hot_hits: int = 3, refresh_ahead: float = 0.2):
+        """
+        初始化缓存
+
+        Args:
+            default_ttl: 未在ttls中配置的键使用的缓存时间(秒)；为None时各接口使用DEFAULT_TTLS中的内置缓存时间
+            ttls: 缓存键前缀 -> 缓存时间(秒)
+            max_entries: 最大条目数
+            max_bytes: 最大总字节数（估算值）
+            purge_interval: 清理过期条目的间隔(秒)
+            max_stale: 缓存键前缀 -> TTL到期后仍可返回陈旧数据的最长时间(秒)，未配置为0
+            hot_hits: 命中次数达到该值的键视为热点，到期前主动刷新
+            refresh_ahead: 热点键剩余有效时间低于TTL的该比例时主动刷新
+        """
+        # 配置了统一缓存时间时，内置的各接口缓存时间不再生效，只有ttls中显式配置的接口例外
+        self.default_ttl = DEFAULT_TTL if default_ttl is None else default_ttl
+        self.ttls = {**(DEFAULT_TTLS if default_ttl is None else {}), **(ttls or {})}
+        self.max_stale = dict(max_stale or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.purge_interval = purge_interval
+        self.hot_hits = hot_hits
+        self.refresh_ahead = refresh_ahead
+
+        # 键 -> [值, 过期时间, 字节数, 陈旧数据可用截止时间, 命中次数, TTL]
+        self.entries: 'OrderedDict[str, list]' = OrderedDict()
+        self.total_bytes = 0
+        self.next_purge = time.monotonic() + purge_interval
+        self.lock = threading.RLock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    @staticmethod
+    def _match(table: Dict[str, float], key: str, default: float) -> float:
+        """按缓存键前缀查表（最长前缀匹配）"""
+        matches = [prefix for prefix in table if key.startswith(prefix)]
+        return table[max(matches, key=len)] if matches else default
+
+    def ttl_for(self, key: str) -> float:
+        """缓存键对应的TTL"""
+        return self._match(self.ttls, key, self.default_ttl)
+
+    def max_stale_for(self, key: str) -> float:
+        """缓存键TTL到期后可返回陈旧数据的最长时间"""
+        return self._match(self.max_stale, key, 0)
+
+    def lookup(self, key: str, allow_stale: bool = True) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+            allow_stale: 是否返回已过期但仍在最长陈旧时间内的数据
+
+        Returns:
+            (值, 状态)：状态为'fresh'（未过期）、'stale'（已过期但在最长陈旧时间内）或None（未命中）
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            now = time.monotonic()
+            if entry is not None and entry[3] <= now:
+                logger.debug(f"缓存过期: {key}")
+                self._remove(key)
+                self.stats['expirations'] += 1
+                entry = None
+            if entry is None or (entry[1] <= now and not allow_stale):
+                self.stats['misses'] += 1
+                return None, None
+
+            self.entries.move_to_end(key)
+            entry[4] += 1
+            if entry[1] > now:
+                self.stats['hits'] += 1
+                return entry[0], 'fresh'
+            self.stats['stale_hits'] += 1
+            return entry[0], 'stale'
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取未过期的缓存，未命中或已过期时返回None"""
+        return self.lookup(key, allow_stale=False)[0]
+
+    def is_fresh(self, key: str) -> bool:
+        """键是否有未过期的缓存（不计入命中统计，不改变淘汰顺序）"""
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def needs_refresh(self, key: str) -> bool:
+        """热点键是否即将到期、应在后台提前刷新"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[4] < self.hot_hits:
+                return False
+            return entry[1] - time.monotonic() < entry[5] * self.refresh_ahead
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        size = estimate_size(value)
+        with self.lock:
+            hits = 0
+            if key in self.entries:
+                hits = self.entries[key][4]  # 刷新后保留热度
+                self._remove(key)
+            now = time.monotonic()
+            ttl = self.ttl_for(key) if ttl is None else ttl
+            self.entries[key] = [value, now + ttl, size, now + ttl + self.max_stale_for(key), hits, ttl]
+            self.total_bytes += size
+
+            while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                evicted = next(iter(self.entries))
+                self._remove(evicted)
+                self.stats['evictions'] += 1
+                logger.debug(f"缓存淘汰: {evicted}")
+
+            # 没有后台清理任务时，写入时顺带清理
+            if now >= self.next_purge:
+                self.purge_expired()
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry[2]
+
+    def purge_expired(self) -> int:
+        """清理所有过期（且超过最长陈旧时间）的条目，返回清理数量"""
+        with self.lock:
+            now = time.monotonic()
+            expired = [key for key, entry in self.entries.items() if entry[3] <= now]
+            for key in expired:
+                self._remove(key)
+            self.stats['expirations'] += len(expired)
+            self.next_purge = now + self.purge_interval
+            if expired:
+                logger.debug(f"清理过期缓存: {len(expired)}条")
+            return len(expired)
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def metrics(self) -> Dict[str, Any]:
+        """命中/陈旧命中/未命中/淘汰/过期计数和当前占用"""
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['stale_hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': (self.stats['hits'] + self.stats['stale_hits']) / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
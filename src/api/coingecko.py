@@ -5,120 +5,289 @@ CoinGecko API客户端 - 快乐魔仙数字货币分析技能
 """
 
 import logging
+import threading
 import time
-from typing import Dict, List, Any, Optional
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Callable, NamedTuple, Tuple
+from urllib.parse import urlencode
 import requests
+import numpy as np
 from datetime import datetime, timedelta
 
+from src.api.cache import ResponseCache
+from src.api.decode import loads, pairs_to_columns, candles_to_matrix, daily_high_low, daily_points
+from src.api.disk_cache import DiskCache
+from src.api.quotes import PriceQuotes
+from src.api.rate_limit import RateLimiter
+from src.api.sources import CircuitBreaker, DataSource, auth_headers
+from src.data.ohlcv import OHLCVSeries
+from src.data.ring import OHLCVRing, parse_timeframe
+from src.data.store import ColumnStore
+
 logger = logging.getLogger(__name__)
 
-class CoinGeckoClient:
-    """CoinGecko API客户端"""
+# 批量/simple/price请求的限制：单次最多币种数、URL最大长度
+MAX_IDS_PER_REQUEST = 250
+MAX_URL_LENGTH = 2000
+
+# /coins/markets每页最多币种数
+MARKETS_PER_PAGE = 250
+
+# /coins/{id}/ohlc 支持的天数
+OHLC_DAYS = (1, 7, 14, 30, 90, 180, 365)
+
+# market_chart/range的数据粒度由时间范围决定：1天以内为5分钟，2-90天为小时；
+# 日内数据按不超过该长度的时间段分页获取
+MINUTELY_PAGE_MS = 86400000
+HOURLY_PAGE_MS = 30 * 86400000
+MAX_INTRADAY_BACKFILL_MS = 90 * 86400000
+
+
+class Endpoint(NamedTuple):
+    """一次API调用的描述（同步和异步客户端共用）"""
+    name: str                              # 日志中使用的数据名称
+    path: str                              # 相对base_url的路径
+    params: Dict[str, Any]                 # 查询参数
+    timeout: float                         # 单次请求超时(秒)
+    parse: Callable[[Any], Any]            # 响应JSON -> 结果
+    cache_key: Optional[str] = None        # 为None时不缓存
+    persist: bool = True                   # 是否写入磁盘缓存（增量请求的参数每次不同，不写入）
+
+
+class CoinGeckoBase:
+    """CoinGecko客户端公共部分：请求头、缓存、各接口的参数和响应解析"""
     
-    def __init__(self, api_key: str = None, cache_ttl: int = 300):
-        """初始化CoinGecko客户端"""
-        self.base_url = "https://api.coingecko.com/api/v3"
+    def __init__(self, api_key: str = None, cache_ttl: int = None, price_dtype: str = 'float64',
+                 plan: str = None, rate_limit: float = None, max_retries: int = 3,
+                 cache_ttls: Dict[str, float] = None, cache_max_entries: int = 1024,
+                 cache_max_bytes: int = 64 * 1024 * 1024, disk_cache_path: str = None,
+                 incremental_sync: bool = False, history_store_path: str = None,
+                 cache_max_stale: Dict[str, float] = None, secondary_sources: List[Dict[str, Any]] = None,
+                 hedge_delay: float = 1.0, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 vs_currencies: List[str] = None, intraday_capacity: int = 500):
+        """
+        初始化CoinGecko客户端
+        
+        Args:
+            api_key: 可选API密钥
+            cache_ttl: 未在cache_ttls中配置的接口的缓存时间(秒)，缺省时各接口使用内置缓存时间
+            price_dtype: 行情序列价格列类型(float64/float32)
+            plan: 套餐(public/demo/pro)，缺省时有密钥为demo、无密钥为public
+            rate_limit: 每分钟请求数，缺省使用套餐速率
+            max_retries: 429/5xx时的最大重试次数
+            cache_ttls: 各接口缓存时间(秒)，键为缓存键前缀（price/market/ohlc/intraday/info/supported_coins）
+            cache_max_entries: 缓存最大条目数
+            cache_max_bytes: 缓存最大字节数
+            disk_cache_path: SQLite磁盘缓存路径，为None时不启用持久化缓存
+            incremental_sync: 市场数据缓存过期后只通过market_chart/range获取新数据点
+            history_store_path: 本地列式行情存储目录，增量同步的历史持久化到其中
+            cache_max_stale: 各接口TTL到期后仍可先返回旧数据、再在后台刷新的最长时间(秒)（仅异步客户端）
+            secondary_sources: 备用数据源配置（兼容CoinGecko接口的镜像/代理），按优先级排列
+            hedge_delay: 主数据源响应时间样本不足时，发出对冲请求前的等待时间(秒)
+            failure_threshold: 数据源连续失败多少次后熔断
+            reset_timeout: 熔断后多久重新尝试该数据源(秒)
+            vs_currencies: 计价货币；配置多个时，其中任一货币的价格请求一次取回全部，每个币种缓存一条记录
+            intraday_capacity: 日内K线缓冲区容量（每个币种每个周期最多保存的K线数）
+        """
+        self.plan = plan or ('demo' if api_key else 'public')
         self.api_key = api_key
         self.cache_ttl = cache_ttl  # 缓存时间(秒)
-        self.cache = {}
-        self.session = requests.Session()
+        self.price_dtype = np.dtype(price_dtype)  # 行情序列价格列类型(float64/float32)
+        self.cache = ResponseCache(cache_ttl, cache_ttls, cache_max_entries, cache_max_bytes,
+                                   max_stale=cache_max_stale)
+        self.disk_cache = DiskCache(disk_cache_path) if disk_cache_path else None
+        self.incremental_sync = incremental_sync
+        self.histories: Dict[str, OHLCVSeries] = {}  # 增量同步模式下各币种的本地历史
+        self.market_windows: Dict[str, int] = {}  # 各币种已缓存的最长市场数据窗口(天)
+        self.intraday_capacity = intraday_capacity
+        self.intraday_buffers: Dict[str, OHLCVRing] = {}  # intraday_{币种}_{周期} -> K线环形缓冲区
+        self.history_store = ColumnStore(history_store_path) if history_store_path else None
+        self.vs_currencies = tuple(currency.lower() for currency in vs_currencies or ['usd'])
         
-        # 设置请求头
-        self.session.headers.update({
+        # 所有数据源共用的请求头（API密钥只发给对应的数据源）
+        self.headers = {
             'User-Agent': 'HappyFairyCryptoAnalysis/1.0.0',
             'Accept': 'application/json'
-        })
+        }
         
-        if api_key:
-            self.session.headers.update({'x-cg-demo-api-key': api_key})
+        # 主数据源的限流器
+        self.rate_limiter = RateLimiter(self.plan, rate_limit, max_retries=max_retries)
         
-        logger.info("CoinGecko客户端初始化完成")
+        # 数据源：CoinGecko主站在前，备用数据源按配置顺序在后
+        self.hedge_delay = hedge_delay
+        self.sources = [DataSource(
+            'coingecko',
+            "https://pro-api.coingecko.com/api/v3" if self.plan == 'pro' else "https://api.coingecko.com/api/v3",
+            auth_headers(self.plan, api_key),
+            self.rate_limiter,
+            CircuitBreaker(failure_threshold, reset_timeout)
+        )] + [DataSource.from_config(config, failure_threshold, reset_timeout) for config in secondary_sources or []]
+    
+    @property
+    def base_url(self) -> str:
+        """主数据源地址"""
+        return self.sources[0].base_url
+    
+    @base_url.setter
+    def base_url(self, value: str):
+        self.sources[0].base_url = value.rstrip('/')
+    
+    def _route(self) -> List[DataSource]:
+        """本次请求可用的数据源（跳过熔断中的数据源；全部熔断时仍尝试主数据源）"""
+        return [source for source in self.sources if source.breaker.allow()] or self.sources[:1]
+    
+    def get_rate_limit_usage(self) -> Dict[str, Any]:
+        """当前API配额使用情况"""
+        return self.rate_limiter.usage()
+    
+    def get_source_metrics(self) -> List[Dict[str, Any]]:
+        """各数据源的请求/失败/对冲/胜出计数、熔断状态和响应时间p95"""
+        return [source.metrics() for source in self.sources]
     
     def _get_cached_data(self, key: str) -> Optional[Any]:
         """获取缓存数据"""
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if time.time() - timestamp < self.cache_ttl:
-                logger.debug(f"使用缓存数据: {key}")
-                return data
-            else:
-                logger.debug(f"缓存过期: {key}")
-                del self.cache[key]
-        return None
+        data = self.cache.get(key)
+        if data is not None:
+            logger.debug(f"使用缓存数据: {key}")
+        return data
     
     def _set_cached_data(self, key: str, data: Any):
         """设置缓存数据"""
-        self.cache[key] = (data, time.time())
+        self.cache.set(key, data)
         logger.debug(f"设置缓存数据: {key}")
     
-    def get_price(self, coin_id: str = 'bitcoin', currency: str = 'usd') -> Dict[str, Any]:
-        """获取当前价格"""
-        cache_key = f"price_{coin_id}_{currency}"
-        cached = self._get_cached_data(cache_key)
-        if cached:
-            return cached
+    def _get_disk_cached(self, endpoint: Endpoint) -> Optional[Any]:
+        """从磁盘缓存读取原始响应（只缓存有cache_key的接口）"""
+        if self.disk_cache is None or not endpoint.cache_key or not endpoint.persist:
+            return None
+        return self.disk_cache.get(endpoint.path, endpoint.params)
+    
+    def _set_disk_cached(self, endpoint: Endpoint, data: Any):
+        """原始响应写入磁盘缓存（TTL与内存缓存相同）"""
+        if self.disk_cache is not None and endpoint.cache_key and endpoint.persist:
+            self.disk_cache.set(endpoint.path, endpoint.params, data, self.cache.ttl_for(endpoint.cache_key))
+    
+    def _store_result(self, endpoint: Endpoint, result: Any, data: Any, disk_ttl: Optional[float]):
+        """
+        解析成功的结果写入内存缓存；网络获取的原始响应同时写入磁盘缓存
         
-        try:
-            url = f"{self.base_url}/simple/price"
-            params = {
-                'ids': coin_id,
-                'vs_currencies': currency,
-                'include_market_cap': 'true',
-                'include_24hr_vol': 'true',
-                'include_24hr_change': 'true',
-                'include_last_updated_at': 'true'
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
+        disk_ttl不为None表示结果来自磁盘缓存，内存缓存只保留其剩余有效时间。
+        """
+        if not endpoint.cache_key or (isinstance(result, dict) and 'error' in result):
+            return
+        if disk_ttl is None:
+            self._set_cached_data(endpoint.cache_key, result)
+            self._set_disk_cached(endpoint, data)
+        else:
+            self.cache.set(endpoint.cache_key, result, disk_ttl)
+    
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """缓存命中/未命中/淘汰计数和当前占用"""
+        metrics = self.cache.metrics()
+        if self.disk_cache is not None:
+            metrics['disk'] = self.disk_cache.metrics()
+        return metrics
+    
+    def _quote_currencies(self, currency: str) -> Tuple[str, ...]:
+        """请求某个计价货币的价格时实际获取的计价货币（多计价货币模式下为全部配置的货币）"""
+        if len(self.vs_currencies) > 1 and currency in self.vs_currencies:
+            return self.vs_currencies
+        return (currency,)
+    
+    def _price_key(self, coin_id: str, currency: str) -> str:
+        """价格缓存键（多计价货币模式下同一币种的所有计价货币共用一个键）"""
+        return f"price_{coin_id}_{'_'.join(self._quote_currencies(currency))}"
+    
+    @staticmethod
+    def _price_result(value: Any, currency: str) -> Dict[str, Any]:
+        """缓存的价格值 -> 指定计价货币的价格结果"""
+        return value.quote(currency) if isinstance(value, PriceQuotes) else value
+    
+    def _price_params(self, coin_ids: List[str], currency: str) -> Dict[str, Any]:
+        """/simple/price完整字段的查询参数"""
+        return {
+            'ids': ','.join(coin_ids),
+            'vs_currencies': ','.join(self._quote_currencies(currency)),
+            'include_market_cap': 'true',
+            'include_24hr_vol': 'true',
+            'include_24hr_change': 'true',
+            'include_last_updated_at': 'true'
+        }
+    
+    @staticmethod
+    def _parse_price_entry(entry: Dict[str, Any], currency: str) -> Dict[str, Any]:
+        """/simple/price响应中单个币种的数据 -> 价格结果"""
+        return {
+            'price': entry.get(f'{currency}', 0),
+            'market_cap': entry.get(f'{currency}_market_cap', 0),
+            'volume_24h': entry.get(f'{currency}_24h_vol', 0),
+            'change_24h': entry.get(f'{currency}_24h_change', 0),
+            'last_updated': entry.get('last_updated_at', 0),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _parse_price_value(self, entry: Dict[str, Any], currency: str) -> Any:
+        """单个币种的/simple/price数据 -> 缓存的价格值（多计价货币模式下为PriceQuotes记录）"""
+        currencies = self._quote_currencies(currency)
+        if len(currencies) == 1:
+            return self._parse_price_entry(entry, currency)
+        return PriceQuotes.from_entry(entry, currencies)
+    
+    def _price_endpoint(self, coin_id: str, currency: str) -> Endpoint:
+        """当前价格"""
+        def parse(data):
             if coin_id in data:
-                result = {
-                    'price': data[coin_id].get(f'{currency}', 0),
-                    'market_cap': data[coin_id].get(f'{currency}_market_cap', 0),
-                    'volume_24h': data[coin_id].get(f'{currency}_24h_vol', 0),
-                    'change_24h': data[coin_id].get(f'{currency}_24h_change', 0),
-                    'last_updated': data[coin_id].get('last_updated_at', 0),
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                self._set_cached_data(cache_key, result)
-                logger.info(f"获取价格成功: {coin_id} = ${result['price']}")
+                result = self._parse_price_value(data[coin_id], currency)
+                logger.info(f"获取价格成功: {coin_id} = {self._price_result(result, currency)['price']} {currency}")
                 return result
             else:
                 logger.error(f"未找到币种数据: {coin_id}")
                 return {'error': f'未找到币种: {coin_id}'}
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"获取价格失败: {e}")
-            return {'error': f'API请求失败: {str(e)}'}
-        except Exception as e:
-            logger.error(f"处理价格数据失败: {e}")
-            return {'error': f'数据处理失败: {str(e)}'}
+        
+        return Endpoint('价格', '/simple/price', self._price_params([coin_id], currency),
+                        10, parse, self._price_key(coin_id, currency))
     
-    def get_coin_info(self, coin_id: str = 'bitcoin') -> Dict[str, Any]:
-        """获取币种信息"""
-        cache_key = f"info_{coin_id}"
-        cached = self._get_cached_data(cache_key)
-        if cached:
-            return cached
+    def _price_batch_endpoints(self, coin_ids: List[str], currency: str) -> List[Endpoint]:
+        """
+        多个币种的完整价格，按币种数量和URL长度限制拆分为若干批量请求
         
-        try:
-            url = f"{self.base_url}/coins/{coin_id}"
-            params = {
-                'localization': 'false',
-                'tickers': 'false',
-                'market_data': 'false',
-                'community_data': 'false',
-                'developer_data': 'false',
-                'sparkline': 'false'
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+        每个请求的结果为 币种 -> 缓存的价格值（与get_price相同结构的字典，多计价货币模式下为PriceQuotes记录；
+        未找到的币种为error字典）
+        """
+        def make(batch):
+            def parse(data):
+                results = {}
+                for coin_id in batch:
+                    if coin_id in data:
+                        results[coin_id] = self._parse_price_value(data[coin_id], currency)
+                    else:
+                        logger.error(f"未找到币种数据: {coin_id}")
+                        results[coin_id] = {'error': f'未找到币种: {coin_id}'}
+                logger.info(f"批量获取价格成功: {len(batch)}个币种")
+                return results
             
+            return Endpoint('批量价格', '/simple/price', self._price_params(batch, currency), 10, parse)
+        
+        return [make(batch) for batch in self._id_batches(coin_ids, '/simple/price',
+                                                          lambda batch: self._price_params(batch, currency))]
+    
+    def _id_batches(self, coin_ids: List[str], path: str, params_for: Callable[[List[str]], Dict[str, Any]]) -> List[List[str]]:
+        """币种列表（去重）按单次请求的币种数量和URL长度限制拆分"""
+        batches, batch = [], []
+        for coin_id in dict.fromkeys(coin_ids):
+            candidate = batch + [coin_id]
+            url = f"{self.base_url}{path}?{urlencode(params_for(candidate))}"
+            if batch and (len(candidate) > MAX_IDS_PER_REQUEST or len(url) > MAX_URL_LENGTH):
+                batches.append(batch)
+                candidate = [coin_id]
+            batch = candidate
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _coin_info_endpoint(self, coin_id: str) -> Endpoint:
+        """币种信息"""
+        def parse(data):
             result = {
                 'id': data.get('id', ''),
                 'symbol': data.get('symbol', '').upper(),
@@ -129,91 +298,315 @@ class CoinGeckoClient:
                 'market_cap_rank': data.get('market_cap_rank', 0),
                 'timestamp': datetime.now().isoformat()
             }
-            
-            self._set_cached_data(cache_key, result)
             logger.info(f"获取币种信息成功: {coin_id}")
             return result
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"获取币种信息失败: {e}")
-            return {'error': f'API请求失败: {str(e)}'}
-        except Exception as e:
-            logger.error(f"处理币种信息失败: {e}")
-            return {'error': f'数据处理失败: {str(e)}'}
+        
+        return Endpoint('币种信息', f'/coins/{coin_id}', {
+            'localization': 'false',
+            'tickers': 'false',
+            'market_data': 'false',
+            'community_data': 'false',
+            'developer_data': 'false',
+            'sparkline': 'false'
+        }, 10, parse, f"info_{coin_id}")
     
-    def get_market_data(self, coin_id: str = 'bitcoin', days: int = 7) -> Dict[str, Any]:
-        """获取市场数据（用于技术分析）"""
-        cache_key = f"market_{coin_id}_{days}"
-        cached = self._get_cached_data(cache_key)
-        if cached:
-            return cached
+    def _series_from_chart(self, data: Dict[str, Any], days: int) -> OHLCVSeries:
+        """market_chart响应 -> 列式行情序列（最高/最低价暂为收盘价，由_with_ohlc填入真实值）"""
+        timestamps, prices = pairs_to_columns(data.get('prices', []), self.price_dtype)
+        _, market_caps = pairs_to_columns(data.get('market_caps', []), self.price_dtype)
+        _, volumes = pairs_to_columns(data.get('total_volumes', []), self.price_dtype)
+        
+        return OHLCVSeries(
+            prices,
+            volumes=volumes,
+            market_caps=market_caps,
+            timestamps=timestamps,
+            dtype=self.price_dtype,
+            period_days=days
+        )
+    
+    def _ohlc_endpoint(self, coin_id: str, days: int) -> Endpoint:
+        """K线数据（/coins/{id}/ohlc只接受固定的天数，取不小于days的最小值）"""
+        ohlc_days = next((value for value in OHLC_DAYS if value >= days), 'max')
         
+        def parse(data):
+            candles = candles_to_matrix(data)
+            logger.info(f"获取K线数据成功: {coin_id}, {len(candles)}根K线")
+            return candles
+        
+        return Endpoint('K线数据', f'/coins/{coin_id}/ohlc', {
+            'vs_currency': 'usd',
+            'days': ohlc_days
+        }, 15, parse, f"ohlc_{coin_id}_{ohlc_days}")
+    
+    @staticmethod
+    def _markets_params(currency: str, page: int = 1, coin_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """/coins/markets查询参数（含7天小时级sparkline和涨跌幅字段）"""
+        params = {
+            'vs_currency': currency,
+            'order': 'market_cap_desc',
+            'per_page': MARKETS_PER_PAGE,
+            'page': page,
+            'sparkline': 'true',
+            'price_change_percentage': '1h,24h,7d'
+        }
+        if coin_ids:
+            params['ids'] = ','.join(coin_ids)
+        return params
+    
+    def _parse_markets_entry(self, entry: Dict[str, Any], currency: str) -> Dict[str, Any]:
+        """
+        /coins/markets中单个币种 -> {'price_data': 与get_price相同结构, 'market_data': 近7天小时级序列}
+        
+        sparkline只有价格，最高/最低价使用收盘价，成交量各点均取当前24小时成交量，
+        市值按流通量换算（缺少流通量时取当前市值）。
+        """
+        last_updated = entry.get('last_updated')
         try:
-            url = f"{self.base_url}/coins/{coin_id}/market_chart"
-            params = {
-                'vs_currency': 'usd',
-                'days': days,
-                'interval': 'daily'
-            }
-            
-            response = self.session.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            # 提取价格数据
-            prices = [item[1] for item in data.get('prices', [])]
-            market_caps = [item[1] for item in data.get('market_caps', [])]
-            volumes = [item[1] for item in data.get('total_volumes', [])]
-            
-            # 计算高、低价格（简化版本）
-            high_prices = []
-            low_prices = []
-            
-            for i in range(len(prices)):
-                if i == 0:
-                    high_prices.append(prices[i] * 1.01)  # 模拟高价
-                    low_prices.append(prices[i] * 0.99)   # 模拟低价
-                else:
-                    change = random.uniform(-0.03, 0.03)  # 模拟价格波动
-                    high_prices.append(prices[i] * (1 + abs(change)))
-                    low_prices.append(prices[i] * (1 - abs(change)))
-            
-            result = {
-                'prices': prices,
-                'high': high_prices,
-                'low': low_prices,
-                'volumes': volumes,
-                'market_caps': market_caps,
-                'data_points': len(prices),
-                'period_days': days,
-                'timestamp': datetime.now().isoformat()
-            }
+            updated_at = datetime.fromisoformat(last_updated.replace('Z', '+00:00')).timestamp()
+        except (AttributeError, ValueError):
+            updated_at = time.time()
+        
+        price_data = {
+            'price': entry.get('current_price') or 0,
+            'market_cap': entry.get('market_cap') or 0,
+            'volume_24h': entry.get('total_volume') or 0,
+            'change_24h': entry.get('price_change_percentage_24h_in_currency',
+                                    entry.get('price_change_percentage_24h')) or 0,
+            'change_1h': entry.get('price_change_percentage_1h_in_currency') or 0,
+            'change_7d': entry.get('price_change_percentage_7d_in_currency') or 0,
+            'last_updated': int(updated_at),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        # sparkline为[null, ...]时转换为NaN
+        prices = np.array((entry.get('sparkline_in_7d') or {}).get('price') or [], dtype=np.float64)
+        end = int(updated_at) // 3600 * 3600000
+        timestamps = end - 3600000 * np.arange(len(prices) - 1, -1, -1, dtype=np.int64)
+        supply = entry.get('circulating_supply')
+        market_data = OHLCVSeries(
+            prices,
+            volumes=np.full(len(prices), price_data['volume_24h'], dtype=np.float64),
+            market_caps=prices * supply if supply else np.full(len(prices), price_data['market_cap'], dtype=np.float64),
+            timestamps=timestamps,
+            dtype=self.price_dtype,
+            period_days=7
+        )
+        return {'price_data': price_data, 'market_data': market_data}
+    
+    def _markets_endpoints(self, currency: str, coin_ids: Optional[List[str]] = None, pages: int = 1) -> List[Endpoint]:
+        """
+        /coins/markets批量行情：指定coin_ids时按限制拆分为若干请求，否则按市值排名取前pages页
+        
+        每个请求的结果为 币种 -> {'price_data', 'market_data'}
+        """
+        def make(page, batch=None):
+            def parse(data):
+                results = {entry['id']: self._parse_markets_entry(entry, currency) for entry in data if entry.get('id')}
+                logger.info(f"批量获取行情成功: 第{page}页, {len(results)}个币种")
+                return results
             
-            self._set_cached_data(cache_key, result)
-            logger.info(f"获取市场数据成功: {coin_id}, {len(prices)}个数据点")
+            return Endpoint('批量行情', '/coins/markets', self._markets_params(currency, page, batch), 15, parse)
+        
+        if coin_ids:
+            return [make(1, batch) for batch in self._id_batches(
+                coin_ids, '/coins/markets', lambda batch: self._markets_params(currency, 1, batch))]
+        return [make(page) for page in range(1, pages + 1)]
+    
+    def _store_markets(self, markets: Any, currency: str, results: Dict[str, Dict[str, Any]]):
+        """批量行情收集到results，价格快照写入价格缓存（请求失败时跳过）"""
+        if isinstance(markets, dict) and isinstance(markets.get('error'), str):
+            logger.error(f"批量获取行情失败: {markets['error']}")
+            return
+        for coin_id, result in markets.items():
+            # 多计价货币模式下的价格记录需要全部计价货币，单一货币的快照不写入价格缓存
+            if self._quote_currencies(currency) == (currency,):
+                self._set_cached_data(self._price_key(coin_id, currency), result['price_data'])
+            results[coin_id] = result
+    
+    def _finish_market_data(self, coin_id: str, series: Any, candles: Any, days: int) -> Any:
+        """
+        截取最近days天的窗口，用该窗口的K线数据填入真实最高/最低价（K线获取失败时保持收盘价），
+        增量同步时把有新数据的窗口写入本地存储
+        
+        最高/最低价写入窗口的新序列对象，缓存中的序列保持不变；
+        K线须按days获取，结果与是否从更长的缓存窗口截取无关。
+        """
+        if isinstance(series, dict) and 'error' in series:
+            return series
+        series = self._slice_window(series, days).window()
+        if isinstance(candles, dict) and 'error' in candles:
+            logger.warning(f"K线数据不可用，最高/最低价使用收盘价: {candles['error']}")
+        else:
+            high, low = daily_high_low(series.timestamps, series.prices.astype(np.float64), candles)
+            series.high = high.astype(self.price_dtype)
+            series.low = low.astype(self.price_dtype)
+        
+        if self.incremental_sync and self.history_store is not None and len(series):
+            stored_last = self.history_store.last_timestamp(coin_id)
+            if stored_last != int(series.timestamps[-1]):
+                # 只写入本地存储最后一个数据点（可能是实时点，一并替换）及之后的数据
+                start = 0 if stored_last is None else int(np.searchsorted(series.timestamps, stored_last))
+                self.history_store.append(coin_id, series.window(start), replace_from=stored_last)
+        return series
+    
+    def _market_window(self, coin_id: str, days: int) -> int:
+        """
+        实际获取的窗口天数：该币种已缓存的更长窗口未过期时使用该窗口，否则为days
+        
+        同一币种只缓存一个最长窗口，较短的窗口从中截取，不同窗口的请求共用一次获取；
+        较长的窗口随其缓存过期失效，之后按实际请求的窗口获取。
+        """
+        longest = self.market_windows.get(coin_id, 0)
+        if longest > days and self.cache.is_fresh(f"market_{coin_id}_{longest}"):
+            return longest
+        return days
+    
+    def _record_market_window(self, coin_id: str, days: int, series: Any):
+        """获取成功后记录该币种缓存的窗口（失败的请求不改变窗口）"""
+        if not isinstance(series, dict):
+            self.market_windows[coin_id] = self._market_window(coin_id, days)
+    
+    @staticmethod
+    def _slice_window(series: Any, days: int) -> Any:
+        """从较长窗口的行情序列截取最近days天（零拷贝视图）"""
+        if isinstance(series, dict) or series.period_days == days or not len(series):
+            return series
+        latest = int(series.timestamps[-1])
+        window = series.between(latest - days * 86400000, latest)
+        window.period_days = days
+        return window
+    
+    def _market_data_endpoint(self, coin_id: str, days: int) -> Endpoint:
+        """历史市场数据（用于技术分析）；增量同步模式下已有覆盖该窗口的本地历史时只获取新数据"""
+        history = self._get_history(coin_id) if self.incremental_sync else None
+        if history is not None and len(history) and history.timestamps[0] <= (time.time() - days * 86400 + 86400) * 1000:
+            return self._market_range_endpoint(coin_id, days, history)
+        
+        def parse(data):
+            result = self._series_from_chart(data, days)
+            if self.incremental_sync:
+                self.histories[coin_id] = result
+            logger.info(f"获取市场数据成功: {coin_id}, {len(result)}个数据点")
             return result
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"获取市场数据失败: {e}")
-            return {'error': f'API请求失败: {str(e)}'}
-        except Exception as e:
-            logger.error(f"处理市场数据失败: {e}")
-            return {'error': f'数据处理失败: {str(e)}'}
+        
+        return Endpoint('市场数据', f'/coins/{coin_id}/market_chart', {
+            'vs_currency': 'usd',
+            'days': days,
+            'interval': 'daily'
+        }, 15, parse, f"market_{coin_id}_{days}")
     
-    def get_multiple_prices(self, coin_ids: List[str], currency: str = 'usd') -> Dict[str, Dict[str, Any]]:
-        """获取多个币种价格"""
-        try:
-            url = f"{self.base_url}/simple/price"
-            params = {
-                'ids': ','.join(coin_ids),
-                'vs_currencies': currency,
-                'include_last_updated_at': 'true'
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+    def _get_history(self, coin_id: str) -> Optional[OHLCVSeries]:
+        """币种的本地历史（内存中没有时从本地存储映射）"""
+        history = self.histories.get(coin_id)
+        if history is None and self.history_store is not None:
+            history = self.history_store.load(coin_id)
+        return history
+    
+    def _market_range_endpoint(self, coin_id: str, days: int, history: OHLCVSeries) -> Endpoint:
+        """
+        增量同步：只获取本地历史最后一个数据点之后的数据，追加到本地历史并截取窗口
+        
+        最后一个数据点可能是未收盘的实时点，因此从它的时间戳开始重新获取并替换。
+        interval=daily只有付费套餐可用，range按时间跨度返回5分钟/小时级数据，先重采样为日线再合并。
+        """
+        start_ms = int(history.timestamps[-1])
+        # 本地存储中的历史可能很长，只取合并所需的最近一段
+        retention_days = max(days, history.period_days or days)
+        history = history.between(start_ms - (retention_days + 1) * 86400000, start_ms)
+        
+        def parse(data):
+            chart = self._series_from_chart(data, days)
+            index, timestamps = daily_points(chart.timestamps)
+            closed = history.timestamps < start_ms
+            # 与已收盘的历史重复的日线数据点丢弃
+            if closed.any():
+                newer = timestamps > history.timestamps[closed][-1]
+                index, timestamps = index[newer], timestamps[newer]
+            # 没有新数据时保留原有的最后一个数据点
+            keep = closed if len(index) else np.ones(len(history), dtype=bool)
+            fresh = OHLCVSeries(
+                *(getattr(chart, field)[index] for field in OHLCVSeries.FIELDS),
+                timestamps=timestamps,
+                dtype=self.price_dtype
+            )
+            merged = OHLCVSeries(
+                *(np.concatenate([getattr(history, field)[keep], getattr(fresh, field)]) for field in OHLCVSeries.FIELDS),
+                timestamps=np.concatenate([history.timestamps[keep], fresh.timestamps]),
+                dtype=self.price_dtype,
+                period_days=retention_days
+            )
             
+            # 本地历史保留请求过的最长窗口，返回值为本次窗口的视图
+            latest = int(merged.timestamps[-1])
+            self.histories[coin_id] = merged.between(latest - merged.period_days * 86400000, latest)
+            result = merged.between(latest - days * 86400000, latest)
+            result.period_days = days
+            logger.info(f"增量同步市场数据成功: {coin_id}, 新增{len(fresh)}个数据点, 窗口{len(result)}个数据点")
+            return result
+        
+        return Endpoint('市场数据', f'/coins/{coin_id}/market_chart/range', {
+            'vs_currency': 'usd',
+            'from': start_ms // 1000,
+            'to': int(time.time())
+        }, 15, parse, f"market_{coin_id}_{days}", persist=False)
+    
+    def _intraday_ring(self, coin_id: str, timeframe: str) -> OHLCVRing:
+        """币种某个周期的日内K线缓冲区（首次使用时创建）"""
+        key = f"intraday_{coin_id}_{timeframe}"
+        ring = self.intraday_buffers.get(key)
+        if ring is None:
+            ring = self.intraday_buffers[key] = OHLCVRing(self.intraday_capacity, parse_timeframe(timeframe),
+                                                          self.price_dtype)
+        return ring
+    
+    def _intraday_endpoints(self, coin_id: str, ring: OHLCVRing) -> List[Endpoint]:
+        """
+        日内数据分页请求：首次回填缓冲区容量对应的时长（最多90天），之后只获取最后一个数据点之后的数据
+        
+        周期小于1小时时按1天分页以取得5分钟粒度，否则按30天分页取得小时粒度
+        （CoinGecko按时间范围自动决定粒度，较早的5分钟数据可能只有小时粒度）。
+        """
+        now_ms = int(time.time() * 1000)
+        page_ms = MINUTELY_PAGE_MS if ring.bar_ms < 3600000 else HOURLY_PAGE_MS
+        if ring.last_raw_ms is None:
+            start_ms = now_ms - min(ring.capacity * ring.bar_ms, MAX_INTRADAY_BACKFILL_MS)
+        else:
+            start_ms = ring.last_raw_ms + 1
+        
+        def parse(data):
+            timestamps, prices = pairs_to_columns(data.get('prices', []))
+            _, market_caps = pairs_to_columns(data.get('market_caps', []))
+            _, volumes = pairs_to_columns(data.get('total_volumes', []))
+            return timestamps, prices, volumes, market_caps
+        
+        return [Endpoint('日内数据', f'/coins/{coin_id}/market_chart/range', {
+            'vs_currency': 'usd',
+            'from': page_start // 1000,
+            'to': min(page_start + page_ms, now_ms) // 1000
+        }, 15, parse) for page_start in range(start_ms, now_ms, page_ms)]
+    
+    def _ingest_intraday(self, coin_id: str, timeframe: str, ring: OHLCVRing, pages: List[Any]) -> Any:
+        """按时间顺序把各页数据摄入缓冲区，返回全部K线的副本并写入缓存；首次获取失败时返回error"""
+        for page in pages:
+            if isinstance(page, dict) and 'error' in page:
+                if not len(ring):
+                    return page
+                logger.warning(f"日内数据获取不完整: {coin_id}, {page['error']}")
+                break
+            ring.ingest(*page)
+        
+        if not len(ring):
+            return {'error': f'没有日内数据: {coin_id}'}
+        # 返回给调用方的序列可能在下一次摄入后仍在使用（如分析中、已缓存），不能是缓冲区的视图
+        series = ring.snapshot(period_days=-(-len(ring) * ring.bar_ms // 86400000))
+        self._set_cached_data(f"intraday_{coin_id}_{timeframe}", series)
+        logger.info(f"获取日内数据成功: {coin_id}, {timeframe}周期{len(series)}根K线")
+        return series
+    
+    def _multiple_prices_endpoint(self, coin_ids: List[str], currency: str) -> Endpoint:
+        """多个币种价格（不缓存）"""
+        def parse(data):
             result = {}
             for coin_id in coin_ids:
                 if coin_id in data:
@@ -221,68 +614,286 @@ class CoinGeckoClient:
                         'price': data[coin_id].get(f'{currency}', 0),
                         'last_updated': data[coin_id].get('last_updated_at', 0)
                     }
-            
             logger.info(f"获取多个价格成功: {len(result)}个币种")
             return result
+        
+        return Endpoint('多个价格', '/simple/price', {
+            'ids': ','.join(coin_ids),
+            'vs_currencies': currency,
+            'include_last_updated_at': 'true'
+        }, 10, parse)
+    
+    def _supported_coins_endpoint(self) -> Endpoint:
+        """支持的币种列表"""
+        def parse(coins):
+            # 只返回前100个主要币种
+            major_coins = [
+                coin for coin in coins 
+                if coin['id'] in ['bitcoin', 'ethereum', 'binancecoin', 'ripple', 'cardano', 
+                                 'solana', 'polkadot', 'dogecoin', 'matic-network', 'chainlink']
+            ]
+            logger.info(f"获取支持币种列表成功: {len(major_coins)}个主要币种")
+            return major_coins
+        
+        return Endpoint('币种列表', '/coins/list', {}, 10, parse, "supported_coins")
+    
+    def _store_price_batch(self, endpoint: Endpoint, batch_results: Dict[str, Any], currency: str,
+                           results: Dict[str, Dict[str, Any]]):
+        """
+        把一次批量价格请求的结果拆回各币种并写入缓存（请求失败时各币种都得到同一个error）
+        
+        results中保存缓存的价格值，由调用方用_price_result转换为指定计价货币的结果。
+        """
+        failed = isinstance(batch_results.get('error'), str)
+        for coin_id in endpoint.params['ids'].split(','):
+            result = batch_results if failed else batch_results[coin_id]
+            if not (isinstance(result, dict) and 'error' in result):
+                self._set_cached_data(self._price_key(coin_id, currency), result)
+            results[coin_id] = result
+    
+    @staticmethod
+    def _status_result(status_code: int, response_time: float) -> Dict[str, Any]:
+        """API状态检查结果"""
+        if status_code == 200:
+            return {
+                'status': 'online',
+                'response_time': response_time,
+                'timestamp': datetime.now().isoformat()
+            }
+        return {
+            'status': 'error',
+            'status_code': status_code,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _offline_result(error: Exception) -> Dict[str, Any]:
+        """API无法连接时的状态"""
+        logger.error(f"检查API状态失败: {error}")
+        return {
+            'status': 'offline',
+            'error': str(error),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+class CoinGeckoClient(CoinGeckoBase):
+    """CoinGecko API客户端（同步，基于requests）"""
+    
+    def __init__(self, api_key: str = None, cache_ttl: int = None, price_dtype: str = 'float64',
+                 plan: str = None, rate_limit: float = None, max_retries: int = 3,
+                 cache_ttls: Dict[str, float] = None, cache_max_entries: int = 1024,
+                 cache_max_bytes: int = 64 * 1024 * 1024, disk_cache_path: str = None,
+                 incremental_sync: bool = False, history_store_path: str = None,
+                 cache_max_stale: Dict[str, float] = None, secondary_sources: List[Dict[str, Any]] = None,
+                 hedge_delay: float = 1.0, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 vs_currencies: List[str] = None, intraday_capacity: int = 500):
+        """初始化CoinGecko客户端"""
+        super().__init__(api_key, cache_ttl, price_dtype, plan, rate_limit, max_retries,
+                         cache_ttls, cache_max_entries, cache_max_bytes, disk_cache_path, incremental_sync,
+                         history_store_path, cache_max_stale, secondary_sources, hedge_delay, failure_threshold,
+                         reset_timeout, vs_currencies, intraday_capacity)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.inflight: Dict[str, Future] = {}  # 缓存键 -> 正在进行的获取（多线程共用一个客户端时去重）
+        self.inflight_lock = threading.Lock()
+        
+        logger.info("CoinGecko客户端初始化完成")
+    
+    def _call(self, endpoint: Endpoint) -> Any:
+        """执行一次API调用（带缓存），失败时返回包含error的字典"""
+        if not endpoint.cache_key:
+            return self._fetch(endpoint)
+        cached = self._get_cached_data(endpoint.cache_key)
+        if cached is not None:
+            return cached
+
+        # single-flight：同一缓存键只由第一个调用方获取，其他线程等待同一结果（包括失败）
+        with self.inflight_lock:
+            flight = self.inflight.get(endpoint.cache_key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[endpoint.cache_key] = Future()
+        if not leader:
+            logger.debug(f"等待进行中的请求: {endpoint.cache_key}")
+            return flight.result()
+
+        try:
+            result = self._fetch(endpoint)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self.inflight_lock:
+                self.inflight.pop(endpoint.cache_key, None)
+    
+    def _fetch(self, endpoint: Endpoint) -> Any:
+        """从磁盘缓存或网络获取并解析数据，成功时写入缓存"""
+        data, disk_ttl = self._get_disk_cached(endpoint) or (None, None)
+        try:
+            if data is None:
+                data = self._get_json(endpoint)
+            result = endpoint.parse(data)
             
         except requests.exceptions.RequestException as e:
-            logger.error(f"获取多个价格失败: {e}")
+            logger.error(f"获取{endpoint.name}失败: {e}")
             return {'error': f'API请求失败: {str(e)}'}
+        except Exception as e:
+            logger.error(f"处理{endpoint.name}失败: {e}")
+            return {'error': f'数据处理失败: {str(e)}'}
+        
+        self._store_result(endpoint, result, data, disk_ttl)
+        return result
     
-    def check_api_status(self) -> Dict[str, Any]:
-        """检查API状态"""
+    def _get_json(self, endpoint: Endpoint) -> Any:
+        """
+        按优先级向可用的数据源请求，数据源失败（网络错误、超时、5xx/429重试耗尽）时改用下一个
+        
+        同步客户端只做故障转移，不发对冲请求。
+        """
+        error = None
+        for source in self._route():
+            try:
+                data = self._request(source, endpoint)
+                source.stats['wins'] += 1
+                return data
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and e.response.status_code < 500 and e.response.status_code != 429:
+                    raise  # 4xx（如币种不存在）换数据源也不会成功
+                error = e
+            except requests.exceptions.RequestException as e:
+                error = e
+            logger.warning(f"数据源 {source.name} 请求{endpoint.name}失败，尝试下一个数据源: {error}")
+        raise error
+    
+    def _request(self, source: DataSource, endpoint: Endpoint) -> Any:
+        """经数据源的限流器发出请求，429/5xx时按Retry-After或指数退避重试"""
+        limiter = source.rate_limiter
         try:
-            url = f"{self.base_url}/ping"
-            response = self.session.get(url, timeout=5)
+            for attempt in range(limiter.max_retries + 1):
+                limiter.acquire()
+                start = time.perf_counter()
+                response = self.session.get(f"{source.base_url}{endpoint.path}", params=endpoint.params,
+                                            headers=source.headers, timeout=endpoint.timeout)
+                retry = limiter.record(response.status_code, response.headers.get('Retry-After'))
+                if not retry or attempt == limiter.max_retries:
+                    break
             
-            if response.status_code == 200:
-                return {
-                    'status': 'online',
-                    'response_time': response.elapsed.total_seconds(),
-                    'timestamp': datetime.now().isoformat()
-                }
+            if response.status_code >= 500 or response.status_code == 429:
+                source.record_failure()
             else:
-                return {
-                    'status': 'error',
-                    'status_code': response.status_code,
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"检查API状态失败: {e}")
-            return {
-                'status': 'offline',
-                'error': str(e),
-                'timestamp': datetime.now().isoformat()
-            }
+                source.record_success(time.perf_counter() - start)
+        except requests.exceptions.RequestException:
+            source.record_failure()
+            raise
+        
+        response.raise_for_status()
+        return loads(response.content)
     
-    def get_supported_coins(self) -> List[Dict[str, Any]]:
-        """获取支持的币种列表"""
-        cache_key = "supported_coins"
-        cached = self._get_cached_data(cache_key)
-        if cached:
+    def get_price(self, coin_id: str = 'bitcoin', currency: str = 'usd') -> Dict[str, Any]:
+        """获取当前价格"""
+        return self._price_result(self._call(self._price_endpoint(coin_id, currency)), currency)
+    
+    def get_coin_info(self, coin_id: str = 'bitcoin') -> Dict[str, Any]:
+        """获取币种信息"""
+        return self._call(self._coin_info_endpoint(coin_id))
+    
+    def get_market_data(self, coin_id: str = 'bitcoin', days: int = 7) -> OHLCVSeries:
+        """
+        获取市场数据（用于技术分析），返回列式行情序列；失败时返回包含error的字典
+        
+        已缓存同一币种更长的窗口时直接返回其最近days天的视图。
+        """
+        fetch_days = self._market_window(coin_id, days)
+        series = self._call(self._market_data_endpoint(coin_id, fetch_days))
+        if isinstance(series, dict):
+            return series
+        self._record_market_window(coin_id, fetch_days, series)
+        return self._finish_market_data(coin_id, series, self._call(self._ohlc_endpoint(coin_id, days)), days)
+    
+    def get_prices(self, coin_ids: List[str], currency: str = 'usd') -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取多个币种的完整价格（结构与get_price相同），合并为尽量少的/simple/price请求
+        
+        结果写入各币种的价格缓存，之后同一轮的get_price调用直接命中缓存。
+        """
+        results = {}
+        missing = []
+        for coin_id in coin_ids:
+            cached = self._get_cached_data(self._price_key(coin_id, currency))
+            if cached is not None:
+                results[coin_id] = cached
+            else:
+                missing.append(coin_id)
+        
+        for endpoint in self._price_batch_endpoints(missing, currency) if missing else []:
+            batch_results = self._call(endpoint)
+            self._store_price_batch(endpoint, batch_results, currency, results)
+        return {coin_id: self._price_result(value, currency) for coin_id, value in results.items()}
+    
+    def get_intraday_data(self, coin_id: str = 'bitcoin', timeframe: str = '1h') -> OHLCVSeries:
+        """
+        获取日内K线（5分钟/小时级数据按timeframe聚合），返回缓冲区K线的副本；失败时返回包含error的字典
+        
+        每个币种每个周期最多保存intraday_capacity根K线，写满后覆盖最旧的K线。
+        """
+        cached = self._get_cached_data(f"intraday_{coin_id}_{timeframe}")
+        if cached is not None:
             return cached
+        ring = self._intraday_ring(coin_id, timeframe)
+        pages = []
+        for endpoint in self._intraday_endpoints(coin_id, ring):
+            pages.append(self._call(endpoint))
+            if isinstance(pages[-1], dict):
+                break
+        return self._ingest_intraday(coin_id, timeframe, ring, pages)
+    
+    def get_markets(self, currency: str = 'usd', coin_ids: Optional[List[str]] = None,
+                    pages: int = 1) -> Dict[str, Dict[str, Any]]:
+        """
+        通过/coins/markets批量获取价格快照和近7天小时级行情（每页250个币种）
+        
+        行情来自7天sparkline，与get_market_data的日线不同：最高价=最低价=收盘价，
+        各点的成交量均为当前24小时成交量。
+        
+        Args:
+            currency: 计价货币
+            coin_ids: 指定币种，缺省时按市值排名取前pages页
+            pages: 未指定币种时获取的页数
         
+        Returns:
+            币种 -> {'price_data': 与get_price相同结构, 'market_data': OHLCVSeries}；
+            请求失败或未找到的币种不在结果中
+        """
+        results = {}
+        for endpoint in self._markets_endpoints(currency, coin_ids, pages):
+            self._store_markets(self._call(endpoint), currency, results)
+        return results
+    
+    def get_multiple_prices(self, coin_ids: List[str], currency: str = 'usd') -> Dict[str, Dict[str, Any]]:
+        """获取多个币种价格"""
+        return self._call(self._multiple_prices_endpoint(coin_ids, currency))
+    
+    def check_api_status(self) -> Dict[str, Any]:
+        """检查API状态"""
         try:
-            url = f"{self.base_url}/coins/list"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            coins = response.json()
-            
-            # 只返回前100个主要币种
-            major_coins = [
-                coin for coin in coins 
-                if coin['id'] in ['bitcoin', 'ethereum', 'binancecoin', 'ripple', 'cardano', 
-                                 'solana', 'polkadot', 'dogecoin', 'matic-network', 'chainlink']
-            ]
-            
-            self._set_cached_data(cache_key, major_coins)
-            logger.info(f"获取支持币种列表成功: {len(major_coins)}个主要币种")
-            return major_coins
-            
+            self.rate_limiter.acquire()
+            response = self.session.get(f"{self.base_url}/ping", headers=self.sources[0].headers, timeout=5)
+            return self._status_result(response.status_code, response.elapsed.total_seconds())
         except requests.exceptions.RequestException as e:
-            logger.error(f"获取币种列表失败: {e}")
-            return []
+            return self._offline_result(e)
+    
+    def get_supported_coins(self) -> List[Dict[str, Any]]:
+        """获取支持的币种列表"""
+        result = self._call(self._supported_coins_endpoint())
+        return [] if isinstance(result, dict) else result
+    
+    def close(self):
+        """关闭HTTP会话和磁盘缓存"""
+        self.session.close()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+            self.disk_cache = None
 
-# 导入random用于模拟数据
-import random
\ No newline at end of file
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+API响应解码 - 快乐魔仙数字货币分析技能
+安装了orjson时使用orjson解析JSON；[时间戳, 数值]列表一次转换为NumPy数组，不经过逐元素的Python循环
+"""
+
+import json
+from typing import Any, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+
+def loads(content: Union[bytes, str]) -> Any:
+    """解析JSON（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def pairs_to_columns(pairs: Sequence[Sequence[float]], dtype=np.float64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    [[时间戳, 数值], ...] -> (int64时间戳数组, 数值数组)
+
+    整个列表一次转换为 (n, 2) 的float64矩阵再拆列（毫秒时间戳在float64中可精确表示），
+    缺失值(null)转换为NaN。
+    """
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=dtype)
+    matrix = np.array(pairs, dtype=np.float64)
+    return matrix[:, 0].astype(np.int64), np.ascontiguousarray(matrix[:, 1], dtype=dtype)
+
+
+def candles_to_matrix(candles: Sequence[Sequence[float]]) -> np.ndarray:
+    """/coins/{id}/ohlc响应 [[时间戳, 开, 高, 低, 收], ...] -> (n, 5) float64矩阵"""
+    if not candles:
+        return np.empty((0, 5), dtype=np.float64)
+    return np.array(candles, dtype=np.float64).reshape(-1, 5)
+
+
+def daily_points(timestamps: np.ndarray, day_ms: int = 86400000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    5分钟/小时级时间戳按UTC日重采样 -> (保留的数据点下标, 重采样后的时间戳)
+
+    与market_chart日线格式一致：每天取不晚于当日0点的最后一个数据点并记为0点，
+    最后一个尚未到下一个0点的数据点作为实时点保留原时间戳。
+    """
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=np.intp), timestamps
+    labels = -(-timestamps // day_ms) * day_ms
+    ends = np.append(np.flatnonzero(np.diff(labels)), len(labels) - 1)
+    resampled = labels[ends]
+    resampled[-1] = timestamps[-1]
+    return ends, resampled
+
+
+def daily_high_low(timestamps: np.ndarray, close: np.ndarray, candles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    用K线数据计算各数据点的最高/最低价
+
+    第i个数据点取时间戳落在 (timestamps[i-1], timestamps[i]] 内的所有K线的最高/最低价；
+    区间内没有K线时（K线周期比数据点间隔长），取覆盖该数据点的那根K线。
+    结果保证 low <= close <= high。
+    """
+    n = len(timestamps)
+    if n == 0 or len(candles) == 0:
+        return close.copy(), close.copy()
+
+    candle_ts = candles[:, 0]
+    # 每个数据点区间内第一根和最后一根K线之后的位置
+    ends = np.searchsorted(candle_ts, timestamps, side='right')
+    starts = np.empty(n, dtype=np.intp)
+    starts[0] = 0 if n == 1 else np.searchsorted(candle_ts, 2 * timestamps[0] - timestamps[1], side='right')
+    starts[1:] = ends[:-1]
+
+    has_candles = ends > starts
+    covering = np.minimum(ends, len(candles) - 1)  # 区间内没有K线时使用的K线
+    high = candles[covering, 2].copy()
+    low = candles[covering, 3].copy()
+
+    if has_candles.any():
+        # 没有K线的区间长度为0，因此相邻两个有K线区间的起点之间正好是前一个区间的K线
+        index = np.flatnonzero(has_candles)
+        used = candles[:ends[index[-1]]]
+        high[index] = np.maximum.reduceat(used[:, 2], starts[index])
+        low[index] = np.minimum.reduceat(used[:, 3], starts[index])
+
+    return np.maximum(high, close), np.minimum(low, close)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+API响应磁盘缓存 - 快乐魔仙数字货币分析技能
+原始响应JSON按 (接口路径, 参数) 保存在SQLite（WAL模式）中，多个进程可同时读写；
+进程重启或单次CLI调用时优先使用本地数据，TTL与内存缓存一致
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from src.api.decode import loads
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """基于SQLite的持久化响应缓存"""
+
+    def __init__(self, path: str, timeout: float = 5.0, purge_interval: float = 3600):
+        """
+        初始化磁盘缓存
+
+        Args:
+            path: SQLite数据库文件路径（目录不存在时自动创建）
+            timeout: 等待其他进程释放写锁的最长时间(秒)
+            purge_interval: 清理过期条目的间隔(秒)
+        """
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, body TEXT NOT NULL, stored_at REAL NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self.purge_interval = purge_interval
+        self.next_purge = 0.0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'errors': 0}
+        logger.info(f"磁盘缓存已启用: {self.path}")
+
+    @staticmethod
+    def make_key(path: str, params: Dict[str, Any]) -> str:
+        """(接口路径, 参数) -> 缓存键"""
+        return f"{path}?{json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)}"
+
+    def get(self, path: str, params: Dict[str, Any]) -> Optional[Tuple[Any, float]]:
+        """读取未过期的响应JSON，返回 (响应, 剩余有效时间秒数)，未命中时返回None"""
+        now = time.time()
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    'SELECT body, expires_at FROM responses WHERE key = ? AND expires_at > ?',
+                    (self.make_key(path, params), now)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.warning(f"读取磁盘缓存失败: {e}")
+            return None
+
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        logger.debug(f"使用磁盘缓存: {path}")
+        return loads(row[0]), row[1] - now
+
+    def set(self, path: str, params: Dict[str, Any], data: Any, ttl: float):
+        """保存响应JSON"""
+        now = time.time()
+        try:
+            with self.lock:
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, body, stored_at, expires_at) VALUES (?, ?, ?, ?)',
+                    (self.make_key(path, params), json.dumps(data, separators=(',', ':')), now, now + ttl)
+                )
+            self.stats['writes'] += 1
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self.stats['errors'] += 1
+            logger.warning(f"写入磁盘缓存失败: {e}")
+            return
+
+        if now >= self.next_purge:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """删除过期条目，返回删除数量"""
+        try:
+            with self.lock:
+                deleted = self.conn.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),)).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"清理磁盘缓存失败: {e}")
+            return 0
+        self.next_purge = time.time() + self.purge_interval
+        return deleted
+
+    def metrics(self) -> Dict[str, Any]:
+        """命中/未命中/写入计数"""
+        return dict(self.stats)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+多计价货币价格记录 - 快乐魔仙数字货币分析技能
+一次/simple/price请求取回所有配置的计价货币，每个币种只保存一条记录：
+各字段是按计价货币排列的float64数组，计价货币元组由同一配置的所有记录共用
+"""
+
+from datetime import datetime
+from typing import Dict, Any, Tuple
+
+import numpy as np
+
+# 记录中的字段（行）及其在/simple/price响应中的键后缀
+FIELDS = (
+    ('price', ''),
+    ('market_cap', '_market_cap'),
+    ('volume_24h', '_24h_vol'),
+    ('change_24h', '_24h_change')
+)
+
+
+class PriceQuotes:
+    """单个币种在多个计价货币下的价格"""
+
+    __slots__ = ('currencies', 'values', 'last_updated', 'timestamp')
+
+    def __init__(self, currencies: Tuple[str, ...], values: np.ndarray, last_updated: int = 0,
+                 timestamp: str = None):
+        """
+        初始化价格记录
+
+        Args:
+            currencies: 计价货币（与values的列对应）
+            values: (字段数, 计价货币数) float64数组，行顺序见FIELDS
+            last_updated: 数据更新时间(Unix秒)
+            timestamp: 获取时间
+        """
+        self.currencies = currencies
+        self.values = values
+        self.last_updated = last_updated
+        self.timestamp = timestamp or datetime.now().isoformat()
+
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any], currencies: Tuple[str, ...]) -> 'PriceQuotes':
+        """/simple/price响应中单个币种的数据 -> 价格记录（缺失的字段为0）"""
+        values = np.array([[entry.get(f'{currency}{suffix}') or 0 for currency in currencies]
+                           for _, suffix in FIELDS], dtype=np.float64)
+        return cls(currencies, values, entry.get('last_updated_at', 0))
+
+    def quote(self, currency: str) -> Dict[str, Any]:
+        """某个计价货币的价格结果（结构与get_price相同，另附各计价货币的价格）"""
+        if currency not in self.currencies:
+            return {'error': f'未获取计价货币: {currency}'}
+        column = self.currencies.index(currency)
+        result = {name: float(self.values[row, column]) for row, (name, _) in enumerate(FIELDS)}
+        result['last_updated'] = self.last_updated
+        result['timestamp'] = self.timestamp
+        result['quotes'] = dict(zip(self.currencies, self.values[0].tolist()))
+        return result
+
+    def __repr__(self) -> str:
+        return f"PriceQuotes({dict(zip(self.currencies, self.values[0].tolist()))})"
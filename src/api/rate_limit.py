@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+API限流器 - 快乐魔仙数字货币分析技能
+令牌桶按套餐速率发放请求配额，遇到429/5xx时遵守Retry-After并自适应降速（AIMD），
+同步和异步客户端共用
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# 各套餐每分钟请求数（CoinGecko公开接口/Demo密钥/Pro密钥）
+PLAN_LIMITS = {
+    'public': 10,
+    'demo': 30,
+    'pro': 500
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """令牌桶限流器"""
+
+    def __init__(self, plan: str = 'public', rate_per_minute: Optional[float] = None, burst: Optional[int] = None,
+                 max_retries: int = 3, backoff_base: float = 1.0, max_backoff: float = 60.0):
+        """
+        初始化限流器
+
+        Args:
+            plan: 套餐名称（public/demo/pro），决定默认速率
+            rate_per_minute: 每分钟请求数，缺省使用套餐速率
+            burst: 令牌桶容量（允许的突发请求数），缺省为每分钟请求数的1/4（至少3个）
+            max_retries: 429/5xx时的最大重试次数
+            backoff_base: 指数退避的基础等待时间(秒)
+            max_backoff: 单次退避的最长等待时间(秒)
+        """
+        self.plan = plan
+        self.rate_per_minute = float(rate_per_minute or PLAN_LIMITS.get(plan, PLAN_LIMITS['public']))
+        self.current_rate = self.rate_per_minute  # 自适应调整后的当前速率
+        self.min_rate = max(1.0, self.rate_per_minute / 8)
+        self.capacity = float(burst or max(3, int(self.rate_per_minute / 4)))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0  # 连续失败次数
+        self.lock = threading.Lock()
+
+        self.recent = deque()  # 最近一分钟内发出请求的时间
+        self.stats = {'requests': 0, 'throttled': 0, 'server_errors': 0, 'retries': 0, 'waited': 0.0}
+
+    def _reserve(self) -> float:
+        """预订一个令牌，返回发出请求前需要等待的秒数"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.current_rate / 60)
+            self.updated = now
+            self.tokens -= 1
+
+            wait = max(0.0, self.blocked_until - now)
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens * 60 / self.current_rate)
+
+            while self.recent and self.recent[0] < now - 60:
+                self.recent.popleft()
+            self.recent.append(now + wait)
+            self.stats['requests'] += 1
+            self.stats['waited'] += wait
+            return wait
+
+    def acquire(self):
+        """同步等待一个请求配额"""
+        wait = self._reserve()
+        if wait > 0:
+            logger.debug(f"限流等待 {wait:.2f} 秒")
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """异步等待一个请求配额"""
+        wait = self._reserve()
+        if wait > 0:
+            logger.debug(f"限流等待 {wait:.2f} 秒")
+            await asyncio.sleep(wait)
+
+    def record(self, status: int, retry_after: Optional[str] = None) -> bool:
+        """
+        记录一次响应的状态码并调整速率
+
+        Returns:
+            bool: 该响应是否应该重试（429/5xx）
+        """
+        with self.lock:
+            if status not in RETRY_STATUS:
+                self.failures = 0
+                # 加性恢复：每次成功把速率提高配置速率的5%
+                self.current_rate = min(self.rate_per_minute, self.current_rate + self.rate_per_minute * 0.05)
+                return False
+
+            self.failures += 1
+            if status == 429:
+                self.stats['throttled'] += 1
+                # 乘性降速
+                self.current_rate = max(self.min_rate, self.current_rate / 2)
+            else:
+                self.stats['server_errors'] += 1
+
+            delay = parse_retry_after(retry_after)
+            if delay is None:
+                delay = self.backoff_base * 2 ** (self.failures - 1)
+            delay = min(delay, self.max_backoff)
+
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.tokens = min(self.tokens, 0.0)
+            self.stats['retries'] += 1
+            logger.warning(f"API返回{status}，{delay:.1f}秒后重试（当前速率 {self.current_rate:.1f}次/分钟）")
+            return True
+
+    def usage(self) -> Dict[str, Any]:
+        """当前配额使用情况"""
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and self.recent[0] < now - 60:
+                self.recent.popleft()
+            tokens = min(self.capacity, self.tokens + (now - self.updated) * self.current_rate / 60)
+            return {
+                'plan': self.plan,
+                'rate_per_minute': self.rate_per_minute,
+                'current_rate_per_minute': round(self.current_rate, 2),
+                'available_tokens': round(max(tokens, 0.0), 2),
+                'requests_last_minute': len(self.recent),
+                'blocked_seconds': round(max(0.0, self.blocked_until - now), 2),
+                **self.stats
+            }
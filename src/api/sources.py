@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+API数据源 - 快乐魔仙数字货币分析技能
+每个数据源（CoinGecko主站或兼容CoinGecko接口的镜像/代理）有自己的地址、认证头、限流器和熔断器，
+并记录最近的响应时间，用其p95决定何时向备用数据源发出对冲请求
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from src.api.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def auth_headers(plan: str, api_key: Optional[str]) -> Dict[str, str]:
+    """CoinGecko API密钥请求头（pro套餐与demo密钥使用不同的头）"""
+    if not api_key:
+        return {}
+    return {'x-cg-pro-api-key' if plan == 'pro' else 'x-cg-demo-api-key': api_key}
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败达到阈值后断开，reset_timeout秒内不再向该数据源发请求；
+    之后进入半开状态放行请求，成功则恢复，失败则立即重新断开。
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 触发断开的连续失败次数
+            reset_timeout: 断开后重新尝试前的等待时间(秒)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None  # 断开时间，None表示闭合
+        self.lock = threading.Lock()
+        self.stats = {'opened': 0, 'rejected': 0}
+
+    @property
+    def state(self) -> str:
+        """closed（正常）/open（断开）/half_open（试探）"""
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self) -> bool:
+        """当前是否可以向该数据源发请求"""
+        if self.state == 'open':
+            self.stats['rejected'] += 1
+            return False
+        return True
+
+    def record_success(self):
+        """记录一次成功"""
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        """记录一次失败"""
+        with self.lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.stats['opened'] += 1
+                self.opened_at = time.monotonic()
+
+
+class DataSource:
+    """一个兼容CoinGecko接口的数据源"""
+
+    def __init__(self, name: str, base_url: str, headers: Optional[Dict[str, str]] = None,
+                 rate_limiter: Optional[RateLimiter] = None, breaker: Optional[CircuitBreaker] = None,
+                 latency_window: int = 100, min_samples: int = 10):
+        """
+        初始化数据源
+
+        Args:
+            name: 名称（用于日志和统计）
+            base_url: 接口根地址
+            headers: 该数据源专用的请求头（如API密钥）
+            rate_limiter: 限流器，缺省使用public套餐速率
+            breaker: 熔断器
+            latency_window: 参与p95计算的最近响应数
+            min_samples: 样本数不足时对冲延迟使用默认值
+        """
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.headers = dict(headers or {})
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = deque(maxlen=latency_window)
+        self.min_samples = min_samples
+        # hedged: 作为对冲或故障转移请求发出的次数；wins: 结果被采用的次数
+        self.stats = {'requests': 0, 'failures': 0, 'hedged': 0, 'wins': 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], failure_threshold: int = 5,
+                    reset_timeout: float = 30.0) -> 'DataSource':
+        """
+        从配置创建数据源
+
+        配置项：name、base_url、plan、api_key、rate_limit、max_retries、failure_threshold、reset_timeout
+        """
+        plan = config.get('plan') or ('demo' if config.get('api_key') else 'public')
+        return cls(
+            config.get('name') or config['base_url'],
+            config['base_url'],
+            auth_headers(plan, config.get('api_key')),
+            RateLimiter(plan, config.get('rate_limit') or None, max_retries=config.get('max_retries', 1)),
+            CircuitBreaker(config.get('failure_threshold', failure_threshold),
+                           config.get('reset_timeout', reset_timeout))
+        )
+
+    def record_success(self, latency: float):
+        """记录一次成功的响应及其耗时(秒)"""
+        self.stats['requests'] += 1
+        self.latencies.append(latency)
+        self.breaker.record_success()
+
+    def record_failure(self):
+        """记录一次失败（网络错误、超时或5xx/429重试耗尽）"""
+        self.stats['requests'] += 1
+        self.stats['failures'] += 1
+        self.breaker.record_failure()
+        if self.breaker.state == 'open':
+            logger.warning(f"数据源 {self.name} 熔断，{self.breaker.reset_timeout:.0f}秒内改用其他数据源")
+
+    def p95(self) -> Optional[float]:
+        """最近响应时间的p95(秒)，样本不足时返回None"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return float(np.percentile(np.fromiter(self.latencies, dtype=np.float64), 95))
+
+    def hedge_delay(self, default: float, minimum: float = 0.05) -> float:
+        """等待多久仍未响应时向下一个数据源发出对冲请求"""
+        p95 = self.p95()
+        return default if p95 is None else max(minimum, p95)
+
+    def metrics(self) -> Dict[str, Any]:
+        """请求/失败/对冲/胜出计数、熔断状态和p95"""
+        p95 = self.p95()
+        return {
+            'name': self.name,
+            'state': self.breaker.state,
+            'p95_seconds': None if p95 is None else round(p95, 3),
+            **self.stats,
+            **self.breaker.stats
+        }
@@ -20,7 +20,42 @@ class ConfigLoader:
             'coingecko': {
                 'enabled': True,
                 'api_key': '',  # 可选API密钥
-                'cache_ttl': 300  # 缓存时间(秒)
+                'cache_ttl': None,  # 未在cache_ttls中配置的接口的缓存时间(秒)，留空时各接口使用内置缓存时间
+                'cache_ttls': {},  # 各接口缓存时间(秒)，键为price/market/ohlc/intraday/info/supported_coins
+                'cache_max_stale': {  # 缓存过期后仍先返回旧数据、后台刷新的最长时间(秒)
+                    'price': 60,
+                    'market': 900,
+                    'ohlc': 900,
+                    'info': 86400,
+                    'supported_coins': 86400
+                },
+                'cache_max_entries': 1024,  # 缓存最大条目数
+                'cache_max_mb': 64,  # 缓存最大占用(MB)
+                'disk_cache': {  # 持久化缓存（进程重启和CLI调用时复用本地数据，默认关闭）
+                    'enabled': False,
+                    'path': '~/.cache/happy-fairy-crypto/api_cache.sqlite'
+                },
+                'incremental_sync': False,  # 市场数据过期后只获取新数据点(market_chart/range)，默认关闭
+                'vs_currencies': ['usd'],  # 计价货币，配置多个时一次请求取回全部
+                'intraday': {  # 按analysis.default_timeframe聚合5分钟/小时级数据为K线（周期小于1天时），默认关闭
+                    'enabled': False,
+                    'capacity': 500  # 每个币种最多保存的K线数
+                },
+                'bulk_markets': False,  # 批量分析时通过/coins/markets一次获取价格和近7天小时级sparkline行情（最高/最低价为收盘价）
+                'history_store': {  # 本地列式行情存储（memmap），增量同步的历史持久化，默认关闭
+                    'enabled': False,
+                    'path': '~/.local/share/happy-fairy-crypto/history'
+                },
+                'price_dtype': 'float64',  # 行情数据价格列类型(float64/float32)
+                'plan': '',  # API套餐(public/demo/pro)，留空时有密钥为demo、无密钥为public
+                'rate_limit': 0,  # 每分钟请求数，0表示使用套餐默认速率
+                'max_retries': 3,  # 429/5xx时的最大重试次数
+                'max_connections': 10,  # 异步客户端连接池最大并发连接数
+                'price_batch_window': 0.05,  # get_price合并为批量请求的时间窗口(秒)
+                'secondary_sources': [],  # 备用数据源（兼容CoinGecko接口的镜像/代理）
+                'hedge_delay': 1.0,  # 主数据源响应时间样本不足时，对冲请求前的等待时间(秒)
+                'failure_threshold': 5,  # 数据源连续失败多少次后熔断
+                'reset_timeout': 30  # 熔断后多久重新尝试(秒)
             }
         },
         'currencies': [
@@ -71,6 +106,17 @@ class ConfigLoader:
                     'sell_count': 13,
                     'enabled': True
                 }
+            },
+            'backtest': {
+                'rules': ['ma', 'macd', 'kdj', 'obv'],
+                'entry_score': 2,   # 投票得分达到该值时开多
+                'exit_score': -1,   # 投票得分小于等于该值时平仓
+                'fee_rate': 0.001,  # 单边手续费率
+                'workers': 1        # 多币种回测并行进程数
+            },
+            'parallel': {
+                'enabled': False,   # 在多个进程中并行计算技术指标
+                'workers': 0        # 工作进程数，0表示使用全部CPU核心
             }
         },
         'notification': {
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+列式行情数据容器 - 快乐魔仙数字货币分析技能
+用连续的NumPy数组保存时间戳和各价格列，替代dict-of-lists，支持零拷贝窗口视图
+"""
+
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterator
+
+import numpy as np
+
+
+class OHLCVSeries:
+    """
+    单个币种的列式行情序列
+
+    价格列为连续的float64（或float32）数组，时间戳为int64毫秒。
+    兼容原market_data字典的读取方式（get/[]/in），现有代码无需修改即可使用。
+    """
+
+    __slots__ = ('timestamps', 'prices', 'high', 'low', 'volumes', 'market_caps',
+                 'period_days', 'fetched_at')
+
+    FIELDS = ('prices', 'high', 'low', 'volumes', 'market_caps')
+
+    def __init__(self, prices, high=None, low=None, volumes=None, market_caps=None,
+                 timestamps=None, dtype=np.float64, period_days: Optional[int] = None,
+                 fetched_at: Optional[datetime] = None):
+        """
+        初始化行情序列
+
+        Args:
+            prices: 收盘价
+            high/low: 最高/最低价，缺省使用收盘价
+            volumes/market_caps: 成交量/市值，缺省为0
+            timestamps: 毫秒时间戳，缺省为空
+            dtype: 价格列的数据类型（float64或float32）
+            period_days: 数据覆盖的天数
+            fetched_at: 获取时间
+        """
+        self.prices = np.ascontiguousarray(prices, dtype=dtype)
+        n = len(self.prices)
+        self.high = self.prices if high is None else np.ascontiguousarray(high, dtype=dtype)
+        self.low = self.prices if low is None else np.ascontiguousarray(low, dtype=dtype)
+        self.volumes = np.zeros(n, dtype=dtype) if volumes is None else np.ascontiguousarray(volumes, dtype=dtype)
+        self.market_caps = np.zeros(n, dtype=dtype) if market_caps is None else np.ascontiguousarray(market_caps, dtype=dtype)
+        self.timestamps = np.zeros(n, dtype=np.int64) if timestamps is None else np.ascontiguousarray(timestamps, dtype=np.int64)
+        self.period_days = period_days
+        self.fetched_at = fetched_at or datetime.now()
+
+    @classmethod
+    def from_dict(cls, market_data: Dict[str, Any], dtype=np.float64) -> 'OHLCVSeries':
+        """从原market_data字典创建"""
+        return cls(
+            market_data.get('prices', []),
+            market_data.get('high'),
+            market_data.get('low'),
+            market_data.get('volumes'),
+            market_data.get('market_caps'),
+            market_data.get('timestamps'),
+            dtype=dtype,
+            period_days=market_data.get('period_days')
+        )
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def window(self, start: Optional[int] = None, stop: Optional[int] = None) -> 'OHLCVSeries':
+        """按位置截取窗口（各列均为原数组的视图，不复制数据）"""
+        window = object.__new__(OHLCVSeries)
+        for name in ('timestamps',) + self.FIELDS:
+            setattr(window, name, getattr(self, name)[start:stop])
+        window.period_days = self.period_days
+        window.fetched_at = self.fetched_at
+        return window
+
+    def tail(self, count: int) -> 'OHLCVSeries':
+        """最近count个数据点的窗口视图"""
+        return self.window(max(len(self) - count, 0))
+
+    def between(self, start_ms: int, end_ms: int) -> 'OHLCVSeries':
+        """按时间戳范围 [start_ms, end_ms] 截取窗口视图（时间戳须升序）"""
+        start = int(np.searchsorted(self.timestamps, start_ms, side='left'))
+        stop = int(np.searchsorted(self.timestamps, end_ms, side='right'))
+        return self.window(start, stop)
+
+    @property
+    def nbytes(self) -> int:
+        """各列占用的字节数（共用数组只计算一次）"""
+        arrays = {id(getattr(self, name)): getattr(self, name) for name in ('timestamps',) + self.FIELDS}
+        return sum(array.nbytes for array in arrays.values())
+
+    # 兼容原market_data字典的读取方式
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.window(key.start, key.stop)
+        if key in self.FIELDS or key == 'timestamps':
+            return getattr(self, key)
+        if key == 'data_points':
+            return len(self)
+        if key == 'period_days':
+            return self.period_days
+        if key == 'timestamp':
+            return self.fetched_at.isoformat()
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        return key in self.keys()
+
+    def keys(self):
+        return self.FIELDS + ('timestamps', 'data_points', 'period_days', 'timestamp')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为原market_data字典格式（列表）"""
+        return {key: (value.tolist() if isinstance(value, np.ndarray) else value)
+                for key, value in ((key, self[key]) for key in self.keys())}
+
+    def __repr__(self) -> str:
+        return f"OHLCVSeries(points={len(self)}, dtype={self.prices.dtype}, period_days={self.period_days})"
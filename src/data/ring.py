@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+定长K线环形缓冲区 - 快乐魔仙数字货币分析技能
+日内行情按周期聚合为K线写入每个币种一个的定长缓冲区：写满后覆盖最旧的K线，内存占用与运行时长无关；
+每列数据在长度为2倍容量的数组中镜像保存，任意时刻的全部K线都是一段连续内存：
+view()不复制但在下一次摄入后失效，snapshot()复制一份供客户端返回给调用方
+"""
+
+import re
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from src.data.ohlcv import OHLCVSeries
+
+# 周期单位 -> 毫秒
+TIMEFRAME_UNITS = {'m': 60000, 'h': 3600000, 'd': 86400000}
+
+
+def parse_timeframe(timeframe: str) -> int:
+    """'5m'/'2h'/'1d' -> 周期毫秒数"""
+    match = re.fullmatch(r'\s*(\d+)\s*([mhd])\s*', str(timeframe).lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"无效的K线周期: {timeframe}")
+    return int(match.group(1)) * TIMEFRAME_UNITS[match.group(2)]
+
+
+class OHLCVRing:
+    """
+    单个币种单个周期的K线环形缓冲区
+
+    追加K线为O(1)（批量摄入时向量化写入）；view()返回按时间升序的OHLCVSeries，各列是缓冲区的连续视图，
+    下一次摄入会改写视图中的数据，需要在摄入之后继续使用时用snapshot()。
+    """
+
+    def __init__(self, capacity: int, bar_ms: int, dtype=np.float64):
+        """
+        初始化缓冲区
+
+        Args:
+            capacity: 最多保存的K线数
+            bar_ms: K线周期(毫秒)
+            dtype: 价格列类型
+        """
+        self.capacity = capacity
+        self.bar_ms = bar_ms
+        self.dtype = np.dtype(dtype)
+        self.columns = {'timestamps': np.zeros(2 * capacity, dtype=np.int64)}
+        for field in OHLCVSeries.FIELDS:
+            self.columns[field] = np.zeros(2 * capacity, dtype=self.dtype)
+        self.start = 0  # 最旧一根K线在前半段中的位置
+        self.size = 0
+        self.last_raw_ms: Optional[int] = None  # 最后摄入的原始数据点时间戳
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def _write(self, offset: int, values: dict):
+        """从第offset根K线开始写入（offset + 数量 <= capacity），同时写入镜像位置"""
+        positions = (self.start + offset + np.arange(len(values['timestamps']))) % self.capacity
+        for name, column in self.columns.items():
+            column[positions] = values[name]
+            column[positions + self.capacity] = values[name]
+
+    def _append(self, values: dict):
+        """追加若干根K线，超出容量时覆盖最旧的K线"""
+        count = len(values['timestamps'])
+        if count >= self.capacity:
+            values = {name: column[-self.capacity:] for name, column in values.items()}
+            self.start, self.size = 0, 0
+            count = self.capacity
+        overflow = max(0, self.size + count - self.capacity)
+        self.start = (self.start + overflow) % self.capacity
+        self.size -= overflow
+        self._write(self.size, values)
+        self.size += count
+
+    def ingest(self, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray,
+               market_caps: np.ndarray) -> int:
+        """
+        摄入原始数据点（时间戳升序），按周期聚合为K线
+
+        早于已摄入数据的点被忽略；与最后一根K线同一周期的点并入该K线。
+        成交量和市值为滚动值，K线取周期内最后一个点的值。
+
+        Returns:
+            int: 新增的K线数
+        """
+        keep = ~np.isnan(prices)
+        if self.last_raw_ms is not None:
+            keep &= timestamps > self.last_raw_ms
+        timestamps, prices = timestamps[keep], prices[keep]
+        volumes, market_caps = volumes[keep], market_caps[keep]
+        if not len(timestamps):
+            return 0
+        self.last_raw_ms = int(timestamps[-1])
+
+        buckets = timestamps // self.bar_ms * self.bar_ms
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+        ends = np.concatenate([starts[1:], [len(buckets)]]) - 1
+        bars = {
+            'timestamps': buckets[starts],
+            'prices': prices[ends],
+            'high': np.maximum.reduceat(prices, starts),
+            'low': np.minimum.reduceat(prices, starts),
+            'volumes': volumes[ends],
+            'market_caps': market_caps[ends]
+        }
+
+        # 第一根与缓冲区最后一根K线同一周期时合并
+        if self.size and bars['timestamps'][0] == self.columns['timestamps'][self.start + self.size - 1]:
+            last = {name: column[self.start + self.size - 1] for name, column in self.columns.items()}
+            merged = {
+                'timestamps': last['timestamps'],
+                'prices': bars['prices'][0],
+                'high': max(last['high'], bars['high'][0]),
+                'low': min(last['low'], bars['low'][0]),
+                'volumes': bars['volumes'][0],
+                'market_caps': bars['market_caps'][0]
+            }
+            self._write(self.size - 1, {name: np.array([value]) for name, value in merged.items()})
+            bars = {name: column[1:] for name, column in bars.items()}
+
+        self._append(bars)
+        return len(bars['timestamps'])
+
+    def view(self, period_days: Optional[int] = None, copy: bool = False) -> OHLCVSeries:
+        """全部K线的连续视图（不复制数据，下一次摄入后失效）；copy为True时各列为独立的副本"""
+        series = object.__new__(OHLCVSeries)
+        for name, column in self.columns.items():
+            values = column[self.start:self.start + self.size]
+            setattr(series, name, values.copy() if copy else values)
+        series.period_days = period_days
+        series.fetched_at = datetime.now()
+        return series
+
+    def snapshot(self, period_days: Optional[int] = None) -> OHLCVSeries:
+        """全部K线的副本，之后的摄入不影响它"""
+        return self.view(period_days, copy=True)
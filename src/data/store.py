@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+本地列式行情存储 - 快乐魔仙数字货币分析技能
+每个币种一个目录，每列一个定长二进制文件（时间戳int64，其余float64），只在末尾追加；
+读取时通过numpy.memmap映射，按时间戳二分查找范围，返回的OHLCVSeries各列直接是映射视图，
+不把整段历史读入内存
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, List
+
+import numpy as np
+
+from src.data.ohlcv import OHLCVSeries
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {'timestamps': np.int64, **{field: np.float64 for field in OHLCVSeries.FIELDS}}
+
+
+class ColumnStore:
+    """
+    追加写入的列式时间序列存储
+
+    同一币种只允许一个进程写入；读取可以在任意多个进程中同时进行。
+    写入时先写各数据列，最后写时间戳列，行数以最短的列为准，读取方不会看到写了一半的行。
+    """
+
+    def __init__(self, root: str):
+        """
+        初始化存储
+
+        Args:
+            root: 存储根目录（不存在时自动创建）
+        """
+        self.root = os.path.expanduser(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.maps: Dict[str, OHLCVSeries] = {}  # 币种 -> 已映射的完整序列
+        logger.info(f"列式行情存储: {self.root}")
+
+    def _path(self, coin_id: str, column: str) -> str:
+        return os.path.join(self.root, coin_id, f"{column}.bin")
+
+    def _rows(self, coin_id: str) -> int:
+        """已完整写入的行数"""
+        rows = []
+        for column, dtype in COLUMNS.items():
+            path = self._path(coin_id, column)
+            rows.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+        return min(rows)
+
+    def coins(self) -> List[str]:
+        """已存储的币种"""
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def __contains__(self, coin_id: str) -> bool:
+        return self._rows(coin_id) > 0
+
+    def __len__(self) -> int:
+        return len(self.coins())
+
+    def load(self, coin_id: str) -> Optional[OHLCVSeries]:
+        """映射币种的完整序列（不读入内存），没有数据时返回None"""
+        series = self.maps.get(coin_id)
+        rows = self._rows(coin_id)
+        if series is not None and len(series) == rows:
+            return series
+        if rows == 0:
+            return None
+
+        series = object.__new__(OHLCVSeries)
+        for column, dtype in COLUMNS.items():
+            setattr(series, column, np.memmap(self._path(coin_id, column), dtype=dtype, mode='r', shape=(rows,)))
+        series.period_days = None
+        series.fetched_at = datetime.fromtimestamp(os.path.getmtime(self._path(coin_id, 'timestamps')))
+        self.maps[coin_id] = series
+        return series
+
+    def range(self, coin_id: str, start_ms: int, end_ms: int) -> Optional[OHLCVSeries]:
+        """时间戳在 [start_ms, end_ms] 内的数据（二分查找，零拷贝视图）"""
+        series = self.load(coin_id)
+        return None if series is None else series.between(start_ms, end_ms)
+
+    def tail(self, coin_id: str, count: int) -> Optional[OHLCVSeries]:
+        """最近count个数据点（零拷贝视图）"""
+        series = self.load(coin_id)
+        return None if series is None else series.tail(count)
+
+    def last_timestamp(self, coin_id: str) -> Optional[int]:
+        """最后一个数据点的时间戳"""
+        series = self.load(coin_id)
+        return None if series is None else int(series.timestamps[-1])
+
+    def append(self, coin_id: str, series: OHLCVSeries, replace_from: Optional[int] = None) -> int:
+        """
+        追加数据点（时间戳须升序）
+
+        时间戳不小于replace_from（缺省为新数据的第一个时间戳）的已存数据先被截掉再追加，
+        用于替换末尾未收盘的实时数据点。
+
+        Returns:
+            int: 追加后的总行数
+        """
+        os.makedirs(os.path.join(self.root, coin_id), exist_ok=True)
+        if len(series) == 0:
+            return self._rows(coin_id)
+
+        stored = self.load(coin_id)
+        replace_from = int(series.timestamps[0]) if replace_from is None else replace_from
+        keep = 0 if stored is None else int(np.searchsorted(stored.timestamps, replace_from, side='left'))
+        # 下次读取时按新长度重新映射
+        self.maps.pop(coin_id, None)
+        del stored
+
+        # 原位覆盖后再截断多余部分（先截断会使其他进程映射中的尾部暂时失效）；
+        # 时间戳列最后写入，保证读取方看到的每一行都完整
+        for column in list(OHLCVSeries.FIELDS) + ['timestamps']:
+            values = np.ascontiguousarray(getattr(series, column), dtype=COLUMNS[column])
+            path = self._path(coin_id, column)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(keep * values.itemsize)
+                f.write(values.tobytes())
+                f.truncate()
+
+        rows = keep + len(series)
+        logger.debug(f"存储 {coin_id}: 追加{len(series)}个数据点，共{rows}个")
+        return rows
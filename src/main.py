@@ -16,8 +16,11 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.config.loader import ConfigLoader
-from src.api.coingecko import CoinGeckoClient
+from src.api.async_coingecko import AsyncCoinGeckoClient
+from src.data.ring import parse_timeframe
 from src.analysis.indicators import TechnicalIndicators
+from src.analysis.backtest import Backtester
+from src.analysis.parallel import ParallelAnalyzer
 from src.notification.telegram import NotificationManager
 
 # 设置日志
@@ -42,9 +45,12 @@ class HappyFairyCryptoAnalysis:
         self.config_loader = None
         self.api_client = None
         self.indicators = None
+        self.parallel_analyzer = None
         self.notification_manager = None
         self.monitoring_task = None
         self.running = False
+        self.streaming_states = {}  # 各币种的增量指标状态
+        self.intraday_timeframe = None  # 日内K线周期（analysis.default_timeframe），None表示使用日线
         
         logger.info("🧚✨ 快乐魔仙数字货币分析系统初始化")
     
@@ -58,12 +64,44 @@ class HappyFairyCryptoAnalysis:
             
             # 2. 初始化API客户端
             api_config = self.config.get('api', {}).get('coingecko', {})
-            self.api_client = CoinGeckoClient(
+            disk_cache_config = api_config.get('disk_cache', {})
+            history_store_config = api_config.get('history_store', {})
+            intraday_config = api_config.get('intraday', {})
+            self.api_client = AsyncCoinGeckoClient(
                 api_key=api_config.get('api_key'),
-                cache_ttl=api_config.get('cache_ttl', 300)
+                cache_ttl=api_config.get('cache_ttl'),
+                price_dtype=api_config.get('price_dtype', 'float64'),
+                plan=api_config.get('plan') or None,
+                rate_limit=api_config.get('rate_limit') or None,
+                max_retries=api_config.get('max_retries', 3),
+                cache_ttls=api_config.get('cache_ttls'),
+                cache_max_stale=api_config.get('cache_max_stale'),
+                cache_max_entries=api_config.get('cache_max_entries', 1024),
+                cache_max_bytes=api_config.get('cache_max_mb', 64) * 1024 * 1024,
+                disk_cache_path=disk_cache_config.get('path') if disk_cache_config.get('enabled', False) else None,
+                incremental_sync=api_config.get('incremental_sync', False),
+                history_store_path=history_store_config.get('path') if history_store_config.get('enabled', False) else None,
+                vs_currencies=api_config.get('vs_currencies') or None,
+                intraday_capacity=intraday_config.get('capacity', 500),
+                secondary_sources=api_config.get('secondary_sources') or None,
+                hedge_delay=api_config.get('hedge_delay', 1.0),
+                failure_threshold=api_config.get('failure_threshold', 5),
+                reset_timeout=api_config.get('reset_timeout', 30),
+                max_connections=api_config.get('max_connections', 10),
+                price_batch_window=api_config.get('price_batch_window', 0.05)
             )
             logger.info("API客户端初始化完成")
             
+            # 日内周期使用5分钟/小时级数据聚合的K线，日线及以上周期使用market_chart日线
+            timeframe = self.config.get('analysis', {}).get('default_timeframe', '1d')
+            if intraday_config.get('enabled', False):
+                try:
+                    if parse_timeframe(timeframe) < 86400000:
+                        self.intraday_timeframe = timeframe
+                        logger.info(f"使用{timeframe}周期日内K线进行分析")
+                except ValueError as e:
+                    logger.warning(f"{e}，使用日线数据")
+            
             # 3. 初始化技术指标引擎
             analysis_config = self.config.get('analysis', {})
             indicators_config = analysis_config.get('indicators', {})
@@ -96,6 +134,11 @@ class HappyFairyCryptoAnalysis:
             self.indicators = TechnicalIndicators(tech_config)
             logger.info("技术指标引擎初始化完成")
             
+            # 多进程并行分析（可选）
+            parallel_config = analysis_config.get('parallel', {})
+            if parallel_config.get('enabled', False):
+                self.parallel_analyzer = ParallelAnalyzer(tech_config, parallel_config.get('workers', 0))
+            
             # 4. 初始化通知管理器
             self.notification_manager = NotificationManager(self.config)
             logger.info("通知管理器初始化完成")
@@ -107,70 +150,199 @@ class HappyFairyCryptoAnalysis:
             logger.error(f"系统初始化失败: {e}")
             return False
     
+    async def _fetch_currency_data(self, currency_symbol: str, bulk: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """获取币种配置、当前价格和市场数据（bulk中有该币种的批量行情时直接使用）"""
+        # 获取币种配置
+        currency_config = self.config_loader.get_currency_config(currency_symbol)
+        if not currency_config:
+            return {'error': f'未找到币种配置: {currency_symbol}'}
+        
+        coin_id = currency_config.get('coin_id')
+        currency_name = currency_config.get('name', currency_symbol)
+        
+        logger.info(f"开始分析 {currency_name} ({currency_symbol})")
+        
+        if bulk and coin_id in bulk:
+            price_data, market_data = bulk[coin_id]['price_data'], bulk[coin_id]['market_data']
+        else:
+            # 1. 获取当前价格 2. 获取市场数据（用于技术分析），两个请求同时进行
+            if self.intraday_timeframe:
+                market_request = self.api_client.get_intraday_data(coin_id, self.intraday_timeframe)
+            else:
+                market_request = self.api_client.get_market_data(coin_id, days=7)
+            price_data, market_data = await asyncio.gather(self.api_client.get_price(coin_id), market_request)
+        if 'error' in price_data:
+            return {'error': f'获取价格失败: {price_data["error"]}'}
+        
+        if 'error' in market_data:
+            return {'error': f'获取市场数据失败: {market_data["error"]}'}
+        
+        return {
+            'currency_config': currency_config,
+            'price_data': price_data,
+            'market_data': market_data
+        }
+    
+    def _build_result(self, currency_symbol: str, fetched: Dict[str, Any], analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+        """合并行情数据与技术分析结果"""
+        if 'error' in analysis_result:
+            return {'error': f'技术分析失败: {analysis_result["error"]}'}
+        
+        currency_config = fetched['currency_config']
+        currency_name = currency_config.get('name', currency_symbol)
+        
+        result = {
+            'currency': currency_symbol,
+            'name': currency_name,
+            'coin_id': currency_config.get('coin_id'),
+            'price_data': fetched['price_data'],
+            'market_data': fetched['market_data'],
+            'technical_analysis': analysis_result,
+            'analysis_time': datetime.now().isoformat(),
+            'success': True
+        }
+        
+        logger.info(f"{currency_name} 分析完成: {analysis_result.get('signals', {}).get('technical_signal', '未知')}")
+        return result
+    
     async def analyze_currency(self, currency_symbol: str) -> Dict[str, Any]:
         """分析指定币种"""
         try:
-            # 获取币种配置
-            currency_config = self.config_loader.get_currency_config(currency_symbol)
-            if not currency_config:
-                return {'error': f'未找到币种配置: {currency_symbol}'}
-            
-            coin_id = currency_config.get('coin_id')
-            currency_name = currency_config.get('name', currency_symbol)
-            
-            logger.info(f"开始分析 {currency_name} ({currency_symbol})")
+            fetched = await self._fetch_currency_data(currency_symbol)
+            if 'error' in fetched:
+                return fetched
+            
+            # 3. 技术指标分析（启用并行时在工作进程中计算，不阻塞事件循环）
+            if self.parallel_analyzer:
+                parallel_results = await self.parallel_analyzer.analyze_many({currency_symbol: fetched['market_data']})
+                analysis_result = parallel_results[currency_symbol]
+            else:
+                analysis_result = self.indicators.analyze_all_indicators(fetched['market_data'])
             
-            # 1. 获取当前价格
-            price_data = self.api_client.get_price(coin_id)
-            if 'error' in price_data:
-                return {'error': f'获取价格失败: {price_data["error"]}'}
+            # 4. 合并结果
+            return self._build_result(currency_symbol, fetched, analysis_result)
             
-            # 2. 获取市场数据（用于技术分析）
-            market_data = self.api_client.get_market_data(coin_id, days=7)
-            if 'error' in market_data:
-                return {'error': f'获取市场数据失败: {market_data["error"]}'}
+        except Exception as e:
+            logger.error(f"分析 {currency_symbol} 失败: {e}")
+            return {'error': f'分析失败: {str(e)}', 'success': False}
+    
+    async def analyze_currency_incremental(self, currency_symbol: str, price_data: Dict[str, Any]) -> Dict[str, Any]:
+        """增量分析指定币种（首次用完整历史初始化状态，之后每个报价只做O(1)更新）"""
+        state = self.streaming_states.get(currency_symbol)
+        if state is None:
+            result = await self.analyze_currency(currency_symbol)
+            if result.get('success', False):
+                # K线周期与初始化使用的历史数据一致：日内K线为analysis.default_timeframe，否则为日线
+                bar_interval = parse_timeframe(self.intraday_timeframe) // 1000 if self.intraday_timeframe else 86400
+                self.streaming_states[currency_symbol] = self.indicators.create_streaming_state(
+                    result['market_data'], bar_interval)
+            return result
+        
+        try:
+            currency_config = self.config_loader.get_currency_config(currency_symbol) or {}
+            currency_name = currency_config.get('name', currency_symbol)
             
-            # 3. 技术指标分析
-            analysis_result = self.indicators.analyze_all_indicators(market_data)
+            analysis_result = self.indicators.analyze_streaming(
+                state,
+                price_data.get('price', 0),
+                price_data.get('volume_24h', 0)
+            )
             if 'error' in analysis_result:
                 return {'error': f'技术分析失败: {analysis_result["error"]}'}
             
-            # 4. 合并结果
-            result = {
+            logger.info(f"{currency_name} 增量分析完成: {analysis_result['signals']['technical_signal']}")
+            return {
                 'currency': currency_symbol,
                 'name': currency_name,
-                'coin_id': coin_id,
+                'coin_id': currency_config.get('coin_id'),
                 'price_data': price_data,
-                'market_data': market_data,
                 'technical_analysis': analysis_result,
                 'analysis_time': datetime.now().isoformat(),
                 'success': True
             }
             
-            logger.info(f"{currency_name} 分析完成: {analysis_result.get('signals', {}).get('technical_signal', '未知')}")
-            return result
-            
         except Exception as e:
-            logger.error(f"分析 {currency_symbol} 失败: {e}")
+            logger.error(f"增量分析 {currency_symbol} 失败: {e}")
             return {'error': f'分析失败: {str(e)}', 'success': False}
     
     async def analyze_all_currencies(self) -> Dict[str, Dict[str, Any]]:
-        """分析所有启用的币种"""
+        """分析所有启用的币种（先获取全部行情，再批量计算技术指标）"""
         results = {}
+        fetched_data = {}
         enabled_currencies = self.config_loader.get_enabled_currencies()
         
         logger.info(f"开始分析 {len(enabled_currencies)} 个币种")
         
-        for currency in enabled_currencies:
-            symbol = currency.get('symbol')
-            result = await self.analyze_currency(symbol)
-            results[symbol] = result
+        coin_ids = [currency.get('coin_id') for currency in enabled_currencies]
+        bulk = None
+        if self.config.get('api', {}).get('coingecko', {}).get('bulk_markets', False):
+            # 价格快照和近7天行情通过/coins/markets批量获取（每250个币种一个请求）；
+            # 行情为小时级sparkline（最高价=最低价=收盘价，成交量为当前24小时值），与analyze_currency的日线不同
+            bulk = await self.api_client.get_markets(coin_ids=coin_ids)
+            logger.info(f"批量行情覆盖 {len(bulk)}/{len(coin_ids)} 个币种")
+        else:
+            # 所有币种的当前价格合并为批量请求预先获取，之后各币种的get_price直接命中缓存
+            await self.api_client.get_prices(coin_ids)
+        
+        # 各币种的请求并发进行（由客户端限流器控制请求速率）；批量行情缺少的币种逐个获取
+        symbols = [currency.get('symbol') for currency in enabled_currencies]
+        all_fetched = await asyncio.gather(*(self._fetch_currency_data(symbol, bulk) for symbol in symbols),
+                                           return_exceptions=True)
+        
+        for symbol, fetched in zip(symbols, all_fetched):
+            if isinstance(fetched, Exception):
+                logger.error(f"获取 {symbol} 数据失败: {fetched}")
+                fetched = {'error': f'分析失败: {str(fetched)}', 'success': False}
             
-            # 短暂延迟，避免API限制
-            await asyncio.sleep(1)
+            if 'error' in fetched:
+                results[symbol] = fetched
+            else:
+                fetched_data[symbol] = fetched
+        
+        # 批量技术指标分析：所有币种一次计算（启用并行时分配到多个工作进程）
+        market_data_by_symbol = {symbol: fetched['market_data'] for symbol, fetched in fetched_data.items()}
+        if self.parallel_analyzer:
+            batch_results = await self.parallel_analyzer.analyze_many(market_data_by_symbol)
+        else:
+            batch_results = self.indicators.analyze_market_data_batch(market_data_by_symbol)
+        for symbol, fetched in fetched_data.items():
+            results[symbol] = self._build_result(symbol, fetched, batch_results.get(symbol, {'error': '缺少分析结果'}))
         
         logger.info(f"所有币种分析完成")
-        return results
+        return {currency.get('symbol'): results[currency.get('symbol')] for currency in enabled_currencies}
+    
+    async def backtest_currency(self, currency_symbol: str, days: int = 90) -> Dict[str, Any]:
+        """用历史行情回测当前指标配置"""
+        try:
+            currency_config = self.config_loader.get_currency_config(currency_symbol)
+            if not currency_config:
+                return {'error': f'未找到币种配置: {currency_symbol}'}
+            
+            backtest_config = dict(self.config.get('analysis', {}).get('backtest', {}))
+            workers = backtest_config.pop('workers', 1)
+            backtester = Backtester(self.indicators.config, backtest_config, workers)
+            
+            # 日线数据：在回测区间之前多取指标预热所需的天数，预热期内不持仓
+            market_data = await self.api_client.get_market_data(currency_config.get('coin_id'),
+                                                                days=days + backtester.warmup)
+            if 'error' in market_data:
+                return {'error': f'获取市场数据失败: {market_data["error"]}'}
+            
+            results = backtester.run(market_data, [currency_symbol])
+            if 'error' in results:
+                return results
+            
+            return {
+                'currency': currency_symbol,
+                'name': currency_config.get('name', currency_symbol),
+                'days': days,
+                'backtest': results[currency_symbol],
+                'success': True
+            }
+            
+        except Exception as e:
+            logger.error(f"回测 {currency_symbol} 失败: {e}")
+            return {'error': f'回测失败: {str(e)}', 'success': False}
     
     async def send_analysis_report(self, currency_symbol: str, analysis_result: Dict[str, Any]) -> bool:
         """发送分析报告"""
@@ -217,12 +389,14 @@ class HappyFairyCryptoAnalysis:
             try:
                 enabled_currencies = self.config_loader.get_enabled_currencies()
                 
-                for currency in enabled_currencies:
+                # 同时获取所有币种的当前价格（客户端自动合并为批量请求）
+                all_prices = await asyncio.gather(
+                    *(self.api_client.get_price(currency.get('coin_id')) for currency in enabled_currencies)
+                )
+                
+                for currency, price_data in zip(enabled_currencies, all_prices):
                     symbol = currency.get('symbol')
-                    coin_id = currency.get('coin_id')
                     
-                    # 获取当前价格
-                    price_data = self.api_client.get_price(coin_id)
                     if 'error' in price_data:
                         logger.error(f"获取 {symbol} 价格失败: {price_data['error']}")
                         continue
@@ -244,15 +418,15 @@ class HappyFairyCryptoAnalysis:
                     # 更新上次价格
                     last_prices[symbol] = current_price
                     
-                    # 分析并发送报告
-                    analysis_result = await self.analyze_currency(symbol)
+                    # 分析并发送报告（增量更新，不再每轮重算全部历史）
+                    analysis_result = await self.analyze_currency_incremental(symbol, price_data)
                     if analysis_result.get('success', False):
                         await self.send_analysis_report(symbol, analysis_result)
-                    
-                    # 短暂延迟
-                    await asyncio.sleep(2)
                 
                 # 等待下一次检查
+                logger.debug(f"API配额: {self.api_client.get_rate_limit_usage()}")
+                logger.debug(f"API缓存: {self.api_client.get_cache_metrics()}")
+                logger.debug(f"数据源: {self.api_client.get_source_metrics()}")
                 logger.debug(f"监控循环完成，等待 {check_interval} 秒")
                 await asyncio.sleep(check_interval)
                 
@@ -303,8 +477,35 @@ class HappyFairyCryptoAnalysis:
         if self.notification_manager:
             self.notification_manager.shutdown()
         
+        # 关闭并行分析进程池
+        if self.parallel_analyzer:
+            self.parallel_analyzer.shutdown()
+        
+        # 关闭API连接池
+        if self.api_client:
+            await self.api_client.close()
+        
         logger.info("监控服务已停止")
     
+    def print_backtest_result(self, result: Dict[str, Any]):
+        """打印回测结果到控制台"""
+        if 'error' in result:
+            print(f"❌ 错误: {result['error']}")
+            return
+        
+        backtest = result['backtest']
+        print(f"\n{'='*50}")
+        print(f"🧪 {result['name']} ({result['currency']}) 回测报告（最近{result['days']}天）")
+        print(f"{'='*50}")
+        print(f"💰 策略收益: {backtest['total_return'] * 100:+.2f}%")
+        print(f"📊 持有收益: {backtest['buy_and_hold'] * 100:+.2f}%")
+        print(f"📉 最大回撤: {backtest['max_drawdown'] * 100:.2f}%")
+        print(f"🔁 交易次数: {backtest['trades']}")
+        print(f"⏱️ 持仓时间占比: {backtest['exposure'] * 100:.1f}%")
+        print(f"{'='*50}")
+        print("⚠️  风险提示: 历史表现不代表未来收益。")
+        print(f"{'='*50}\n")
+    
     def print_analysis_result(self, result: Dict[str, Any]):
         """打印分析结果到控制台"""
         if 'error' in result:
@@ -348,6 +549,8 @@ async def main_async():
     parser.add_argument('--config', '-c', help='配置文件路径')
     parser.add_argument('--analyze', '-a', help='分析指定币种 (如: BTC, ETH)')
     parser.add_argument('--analyze-all', action='store_true', help='分析所有启用的币种')
+    parser.add_argument('--backtest', '-b', help='回测指定币种 (如: BTC, ETH)')
+    parser.add_argument('--days', type=int, default=90, help='回测使用的历史天数')
     parser.add_argument('--monitor', '-m', action='store_true', help='启动监控服务')
     parser.add_argument('--stop', '-s', action='store_true', help='停止监控服务')
     parser.add_argument('--test', '-t', action='store_true', help='测试系统功能')
@@ -375,8 +578,11 @@ async def main_async():
             print("🧪 测试系统功能...")
             
             # 测试API连接
-            api_status = analyzer.api_client.check_api_status()
+            api_status = await analyzer.api_client.check_api_status()
             print(f"📡 API状态: {api_status.get('status', '未知')}")
+            usage = analyzer.api_client.get_rate_limit_usage()
+            print(f"⏱️ API配额: {usage['plan']}套餐，{usage['rate_per_minute']:.0f}次/分钟，"
+                  f"最近一分钟已用{usage['requests_last_minute']}次")
             
             # 测试通知连接
             if analyzer.notification_manager:
@@ -402,6 +608,11 @@ async def main_async():
             for symbol, result in results.items():
                 analyzer.print_analysis_result(result)
         
+        elif args.backtest:
+            # 回测指定币种
+            result = await analyzer.backtest_currency(args.backtest.upper(), args.days)
+            analyzer.print_backtest_result(result)
+        
         elif args.monitor:
             # 启动监控服务
             print("🚀 启动监控服务...")
@@ -445,6 +656,10 @@ async def main_async():
         # 确保监控服务停止
         if analyzer.running:
             await analyzer.stop_monitoring()
+        else:
+            if analyzer.parallel_analyzer:
+                analyzer.parallel_analyzer.shutdown()
+            await analyzer.api_client.close()
 
 def main():
     """主函数"""
@@ -68,6 +68,827 @@ class TestCoinGeckoClient(unittest.TestCase):
         self.assertTrue(hasattr(self.client, 'get_coin_info'))
         self.assertTrue(hasattr(self.client, 'get_market_data'))
 
+    def test_single_flight_threads(self):
+        """测试多个线程同时请求同一缓存键时只发出一次请求"""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+
+        calls = []
+
+        def slow_get_json(endpoint):
+            calls.append(endpoint.path)
+            time.sleep(0.2)
+            return {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin'}
+
+        with mock.patch.object(self.client, '_get_json', side_effect=slow_get_json):
+            with ThreadPoolExecutor(4) as pool:
+                results = list(pool.map(lambda _: self.client.get_coin_info('bitcoin'), range(4)))
+
+        self.assertEqual(calls, ['/coins/bitcoin'])
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.client.inflight, {})
+
+class TestAsyncCoinGeckoClient(unittest.TestCase):
+    """CoinGecko异步客户端测试（使用本地模拟服务器，不访问外网）"""
+
+    async def _run_with_server(self, scenario, **client_kwargs):
+        """启动模拟CoinGecko服务器，用指向它的客户端执行scenario"""
+        import asyncio
+        from aiohttp import web
+        from src.api.async_coingecko import AsyncCoinGeckoClient
+
+        self.requests = []
+
+        async def simple_price(request):
+            self.requests.append(request.path)
+            await asyncio.sleep(0.2)
+            rates = {'usd': 1.0, 'eur': 0.9, 'cny': 7.0}
+            return web.json_response({
+                coin_id: {
+                    **{key: value for currency in request.query['vs_currencies'].split(',') for key, value in
+                       ((currency, 100.0 * rates[currency]), (f'{currency}_24h_change', 1.5))},
+                    'last_updated_at': 1
+                }
+                for coin_id in request.query['ids'].split(',') if coin_id != 'missing'
+            })
+
+        async def market_chart(request):
+            self.requests.append(request.path)
+            if request.match_info['coin_id'] == 'missing':
+                return web.json_response({'error': 'coin not found'}, status=404)
+            days = int(request.query['days'])
+            points = [[86400000 * i, 100.0 + i] for i in range(days + 1)]
+            return web.json_response({'prices': points, 'market_caps': points, 'total_volumes': points})
+
+        async def market_chart_range(request):
+            # 小时级数据点，价格为距离1970年的小时数
+            self.requests.append(request.path)
+            hours = range(int(request.query['from']) // 3600 + 1, int(request.query['to']) // 3600 + 1)
+            points = [[hour * 3600000, float(hour)] for hour in hours]
+            return web.json_response({'prices': points, 'market_caps': points, 'total_volumes': points})
+
+        async def ohlc(request):
+            self.requests.append(request.path)
+            # 4小时K线：最高价=收盘价+2，最低价=收盘价-3
+            candles = [[14400000 * i, 100.0, 102.0 + i / 6, 97.0 + i / 6, 100.0 + i / 6] for i in range(1, 43)]
+            return web.json_response(candles)
+
+        async def ping(request):
+            return web.json_response({'gecko_says': '(V3) To the Moon!'})
+
+        async def markets(request):
+            self.requests.append(request.path)
+            page = int(request.query['page'])
+            ids = request.query['ids'].split(',') if 'ids' in request.query else \
+                [f'coin-{i}' for i in range((page - 1) * 250, page * 250)]
+            return web.json_response([{
+                'id': coin_id, 'current_price': 10.0, 'market_cap': 1000.0, 'total_volume': 50.0,
+                'circulating_supply': 100.0, 'price_change_percentage_24h_in_currency': -2.0,
+                'price_change_percentage_7d_in_currency': 5.0, 'last_updated': '2024-01-08T00:30:00.000Z',
+                'sparkline_in_7d': {'price': [9.0 + i / 168 for i in range(168)]}
+            } for coin_id in ids if coin_id != 'missing'])
+
+        async def coin_info(request):
+            # 第一次请求返回429，之后正常
+            self.requests.append(request.path)
+            if self.requests.count(request.path) == 1:
+                return web.json_response({'error': 'rate limited'}, status=429, headers={'Retry-After': '0'})
+            return web.json_response({'id': request.match_info['coin_id'], 'symbol': 'btc', 'name': 'Bitcoin'})
+
+        app = web.Application()
+        app.router.add_get('/simple/price', simple_price)
+        app.router.add_get('/coins/{coin_id}/market_chart', market_chart)
+        app.router.add_get('/coins/{coin_id}/market_chart/range', market_chart_range)
+        app.router.add_get('/coins/{coin_id}/ohlc', ohlc)
+        app.router.add_get('/ping', ping)
+        app.router.add_get('/coins/markets', markets)
+        app.router.add_get('/coins/{coin_id}', coin_info)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        try:
+            async with AsyncCoinGeckoClient(rate_limit=6000, **client_kwargs) as client:
+                client.base_url = f"http://127.0.0.1:{port}"
+                return await scenario(client)
+        finally:
+            await runner.cleanup()
+
+    def test_concurrent_requests(self):
+        """测试多个请求同时进行，结果结构与同步客户端一致"""
+        import asyncio
+        import time
+
+        async def scenario(client):
+            start = time.perf_counter()
+            prices = await asyncio.gather(*(client.get_price(coin) for coin in ('a', 'b', 'c', 'd')))
+            elapsed = time.perf_counter() - start
+            market_data = await client.get_market_data('bitcoin', days=7)
+            status = await client.check_api_status()
+            return prices, elapsed, market_data, status
+
+        prices, elapsed, market_data, status = asyncio.run(self._run_with_server(scenario))
+
+        # 4个各耗时0.2秒的请求并发完成
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual([price['price'] for price in prices], [100.0] * 4)
+        self.assertEqual(prices[0]['change_24h'], 1.5)
+        self.assertEqual(len(market_data), 8)
+        self.assertEqual(market_data['timestamps'][1], 86400000)
+        # 最高/最低价来自当天的K线，而不是随机模拟
+        self.assertAlmostEqual(market_data['high'][1], 103.0)
+        self.assertAlmostEqual(market_data['low'][1], 97.0 + 1 / 6)
+        self.assertEqual(status['status'], 'online')
+
+    def test_cache_and_errors(self):
+        """测试缓存命中和请求失败时返回error"""
+        import asyncio
+
+        async def scenario(client):
+            first = await client.get_price('bitcoin')
+            second = await client.get_price('bitcoin')
+            missing = await client.get_market_data('missing')
+            return first, second, missing
+
+        first, second, missing = asyncio.run(self._run_with_server(scenario))
+
+        self.assertIs(first, second)
+        self.assertEqual(self.requests.count('/simple/price'), 1)
+        self.assertIn('error', missing)
+
+    def test_retry_after_429(self):
+        """测试429响应按Retry-After重试，并记录在配额使用情况中"""
+        import asyncio
+
+        async def scenario(client):
+            return await client.get_coin_info('bitcoin'), client.get_rate_limit_usage()
+
+        info, usage = asyncio.run(self._run_with_server(scenario))
+
+        self.assertEqual(info['name'], 'Bitcoin')
+        self.assertEqual(self.requests, ['/coins/bitcoin', '/coins/bitcoin'])
+        self.assertEqual(usage['throttled'], 1)
+        self.assertLess(usage['current_rate_per_minute'], usage['rate_per_minute'])
+
+    def test_price_coalescing(self):
+        """测试同一窗口内的get_price合并为一次批量请求，结果拆回各调用方"""
+        import asyncio
+
+        async def scenario(client):
+            return await asyncio.gather(*(client.get_price(coin) for coin in ('a', 'b', 'a', 'missing')))
+
+        results = asyncio.run(self._run_with_server(scenario))
+
+        self.assertEqual(self.requests, ['/simple/price'])
+        self.assertEqual(results[0]['price'], 100.0)
+        self.assertIs(results[0], results[2])
+        self.assertIn('error', results[3])
+
+    def test_price_batch_limits(self):
+        """测试批量价格请求遵守币种数量和URL长度限制"""
+        import requests
+        from src.api import coingecko
+
+        client = coingecko.CoinGeckoClient()
+        coin_ids = [f'coin-{i:04d}' for i in range(600)]
+        endpoints = client._price_batch_endpoints(coin_ids, 'usd')
+
+        batches = [endpoint.params['ids'].split(',') for endpoint in endpoints]
+        self.assertEqual(sum(batches, []), coin_ids)
+        for endpoint, batch in zip(endpoints, batches):
+            self.assertLessEqual(len(batch), coingecko.MAX_IDS_PER_REQUEST)
+            url = requests.Request('GET', client.base_url + endpoint.path, params=endpoint.params).prepare().url
+            self.assertLessEqual(len(url), coingecko.MAX_URL_LENGTH)
+
+    def test_close_cancels_pending_prices(self):
+        """测试关闭客户端时合并窗口中和请求中的get_price调用被取消，不会一直等待"""
+        import asyncio
+
+        async def scenario(client):
+            requesting = asyncio.ensure_future(client.get_price('bitcoin'))
+            await asyncio.sleep(0.1)  # 批量请求已发出，模拟服务器0.2秒后响应
+            waiting = asyncio.ensure_future(client.get_price('ethereum'))
+            await asyncio.sleep(0)
+            await client.close()
+            return await asyncio.wait_for(asyncio.gather(requesting, waiting, return_exceptions=True), 1)
+
+        results = asyncio.run(self._run_with_server(scenario))
+
+        for result in results:
+            self.assertIsInstance(result, asyncio.CancelledError)
+
+    def test_bulk_markets(self):
+        """测试/coins/markets批量获取价格快照和小时级行情，并写入价格缓存"""
+        import asyncio
+
+        async def scenario(client):
+            selected = await client.get_markets(coin_ids=['a', 'b', 'missing'])
+            price = await client.get_price('a')
+            top = await client.get_markets(pages=2)
+            return selected, price, top, list(client.cache.entries)
+
+        selected, price, top, keys = asyncio.run(self._run_with_server(scenario))
+
+        self.assertEqual(sorted(selected), ['a', 'b'])
+        self.assertIs(price, selected['a']['price_data'])
+        self.assertEqual(price['change_24h'], -2.0)
+        self.assertEqual(price['last_updated'], 1704673800)
+        market_data = selected['a']['market_data']
+        self.assertEqual(len(market_data), 168)
+        self.assertEqual(market_data['timestamps'][-1], 1704672000000)
+        self.assertEqual(market_data['timestamps'][1] - market_data['timestamps'][0], 3600000)
+        self.assertAlmostEqual(market_data['market_caps'][0], 900.0)
+        self.assertEqual(len(top), 500)
+        self.assertNotIn('/simple/price', self.requests)
+        self.assertEqual(self.requests.count('/coins/markets'), 3)
+        # 只写入价格缓存，sparkline行情不占用缓存条目
+        self.assertFalse([key for key in keys if not key.startswith('price_')])
+
+    def test_multi_quote_prices(self):
+        """测试多计价货币模式下一次请求取回所有计价货币，每个币种只缓存一条记录"""
+        import asyncio
+
+        async def scenario(client):
+            quotes = await asyncio.gather(*(client.get_price('bitcoin', currency) for currency in ('usd', 'eur', 'cny')))
+            prices = await client.get_prices(['bitcoin', 'ethereum'], 'eur')
+            return quotes, prices, list(client.cache.entries)
+
+        quotes, prices, keys = asyncio.run(self._run_with_server(scenario, vs_currencies=['usd', 'eur', 'cny']))
+
+        self.assertEqual([quote['price'] for quote in quotes], [100.0, 90.0, 700.0])
+        self.assertEqual(quotes[1]['change_24h'], 1.5)
+        self.assertEqual(quotes[2]['quotes'], {'usd': 100.0, 'eur': 90.0, 'cny': 700.0})
+        self.assertEqual(prices['ethereum']['price'], 90.0)
+        self.assertEqual(self.requests, ['/simple/price', '/simple/price'])
+        self.assertEqual(sorted(keys), ['price_bitcoin_usd_eur_cny', 'price_ethereum_usd_eur_cny'])
+
+    def test_window_slices(self):
+        """测试较短窗口从已缓存的较长窗口截取（零拷贝），每个币种只获取一次最长窗口"""
+        import asyncio
+        import numpy as np
+
+        async def scenario(client):
+            long = await client.get_market_data('bitcoin', days=30)
+            short = await client.get_market_data('bitcoin', days=7)
+            first = await client.get_market_data('ethereum', days=7)
+            await client.get_market_data('ethereum', days=30)
+            again = await client.get_market_data('ethereum', days=7)
+            return long, short, first, again, [key for key in client.cache.entries if key.startswith('market_')]
+
+        long, short, first, again, keys = asyncio.run(self._run_with_server(scenario))
+
+        self.assertEqual(len(long), 31)
+        self.assertEqual(len(short), 8)
+        self.assertEqual(short.period_days, 7)
+        self.assertTrue(np.shares_memory(short.prices, long.prices))
+        self.assertEqual(short['timestamps'][-1], long['timestamps'][-1])
+        self.assertEqual(len(first), 8)
+        self.assertEqual(len(again), 8)
+        self.assertEqual(again['prices'][-1], 130.0)  # 来自30天窗口的最后一个数据点
+        self.assertEqual(self.requests.count('/coins/bitcoin/market_chart'), 1)
+        self.assertEqual(self.requests.count('/coins/ethereum/market_chart'), 2)
+        self.assertEqual(sorted(keys), ['market_bitcoin_30', 'market_ethereum_30', 'market_ethereum_7'])
+
+    def test_window_high_low_independent_of_cache(self):
+        """测试从较长缓存窗口截取的行情与直接获取的最高/最低价一致，缓存中的序列不被修改"""
+        import time
+        import numpy as np
+        from unittest import mock
+        from src.api.coingecko import CoinGeckoClient
+
+        day = 86400000
+        now = int(time.time() * 1000) // day * day
+
+        def fake_get_json(endpoint):
+            days = endpoint.params['days']
+            if endpoint.path.endswith('/ohlc'):
+                # 30天以内为4小时K线，更长的窗口为4天K线
+                step = 4 * 3600000 if days <= 30 else 4 * day
+                count = days * day // step
+                return [[now - step * (count - i - 1), 100.0, 110.0 + i % 7, 90.0 - i % 5, 100.0]
+                        for i in range(count)]
+            points = [[now - day * i, 100.0] for i in range(days, -1, -1)]
+            return {'prices': points, 'market_caps': points, 'total_volumes': points}
+
+        widened = CoinGeckoClient()
+        direct = CoinGeckoClient()
+        with mock.patch.object(widened, '_get_json', side_effect=fake_get_json), \
+                mock.patch.object(direct, '_get_json', side_effect=fake_get_json):
+            long = widened.get_market_data('bitcoin', days=90)
+            from_cache = widened.get_market_data('bitcoin', days=7)
+            fetched = direct.get_market_data('bitcoin', days=7)
+
+        np.testing.assert_array_equal(from_cache['high'], fetched['high'])
+        np.testing.assert_array_equal(from_cache['low'], fetched['low'])
+        cached = widened.cache.get('market_bitcoin_90')
+        np.testing.assert_array_equal(cached.high, cached.prices)
+        self.assertFalse(np.shares_memory(long.high, from_cache.high))
+
+    def test_window_recorded_after_success(self):
+        """测试获取失败不扩大窗口，较长窗口的缓存过期后恢复按请求的窗口获取"""
+        import requests
+        from unittest import mock
+        from src.api.coingecko import CoinGeckoClient
+
+        fetched = []
+        failing = [True]
+
+        def fake_get_json(endpoint):
+            if endpoint.path.endswith('/ohlc'):
+                return []
+            fetched.append(endpoint.params['days'])
+            if failing[0]:
+                raise requests.exceptions.ConnectionError('down')
+            points = [[86400000 * i, 100.0 + i] for i in range(endpoint.params['days'] + 1)]
+            return {'prices': points, 'market_caps': points, 'total_volumes': points}
+
+        client = CoinGeckoClient()
+        with mock.patch.object(client, '_get_json', side_effect=fake_get_json):
+            self.assertIn('error', client.get_market_data('bitcoin', days=90))
+            failing[0] = False
+            client.get_market_data('bitcoin', days=7)
+            client.get_market_data('bitcoin', days=90)
+            client.get_market_data('bitcoin', days=7)
+            client.cache.clear()
+            client.get_market_data('bitcoin', days=7)
+
+        self.assertEqual(fetched, [90, 7, 90, 7])
+
+    def test_intraday_ring(self):
+        """测试日内数据分页回填、按周期聚合为K线并增量更新"""
+        import asyncio
+        import time
+        import numpy as np
+
+        async def scenario(client):
+            first = await client.get_intraday_data('bitcoin', '2h')
+            before = {key: first[key].copy() for key in ('timestamps', 'prices', 'high', 'low')}
+            client.cache.clear()
+            second = await client.get_intraday_data('bitcoin', '2h')
+            return first, before, second, client.intraday_buffers['intraday_bitcoin_2h']
+
+        first, before, second, ring = asyncio.run(self._run_with_server(scenario, intraday_capacity=400))
+
+        # 400根2小时K线约33天：按30天分页回填，共2页；之后只获取新数据
+        self.assertEqual(self.requests, ['/coins/bitcoin/market_chart/range'] * 3)
+        self.assertEqual(len(first), 400)
+        self.assertTrue((first['timestamps'][1:] - first['timestamps'][:-1] == 7200000).all())
+        self.assertEqual(first['high'][5], first['prices'][5])  # 每根K线取周期内最后一个小时
+        self.assertEqual(first['low'][5], first['prices'][5] - 1)
+        self.assertEqual(ring.last_raw_ms // 3600000, int(time.time()) // 3600)
+        self.assertTrue(second['prices'].flags['C_CONTIGUOUS'])
+        # 第二次摄入后，第一次返回的K线不变
+        for key, values in before.items():
+            np.testing.assert_array_equal(first[key], values)
+        self.assertFalse(np.shares_memory(first['prices'], ring.columns['prices']))
+
+    def test_single_flight(self):
+        """测试缓存未命中的并发调用共用一个请求，失败结果也共用"""
+        import asyncio
+
+        async def scenario(client):
+            series = await asyncio.gather(*(client.get_market_data('bitcoin', days=7) for _ in range(3)))
+            missing = await asyncio.gather(*(client.get_market_data('missing', days=7) for _ in range(3)))
+            return series, missing, dict(client.inflight)
+
+        series, missing, inflight = asyncio.run(self._run_with_server(scenario))
+
+        self.assertEqual(self.requests.count('/coins/bitcoin/market_chart'), 1)
+        self.assertEqual(self.requests.count('/coins/missing/market_chart'), 1)
+        self.assertEqual(len(series[2]), 8)
+        self.assertTrue(all('error' in result for result in missing))
+        self.assertEqual(inflight, {})
+
+    def test_stale_while_revalidate(self):
+        """测试过期不久的缓存先返回旧数据，同时在后台刷新"""
+        import asyncio
+        import time
+
+        async def scenario(client):
+            client.cache.max_stale = {'price': 60}
+            first = await client.get_price('bitcoin')
+            client.cache.entries['price_bitcoin_usd'][1] = time.monotonic() - 1  # 模拟TTL到期
+
+            start = time.perf_counter()
+            stale = await client.get_price('bitcoin')
+            elapsed = time.perf_counter() - start
+            again = await client.get_price('bitcoin')  # 刷新进行中，不重复请求
+            await asyncio.sleep(0.4)
+            state = client.cache.lookup('price_bitcoin_usd')[1]
+            return first, stale, again, elapsed, state
+
+        first, stale, again, elapsed, state = asyncio.run(self._run_with_server(scenario))
+
+        self.assertIs(stale, first)
+        self.assertIs(again, first)
+        self.assertLess(elapsed, 0.1)
+        self.assertEqual(self.requests, ['/simple/price', '/simple/price'])
+        self.assertEqual(state, 'fresh')
+
+class TestDataSources(unittest.TestCase):
+    """对冲请求、故障转移和熔断测试（主/备数据源均为本地模拟服务器）"""
+
+    def test_circuit_breaker(self):
+        """测试连续失败后熔断，超时后半开试探"""
+        import time
+        from src.api.sources import CircuitBreaker
+
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, 'half_open')
+        breaker.record_failure()  # 试探失败立即重新断开
+        self.assertEqual(breaker.state, 'open')
+        time.sleep(0.06)
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_hedge_and_failover(self):
+        """测试主数据源慢时对冲到备用数据源，主数据源持续失败时被熔断"""
+        import asyncio
+        import time
+        from aiohttp import web
+        from src.api.async_coingecko import AsyncCoinGeckoClient
+
+        requests = []
+
+        async def simple_price(request):
+            source = request.match_info['source']
+            requests.append((source, request.path))
+            if source == 'primary':
+                await asyncio.sleep(1.0)
+            price = 100.0 if source == 'primary' else 200.0
+            return web.json_response({'bitcoin': {'usd': price}})
+
+        async def coin_info(request):
+            source = request.match_info['source']
+            requests.append((source, request.path))
+            if source == 'primary':
+                return web.json_response({'error': 'unavailable'}, status=503)
+            return web.json_response({'id': request.match_info['coin_id'], 'name': 'Bitcoin'})
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_get('/{source}/simple/price', simple_price)
+            app.router.add_get('/{source}/coins/{coin_id}', coin_info)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+            try:
+                async with AsyncCoinGeckoClient(
+                        rate_limit=6000, max_retries=0, hedge_delay=0.1, failure_threshold=1,
+                        secondary_sources=[{'name': 'mirror', 'base_url': f'{url}/secondary', 'rate_limit': 6000,
+                                            'max_retries': 0}]) as client:
+                    client.base_url = f'{url}/primary'
+                    start = time.perf_counter()
+                    price = await client.get_price('bitcoin')
+                    elapsed = time.perf_counter() - start
+                    infos = [await client.get_coin_info(f'coin-{i}') for i in range(5)]
+                    return price, elapsed, infos, client.get_source_metrics()
+            finally:
+                await runner.cleanup()
+
+        price, elapsed, infos, metrics = asyncio.run(scenario())
+
+        self.assertEqual(price['price'], 200.0)
+        self.assertLess(elapsed, 0.6)
+        self.assertTrue(all(info['name'] == 'Bitcoin' for info in infos))
+        # 主数据源失败后熔断，之后的请求直接发往备用数据源
+        primary_infos = [path for source, path in requests if source == 'primary' and '/coins/' in path]
+        self.assertEqual(primary_infos, ['/primary/coins/coin-0'])
+        self.assertEqual(metrics[0]['state'], 'open')
+        self.assertEqual(metrics[1]['wins'], 6)
+        self.assertEqual(metrics[1]['hedged'], 2)  # 一次对冲，一次故障转移
+
+class TestRateLimiter(unittest.TestCase):
+    """令牌桶限流器测试"""
+
+    def test_token_bucket(self):
+        """测试突发配额用完后按速率等待"""
+        from src.api.rate_limit import RateLimiter, parse_retry_after
+
+        limiter = RateLimiter('demo', rate_per_minute=600, burst=2)
+        waits = [limiter._reserve() for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1, places=2)
+        self.assertAlmostEqual(waits[3], 0.2, places=2)
+
+        self.assertTrue(limiter.record(503))
+        self.assertFalse(limiter.record(200))
+        usage = limiter.usage()
+        self.assertEqual(usage['server_errors'], 1)
+        self.assertEqual(usage['requests_last_minute'], 4)
+        self.assertEqual(parse_retry_after('7'), 7.0)
+        self.assertIsNone(parse_retry_after('soon'))
+
+class TestResponseCache(unittest.TestCase):
+    """LRU + TTL 响应缓存测试"""
+
+    def test_lru_and_ttl(self):
+        """测试按条目数/字节数淘汰、按前缀TTL过期和计数"""
+        import time
+        import numpy as np
+        from src.api.cache import ResponseCache
+
+        cache = ResponseCache(default_ttl=60, ttls={'price': 0.05}, max_entries=3, max_bytes=10 ** 6)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, {'value': key})
+        cache.get('a')
+        cache.set('d', {'value': 'd'})
+        self.assertNotIn('b', cache)  # b最久未使用
+        self.assertIn('a', cache)
+
+        cache.set('big', np.zeros(200000))  # 1.6MB，超出字节上限后被淘汰
+        self.assertNotIn('big', cache)
+        self.assertLessEqual(cache.metrics()['bytes'], 10 ** 6)
+
+        cache.set('price_bitcoin_usd', {'price': 1.0})
+        self.assertEqual(cache.ttl_for('price_bitcoin_usd'), 0.05)
+        time.sleep(0.06)
+        self.assertEqual(cache.purge_expired(), 1)
+        self.assertIsNone(cache.get('price_bitcoin_usd'))
+
+        metrics = cache.metrics()
+        self.assertEqual(metrics['hits'], 1)
+        self.assertGreaterEqual(metrics['evictions'], 2)
+        self.assertEqual(metrics['expirations'], 1)
+
+    def test_stale_and_refresh_ahead(self):
+        """测试最长陈旧时间内返回旧数据，热点键到期前提示刷新"""
+        import time
+        from src.api.cache import ResponseCache
+
+        cache = ResponseCache(ttls={'price': 0.05, 'info': 1}, max_stale={'price': 60}, hot_hits=2)
+        cache.set('price_bitcoin_usd', {'price': 1.0})
+        cache.set('info_bitcoin', {'name': 'Bitcoin'})
+        time.sleep(0.06)
+        self.assertEqual(cache.lookup('price_bitcoin_usd'), ({'price': 1.0}, 'stale'))
+        self.assertIsNone(cache.get('price_bitcoin_usd'))  # 只要求新鲜数据时按未命中处理
+        self.assertEqual(cache.purge_expired(), 0)
+
+        self.assertEqual(cache.lookup('info_bitcoin')[1], 'fresh')
+        self.assertFalse(cache.needs_refresh('info_bitcoin'))
+        cache.lookup('info_bitcoin')
+        cache.entries['info_bitcoin'][1] = time.monotonic() + 0.1  # 剩余时间低于TTL的20%
+        self.assertTrue(cache.needs_refresh('info_bitcoin'))
+        self.assertEqual(cache.metrics()['stale_hits'], 1)
+
+    def test_configured_default_ttl(self):
+        """测试配置了cache_ttl时覆盖各接口的内置缓存时间，cache_ttls中显式配置的接口除外"""
+        import tempfile
+        from src.api.coingecko import CoinGeckoClient
+
+        keys = ('price_bitcoin_usd', 'market_bitcoin_7', 'ohlc_bitcoin_7', 'info_bitcoin', 'supported_coins')
+        client = CoinGeckoClient(cache_ttl=5)
+        self.assertEqual([client.cache.ttl_for(key) for key in keys], [5] * 5)
+
+        client = CoinGeckoClient(cache_ttl=5, cache_ttls={'price': 1})
+        self.assertEqual([client.cache.ttl_for(key) for key in keys], [1, 5, 5, 5, 5])
+
+        # 未配置cache_ttl时使用内置缓存时间
+        self.assertEqual(CoinGeckoClient().cache.ttl_for('price_bitcoin_usd'), 30)
+
+        # 用户配置文件只设置cache_ttl时，默认配置不会用内置值覆盖它
+        with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as f:
+            f.write('api:\n  coingecko:\n    cache_ttl: 5\n')
+        api_config = ConfigLoader(f.name).load()['api']['coingecko']
+        os.unlink(f.name)
+        client = CoinGeckoClient(cache_ttl=api_config['cache_ttl'], cache_ttls=api_config['cache_ttls'])
+        self.assertEqual(client.cache.ttl_for('price_bitcoin_usd'), 5)
+
+class TestIncrementalSync(unittest.TestCase):
+    """市场数据增量同步测试"""
+
+    def test_range_append_and_trim(self):
+        """测试缓存过期后只获取新数据点，追加后截取到窗口长度"""
+        import time
+        from unittest import mock
+
+        day = 86400000
+        now = int(time.time() * 1000) // day * day
+        calls = []
+
+        def fake_get_json(endpoint):
+            if endpoint.path.endswith('/ohlc'):
+                return []
+            calls.append(endpoint)
+            if endpoint.path.endswith('/range'):
+                # 已收盘的一天 + 新的实时点
+                points = [[now + day, 200.0], [now + day + 3600000, 201.0]]
+            else:
+                points = [[now - day * i, 100.0 - i] for i in range(7, -1, -1)]
+            return {'prices': points, 'market_caps': points, 'total_volumes': points}
+
+        client = CoinGeckoClient(incremental_sync=True)
+        with mock.patch.object(client, '_get_json', side_effect=fake_get_json):
+            first = client.get_market_data('bitcoin', days=7)
+            client.cache.clear()
+            second = client.get_market_data('bitcoin', days=7)
+
+        self.assertEqual(calls[0].path, '/coins/bitcoin/market_chart')
+        self.assertEqual(calls[1].path, '/coins/bitcoin/market_chart/range')
+        self.assertEqual(calls[1].params['from'], now // 1000)
+        self.assertEqual(len(first), 8)
+        # 原最后一个点被替换，最早的点超出7天窗口被截掉
+        self.assertEqual(list(second['prices']), [95.0, 96.0, 97.0, 98.0, 99.0, 200.0, 201.0])
+        self.assertEqual(second['period_days'], 7)
+
+    def test_range_resampled_to_daily(self):
+        """测试range返回的小时级数据重采样为日线，写入本地存储时不产生重复数据点"""
+        import tempfile
+        import time
+        import numpy as np
+        from unittest import mock
+
+        day, hour = 86400000, 3600000
+        now = int(time.time() * 1000) // day * day
+
+        def fake_get_json(endpoint):
+            if endpoint.path.endswith('/ohlc'):
+                return []
+            if endpoint.path.endswith('/range'):
+                self.assertNotIn('interval', endpoint.params)
+                # 从上次的实时点开始的小时级数据，跨过一个0点
+                points = [[now + hour * i, 300.0 + i] for i in range(30)]
+            else:
+                points = [[now - day * i, 100.0 - i] for i in range(7, -1, -1)]
+            return {'prices': points, 'market_caps': points, 'total_volumes': points}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            client = CoinGeckoClient(incremental_sync=True, history_store_path=tmp)
+            with mock.patch.object(client, '_get_json', side_effect=fake_get_json):
+                client.get_market_data('bitcoin', days=7)
+                client.cache.clear()
+                second = client.get_market_data('bitcoin', days=7)
+
+            self.assertEqual(list(second['prices'][-3:]), [300.0, 324.0, 329.0])
+            self.assertEqual(list(second.timestamps[-3:]), [now, now + day, now + day + 5 * hour])
+            stored = client.history_store.load('bitcoin')
+            self.assertEqual(len(stored), 10)
+            self.assertTrue((np.diff(stored.timestamps) > 0).all())
+            del stored, second
+            client.history_store.maps.clear()
+
+class TestColumnStore(unittest.TestCase):
+    """本地列式行情存储测试"""
+
+    def test_append_and_range(self):
+        """测试追加、替换末尾数据点和memmap零拷贝范围查询"""
+        import tempfile
+        import numpy as np
+        from src.data.ohlcv import OHLCVSeries
+        from src.data.store import ColumnStore
+
+        def make(start, count, offset=0.0):
+            prices = [100.0 + offset + i for i in range(count)]
+            return OHLCVSeries(prices, volumes=[10.0] * count, timestamps=[60000 * (start + i) for i in range(count)])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ColumnStore(tmp)
+            store.append('bitcoin', make(0, 100))
+            # 从第95个点开始的数据替换原有末尾
+            store.append('bitcoin', make(95, 10, offset=1000.0))
+
+            reopened = ColumnStore(tmp)
+            self.assertIn('bitcoin', reopened)
+            self.assertEqual(len(reopened.load('bitcoin')), 105)
+            self.assertEqual(reopened.last_timestamp('bitcoin'), 60000 * 104)
+
+            window = reopened.range('bitcoin', 60000 * 90, 60000 * 99)
+            self.assertIsInstance(window.prices, np.memmap)
+            self.assertEqual(list(window['prices']), [190.0, 191.0, 192.0, 193.0, 194.0,
+                                                      1100.0, 1101.0, 1102.0, 1103.0, 1104.0])
+
+            result = TechnicalIndicators().analyze_all_indicators(reopened.tail('bitcoin', 60))
+            self.assertEqual(result['current_price'], 1109.0)
+            del window, result
+            reopened.maps.clear()
+
+class TestDiskCache(unittest.TestCase):
+    """SQLite持久化缓存测试"""
+
+    def test_warm_restart(self):
+        """测试新客户端（模拟进程重启）直接使用磁盘缓存的响应"""
+        import tempfile
+        import time
+        from unittest import mock
+        from src.api.coingecko import CoinGeckoClient
+
+        points = [[86400000 * i, 100.0 + i] for i in range(8)]
+        response = {'prices': points, 'market_caps': points, 'total_volumes': points}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache', 'api.sqlite')
+            first = CoinGeckoClient(disk_cache_path=path)
+            with mock.patch.object(first, '_get_json', side_effect=[response, []]) as fetch:
+                market_data = first.get_market_data('bitcoin', days=7)
+            self.assertEqual(fetch.call_count, 2)  # market_chart + ohlc
+            first.close()
+
+            second = CoinGeckoClient(disk_cache_path=path)
+            with mock.patch.object(second, '_get_json', side_effect=AssertionError('不应访问网络')):
+                cached = second.get_market_data('bitcoin', days=7)
+                self.assertEqual(list(cached['prices']), list(market_data['prices']))
+                self.assertIn('error', second.get_market_data('bitcoin', days=30))
+            self.assertEqual(second.get_cache_metrics()['disk']['hits'], 2)
+            self.assertLessEqual(second.cache.entries['market_bitcoin_7'][1] - time.monotonic(), 300)
+            second.close()
+
+class TestOHLCVRing(unittest.TestCase):
+    """定长K线环形缓冲区测试"""
+
+    def test_aggregate_and_wrap(self):
+        """测试按周期聚合、合并未完成的K线、写满后覆盖最旧的K线且导出连续视图"""
+        import numpy as np
+        from src.data.ring import OHLCVRing, parse_timeframe
+
+        self.assertEqual(parse_timeframe('2h'), 7200000)
+        with self.assertRaises(ValueError):
+            parse_timeframe('2w')
+
+        ring = OHLCVRing(capacity=4, bar_ms=600000)  # 10分钟K线
+        minutes = np.arange(0, 25, 5, dtype=np.int64) * 60000  # 0-20分钟，每5分钟一个点
+        prices = np.array([1.0, 3.0, 2.0, 5.0, 4.0])
+        self.assertEqual(ring.ingest(minutes, prices, prices * 10, prices * 100), 3)
+        np.testing.assert_array_equal(ring.view()['prices'], [3.0, 5.0, 4.0])
+        np.testing.assert_array_equal(ring.view()['high'], [3.0, 5.0, 4.0])
+        np.testing.assert_array_equal(ring.view()['low'], [1.0, 2.0, 4.0])
+
+        # 20-25分钟的点并入最后一根K线，之后3根新K线使最旧的2根被覆盖
+        later = np.array([25, 30, 40, 50], dtype=np.int64) * 60000
+        prices = np.array([0.5, 6.0, 7.0, 8.0])
+        self.assertEqual(ring.ingest(later, prices, prices, prices), 3)
+        view = ring.view()
+        self.assertEqual(len(view), 4)
+        np.testing.assert_array_equal(view['timestamps'] // 60000, [20, 30, 40, 50])
+        self.assertEqual(view['low'][0], 0.5)
+        self.assertEqual(view['high'][0], 4.0)
+        self.assertTrue(view['prices'].flags['C_CONTIGUOUS'])
+        self.assertTrue(np.shares_memory(view['prices'], ring.columns['prices']))
+
+        # 重复的旧数据被忽略
+        self.assertEqual(ring.ingest(later, prices, prices, prices), 0)
+        self.assertEqual(ring.nbytes, 4 * 2 * 6 * 8)
+
+    def test_snapshot_survives_ingest(self):
+        """测试snapshot()是副本，之后的摄入不改变已返回的数据（view()会被改写）"""
+        import numpy as np
+        from src.data.ring import OHLCVRing
+
+        ring = OHLCVRing(capacity=3, bar_ms=60000)
+        minutes = np.arange(3, dtype=np.int64) * 60000
+        prices = np.array([1.0, 2.0, 3.0])
+        ring.ingest(minutes, prices, prices, prices)
+        snapshot, view = ring.snapshot(), ring.view()
+
+        later = np.arange(3, 6, dtype=np.int64) * 60000
+        ring.ingest(later, prices + 10, prices, prices)
+        np.testing.assert_array_equal(snapshot['prices'], [1.0, 2.0, 3.0])
+        np.testing.assert_array_equal(snapshot['timestamps'], minutes)
+        self.assertFalse(np.shares_memory(snapshot['prices'], ring.columns['prices']))
+        np.testing.assert_array_equal(view['prices'], [11.0, 12.0, 13.0])
+
+class TestOHLCVSeries(unittest.TestCase):
+    """列式行情序列测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        from src.data.ohlcv import OHLCVSeries
+
+        prices = [100.0 + i for i in range(10)]
+        self.series = OHLCVSeries(prices, [p + 1 for p in prices], [p - 1 for p in prices],
+                                  [10.0] * 10, timestamps=[1000 * i for i in range(10)], period_days=7)
+
+    def test_dict_compatibility(self):
+        """测试兼容原market_data字典的读取方式"""
+        self.assertEqual(self.series['data_points'], 10)
+        self.assertEqual(self.series.get('period_days'), 7)
+        self.assertNotIn('error', self.series)
+        self.assertEqual(self.series.to_dict()['prices'][-1], 109.0)
+
+        result = TechnicalIndicators().analyze_all_indicators(self.series)
+        self.assertEqual(result['current_price'], 109.0)
+
+    def test_zero_copy_window(self):
+        """测试窗口视图不复制数据"""
+        import numpy as np
+
+        tail = self.series.tail(3)
+        self.assertEqual(len(tail), 3)
+        self.assertTrue(np.shares_memory(tail.prices, self.series.prices))
+        self.assertEqual(self.series.between(2000, 4000).prices.tolist(), [102.0, 103.0, 104.0])
+
 class TestTechnicalIndicators(unittest.TestCase):
     """技术指标测试"""
     
@@ -105,6 +926,137 @@ class TestTechnicalIndicators(unittest.TestCase):
         self.assertEqual(len(macd_result['signal']), len(prices))
         self.assertEqual(len(macd_result['histogram']), len(prices))
     
+    def test_array_backend(self):
+        """测试ndarray输出模式与列表模式结果一致"""
+        import numpy as np
+
+        array_indicators = TechnicalIndicators(as_list=False)
+        prices = np.array([100, 102, 101, 105, 107, 106, 110, 108, 111, 115, 113, 117], dtype=float)
+        high = prices * 1.01
+        low = prices * 0.99
+
+        ma5 = array_indicators.calculate_ma(prices, 5)
+        self.assertIsInstance(ma5, np.ndarray)
+        np.testing.assert_allclose(ma5, self.indicators.calculate_ma(prices.tolist(), 5))
+
+        kdj = array_indicators.calculate_kdj(high, low, prices)
+        kdj_list = self.indicators.calculate_kdj(high.tolist(), low.tolist(), prices.tolist())
+        for key in ('K', 'D', 'J'):
+            self.assertIsInstance(kdj[key], np.ndarray)
+            np.testing.assert_allclose(kdj[key], kdj_list[key])
+
+        # 递推EMA与逐点计算一致
+        macd = array_indicators.calculate_macd(prices, 6, 7, 6)
+        ema = [prices[0]]
+        for price in prices[1:]:
+            ema.append((price - ema[-1]) * (2 / 7) + ema[-1])
+        ema_slow = [prices[0]]
+        for price in prices[1:]:
+            ema_slow.append((price - ema_slow[-1]) * (2 / 8) + ema_slow[-1])
+        np.testing.assert_allclose(macd['macd'], np.array(ema) - np.array(ema_slow))
+
+    def test_ma_with_missing_values(self):
+        """测试缺失值(NaN)只影响包含它的均线窗口"""
+        import numpy as np
+
+        prices = [100.0 + i for i in range(20)]
+        prices[8] = float('nan')
+        ma5 = np.array(self.indicators.calculate_ma(prices, 5))
+
+        self.assertTrue(np.isnan(ma5[8:13]).all())
+        self.assertFalse(np.isnan(ma5[:8]).any())
+        self.assertFalse(np.isnan(ma5[13:]).any())
+        self.assertAlmostEqual(ma5[13], np.mean(prices[9:14]))
+        self.assertAlmostEqual(ma5[7], np.mean(prices[3:8]))
+
+    def test_high_low_range(self):
+        """测试滚动最高/最低价与逐窗口切片结果一致"""
+        high = [3, 5, 4, 8, 7, 6, 2, 9, 1, 4, 6, 5, 3]
+        low = [h - 1 for h in high]
+        period = 4
+
+        highest_high, lowest_low = self.indicators.calculate_high_low(high, low, period)
+        for i in range(len(high)):
+            start = max(0, i - period + 1)
+            self.assertEqual(highest_high[i], max(high[start:i + 1]))
+            self.assertEqual(lowest_low[i], min(low[start:i + 1]))
+
+    def test_shared_graph(self):
+        """测试依赖图中共享的中间结果只计算一次"""
+        prices = [100 + (i * 7) % 11 for i in range(40)]
+        high = [p + 1 for p in prices]
+        low = [p - 1 for p in prices]
+        graph = self.indicators.build_graph(prices, high, low, [1000] * 40)
+
+        for period in (5, 10, 20):
+            self.indicators.calculate_ma(prices, period, graph=graph)
+        self.indicators.calculate_macd(prices, 6, 7, 6, graph=graph)
+        self.indicators.calculate_macd(prices, 6, 12, 6, graph=graph)
+        kdj = self.indicators.calculate_kdj(high, low, prices, 9, 3, 3, graph=graph)
+        skdj = self.indicators.calculate_skdj(high, low, prices, 9, 3, 3, graph=graph)
+
+        self.assertEqual(graph.evaluations['cumsum'], 3)      # 收盘价、K序列、D序列
+        self.assertEqual(graph.evaluations['ema'], 5)         # EMA6/7/12 + 两条信号线
+        self.assertEqual(graph.evaluations['kdj'], 1)
+        self.assertEqual(graph.evaluations['rolling_max'], 1)
+        self.assertEqual(skdj, self.indicators.calculate_skdj(high, low, prices, 9, 3, 3))
+        self.assertEqual(kdj, self.indicators.calculate_kdj(high, low, prices, 9, 3, 3))
+
+    def test_analyze_batch(self):
+        """测试批量分析与逐币种分析结果一致"""
+        import numpy as np
+
+        prices = np.array([[100 + (i * k) % 17 for i in range(200)] for k in (3, 5, 7)], dtype=float)
+        market_matrix = {'prices': prices, 'high': prices * 1.02, 'low': prices * 0.98, 'volumes': prices * 10}
+        results = self.indicators.analyze_batch(market_matrix, ['BTC', 'ETH', 'SOL'])
+
+        self.assertEqual(set(results), {'BTC', 'ETH', 'SOL'})
+        for row, symbol in enumerate(['BTC', 'ETH', 'SOL']):
+            single = self.indicators.analyze_all_indicators({
+                key: values[row].tolist() for key, values in market_matrix.items()
+            })
+            batch = results[symbol]
+            self.assertEqual(batch['current_price'], single['current_price'])
+            np.testing.assert_allclose(batch['indicators']['MA48'], single['indicators']['MA48'])
+            np.testing.assert_allclose(batch['indicators']['MACD']['signal'], single['indicators']['MACD']['signal'])
+            np.testing.assert_allclose(batch['indicators']['SKDJ']['SJ'], single['indicators']['SKDJ']['SJ'])
+            np.testing.assert_allclose(batch['indicators']['OBV'], single['indicators']['OBV'])
+            # 兼容模式下矩阵指标的各行也转换为列表
+            self.assertIsInstance(batch['indicators']['MA48'], list)
+            self.assertIsInstance(batch['indicators']['KDJ']['K'], list)
+
+    def test_sweep_macd(self):
+        """测试MACD参数扫描与单组参数计算一致"""
+        import numpy as np
+
+        prices = [100 + (i * 7) % 19 for i in range(120)]
+        result = self.indicators.sweep('macd', {'prices': prices}, fast=[3, 6], slow=[7, 12, 26], signal=[6, 9])
+
+        self.assertEqual(result['signal'].shape, (2, 3, 2, len(prices)))
+        single = self.indicators.calculate_macd(prices, 6, 26, 9)
+        np.testing.assert_allclose(result['histogram'][1, 2, 1], single['histogram'])
+        self.assertIn('error', self.indicators.sweep('unknown', {'prices': prices}))
+
+    def test_calculate_td(self):
+        """测试TD序列结构计数及与增量模式一致"""
+        from src.analysis.streaming import StreamingTD
+
+        close = [100 - i for i in range(16)] + [90 + (i * 5) % 7 for i in range(30)]
+        high = [c + 0.5 for c in close]
+        low = [c - 0.5 for c in close]
+        td = self.indicators.calculate_td(high, low, close, 9, 13)
+
+        # 连续下跌：第5根K线开始买入结构计数1..9
+        self.assertEqual(td['buy_setup'][:14], [0, 0, 0, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 1])
+        self.assertEqual(td['sell_setup'][:14], [0] * 14)
+        self.assertTrue(all(type(count) is int for count in td['buy_countdown']))
+
+        streaming = StreamingTD(9, 13)
+        for i in range(len(close)):
+            value = streaming.update(high[i], low[i], close[i])
+            for key in ('buy_setup', 'sell_setup', 'buy_countdown', 'sell_countdown'):
+                self.assertEqual(value[key], td[key][i])
+
     def test_generate_signals(self):
         """测试信号生成"""
         indicators = {
@@ -129,5 +1081,157 @@ class TestTechnicalIndicators(unittest.TestCase):
         self.assertGreaterEqual(signals['signal_strength'], 0.0)
         self.assertLessEqual(signals['signal_strength'], 1.0)
 
+class TestStreamingIndicators(unittest.TestCase):
+    """增量指标测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.indicators = TechnicalIndicators()
+        self.prices = [100 + (i * 7) % 13 - (i * 3) % 5 for i in range(60)]
+        self.market_data = {
+            'prices': self.prices,
+            'high': [p * 1.01 for p in self.prices],
+            'low': [p * 0.99 for p in self.prices],
+            'volumes': [1000 + i for i in range(60)]
+        }
+
+    def test_streaming_matches_batch(self):
+        """测试逐根追加K线与整体计算结果一致"""
+        state = self.indicators.create_streaming_state(self.market_data)
+        state.update(104.5, volume=2000, timestamp=state.bar_start + state.bar_interval)
+
+        extended = {key: list(values) for key, values in self.market_data.items()}
+        extended['prices'].append(104.5)
+        extended['high'].append(104.5)
+        extended['low'].append(104.5)
+        extended['volumes'].append(2000)
+        batch = self.indicators.analyze_all_indicators(extended)['indicators']
+        snapshot = state.snapshot()
+
+        self.assertAlmostEqual(snapshot['MA5'], batch['MA5'][-1])
+        self.assertAlmostEqual(snapshot['MA48'], batch['MA48'][-1])
+        self.assertAlmostEqual(snapshot['MACD']['histogram'], batch['MACD']['histogram'][-1])
+        self.assertAlmostEqual(snapshot['KDJ']['J'], batch['KDJ']['J'][-1])
+        self.assertAlmostEqual(snapshot['SKDJ']['SK'], batch['SKDJ']['SK'][-1])
+        self.assertAlmostEqual(snapshot['OBV'], batch['OBV'][-1])
+
+    def test_intraday_bar_interval(self):
+        """测试用2小时K线初始化时从最后一根K线开始计时，满2小时才开新K线"""
+        import numpy as np
+
+        bar = 7200
+        start = 1700000000 // bar * bar
+        market_data = dict(self.market_data, timestamps=np.array([(start + bar * i) * 1000 for i in range(60)]))
+        state = self.indicators.create_streaming_state(market_data, bar)
+        last = start + bar * 59
+        self.assertEqual(state.bar_start, last)
+
+        # 同一根K线内的报价修正最后一根K线
+        state.update(90.0, timestamp=last + 3600)
+        self.assertEqual(state.bar_start, last)
+        self.assertAlmostEqual(state.snapshot()['MA5'], np.mean(self.prices[-5:-1] + [90.0]))
+
+        # 满2小时后开新K线，开始时间对齐到周期边界
+        state.update(120.0, timestamp=last + bar + 90)
+        self.assertEqual(state.bar_start, last + bar)
+        self.assertAlmostEqual(state.snapshot()['MA5'], np.mean(self.prices[-4:-1] + [90.0, 120.0]))
+
+    def test_seed_aligns_live_point(self):
+        """测试日线数据最后一个实时点不在0点时，K线开始时间对齐到UTC 0点"""
+        import numpy as np
+
+        day = 86400
+        midnight = 1700000000 // day * day
+        timestamps = [(midnight - day * i) * 1000 for i in range(59, 0, -1)] + [(midnight + 37000) * 1000]
+        state = self.indicators.create_streaming_state(dict(self.market_data, timestamps=np.array(timestamps)))
+        self.assertEqual(state.bar_start, midnight)
+
+        state.update(101.0, timestamp=midnight + day - 1)
+        self.assertEqual(state.bar_start, midnight)
+        state.update(102.0, timestamp=midnight + day + 5)
+        self.assertEqual(state.bar_start, midnight + day)
+
+    def test_state_serialization(self):
+        """测试状态序列化后可恢复"""
+        import json
+        from src.analysis.streaming import StreamingIndicatorState
+
+        state = self.indicators.create_streaming_state(self.market_data)
+        restored = StreamingIndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+
+        self.assertEqual(state.update(103.0, 1500), restored.update(103.0, 1500))
+
+class TestBacktester(unittest.TestCase):
+    """历史回测测试"""
+
+    def test_backtest_summary(self):
+        """测试回测结果结构与收益、回撤的一致性"""
+        import numpy as np
+        from src.analysis.backtest import Backtester
+
+        config = TechnicalIndicators().config
+        steps = np.array([[((i * k) % 9 - 4) * 0.004 for i in range(400)] for k in (2, 5)])
+        prices = 100 * np.exp(np.cumsum(steps, axis=1))
+        market_matrix = {'prices': prices, 'high': prices * 1.01, 'low': prices * 0.99, 'volumes': prices}
+
+        results = Backtester(config).run(market_matrix, ['BTC', 'ETH'])
+        for symbol in ('BTC', 'ETH'):
+            result = results[symbol]
+            self.assertEqual(len(result['positions']), 400)
+            self.assertTrue(set(np.unique(result['positions'])) <= {0.0, 1.0})
+            self.assertAlmostEqual(result['total_return'], result['equity'][-1] - 1)
+            self.assertLessEqual(result['max_drawdown'], 0.0)
+            self.assertGreaterEqual(result['trades'], 0)
+
+        # 预热期内不持仓（默认规则中ma只用到MA5/MA48）
+        self.assertEqual(Backtester(config).warmup, 48)
+        self.assertFalse(results['BTC']['positions'][:48].any())
+
+    def test_backtest_warmup(self):
+        """测试预热长度只计入所选规则，历史短于预热期时报错"""
+        import numpy as np
+        from src.analysis.backtest import Backtester
+
+        config = TechnicalIndicators().config
+        self.assertEqual(Backtester(config, {'rules': ['ma']}).warmup, 48)
+        self.assertEqual(Backtester(config, {'rules': ['macd', 'kdj']}).warmup, 13)
+
+        prices = 100 + np.sin(np.arange(91) / 3) * 10
+        market_data = {'prices': prices, 'high': prices + 1, 'low': prices - 1, 'volumes': prices}
+        self.assertGreater(Backtester(config).run(market_data, ['BTC'])['BTC']['trades'], 0)
+        self.assertIn('error', Backtester(config, {'rules': ['ma']}).run(
+            {key: values[:48] for key, values in market_data.items()}, ['BTC']))
+
+class TestParallelAnalyzer(unittest.TestCase):
+    """多进程并行分析测试"""
+
+    def test_analyze_many(self):
+        """测试并行分析结果与单进程一致"""
+        import asyncio
+        from src.analysis.parallel import ParallelAnalyzer
+
+        indicators = TechnicalIndicators()
+        market_data_by_symbol = {}
+        for k, symbol in enumerate(['BTC', 'ETH', 'SOL']):
+            prices = [100 + (i * (k + 3)) % 23 for i in range(60 + k)]
+            market_data_by_symbol[symbol] = {
+                'prices': prices,
+                'high': [p + 1 for p in prices],
+                'low': [p - 1 for p in prices],
+                'volumes': [1000.0] * len(prices)
+            }
+
+        analyzer = ParallelAnalyzer(indicators.config, workers=2)
+        try:
+            results = asyncio.run(analyzer.analyze_many(market_data_by_symbol))
+        finally:
+            analyzer.shutdown()
+
+        for symbol, market_data in market_data_by_symbol.items():
+            expected = indicators.analyze_all_indicators(market_data)['indicators']
+            for key in ('MA5', 'MA48', 'OBV'):
+                for actual_value, expected_value in zip(results[symbol]['indicators'][key], expected[key]):
+                    self.assertAlmostEqual(actual_value, expected_value)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file